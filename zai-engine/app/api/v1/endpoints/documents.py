@@ -1,11 +1,35 @@
-from typing import List
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+import json
+from typing import AsyncIterator, Dict, List, Optional
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from config import config
 from app.services.document_service import DocumentService
-from app.models.document import Document, DocumentChunk
+from app.services.embedding_cache import embedding_cache
+from app.models.document import BatchStatus, BatchUpload, Document, DocumentChunk
 
 router = APIRouter()
 document_service = DocumentService()
 
+async def _server_sent_events(events: AsyncIterator[Optional[Dict]]) -> AsyncIterator[str]:
+    """Format events as server-sent events; None becomes a keep-alive comment."""
+    async for event in events:
+        if event is None:
+            yield ": keep-alive\n\n"
+            continue
+        lines = [f"event: {event['type']}"]
+        if "id" in event:
+            lines.append(f"id: {event['id']}")
+        lines.append(f"data: {json.dumps(event, default=str)}")
+        yield "\n".join(lines) + "\n\n"
+
+def _event_stream_response(events: AsyncIterator[Optional[Dict]]) -> StreamingResponse:
+    return StreamingResponse(
+        _server_sent_events(events),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/upload", response_model=Document)
 async def upload_document(file: UploadFile = File(...)):
     """
@@ -19,6 +43,41 @@ async def upload_document(file: UploadFile = File(...)):
     document = await document_service.create_document(file)
     return document
 
+@router.post("/batch", response_model=BatchUpload)
+async def upload_batch(files: List[UploadFile] = File(...)):
+    """
+    Upload many documents at once.
+    Accepts any number of files, including zip and tar archives whose
+    members are extracted. All documents are created together and share
+    a batch id; files that cannot be ingested are counted in skipped_count
+    and the first of them listed as skipped.
+    """
+    return await document_service.create_batch(files)
+
+@router.get("/batches/{batch_id}", response_model=BatchStatus)
+async def get_batch_status(batch_id: str):
+    """Get the number of documents in each status for a batch."""
+    status = await document_service.get_batch_status(batch_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return status
+
+@router.get("/batches/{batch_id}/events")
+async def stream_batch_events(batch_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Stream the progress of a batch as server-sent events.
+    Starts with the current status counts, then sends every status and
+    progress event of the batch's documents. The stream ends once every
+    document is processed or failed. A reconnecting client (Last-Event-ID)
+    gets the events it missed, or a reset event with the current counts
+    if they are no longer retained.
+    """
+    if not await document_service.get_batch_status(batch_id):
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return _event_stream_response(
+        document_service.stream_batch_events(batch_id, config["ingestion_events"]["heartbeat_seconds"], last_event_id)
+    )
+
 @router.get("/search")
 async def semantic_search(
     query: str = Query(..., description="Search query text"),
@@ -30,6 +89,19 @@ async def semantic_search(
     """
     return await document_service.semantic_search(query, limit)
 
+@router.get("/embedding-cache/stats")
+async def embedding_cache_stats():
+    """
+    Embedding cache hit and miss counters.
+    Returns the counters of this API process and the totals flushed by
+    every API and processor instance.
+    """
+    await embedding_cache.flush_stats("api")
+    return {
+        "process": embedding_cache.stats(),
+        "totals": await embedding_cache.persisted_stats()
+    }
+
 @router.get("/", response_model=List[Document])
 async def list_documents():
     """List all documents."""
@@ -43,10 +115,42 @@ async def get_document(document_id: str):
         raise HTTPException(status_code=404, detail="Document not found")
     return document
 
+@router.post("/{document_id}/retry", response_model=Document)
+async def retry_document(document_id: str):
+    """
+    Retry processing of a failed document.
+    Stages that completed before the failure (parsing, chunking,
+    embedding, indexing) are not repeated.
+    """
+    document = await document_service.retry_document(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document
+
+@router.get("/{document_id}/events")
+async def stream_document_events(document_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Stream the processing status of a document as server-sent events.
+    Starts with the current status, then sends status changes and
+    progress counts (pages parsed, chunks embedded and indexed). The
+    stream ends when the document is processed or failed. A reconnecting
+    client (Last-Event-ID) gets the events it missed, or a reset event
+    with the current status if they are no longer retained.
+    """
+    document = await document_service.get_document(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return _event_stream_response(
+        document_service.stream_document_events(document, config["ingestion_events"]["heartbeat_seconds"], last_event_id)
+    )
+
 @router.get("/{document_id}/chunks", response_model=List[DocumentChunk])
-async def get_document_chunks(document_id: str):
+async def get_document_chunks(
+    document_id: str,
+    include_vectors: bool = Query(False, description="Include embedding vectors in the response")
+):
     """Get all chunks for a specific document."""
-    chunks = await document_service.get_document_chunks(document_id)
+    chunks = await document_service.get_document_chunks(document_id, include_vectors)
     if not chunks:
         raise HTTPException(status_code=404, detail="No chunks found for document")
     return chunks 
\ No newline at end of file
@@ -1,5 +1,6 @@
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, HTTPException
+from haystack import Document
 from pydantic import BaseModel
 
 from app.services.enhanced_rag_service import EnhancedRAGService
@@ -16,6 +17,24 @@ class SearchQuery(BaseModel):
     temperature: Optional[float] = None
     search_type: Optional[str] = "hybrid"  # 'hybrid', 'semantic', or 'keyword'
 
+class RetrieveQuery(BaseModel):
+    """Retrieval-only query model; no LLM is involved."""
+    query: str
+    top_k: Optional[int] = 5
+    weights: Optional[Dict[str, float]] = None
+
+class SourceDocument(BaseModel):
+    """A retrieved document passed back for generation."""
+    content: str
+    score: Optional[float] = None
+    meta: Dict[str, Any] = {}
+
+class GenerateQuery(BaseModel):
+    """Generation query model answering from already retrieved documents."""
+    query: str
+    llm_id: str
+    documents: List[SourceDocument]
+
 @router.post("/rag")
 async def rag_search(query: SearchQuery) -> Dict:
     """
@@ -28,14 +47,10 @@ async def rag_search(query: SearchQuery) -> Dict:
         Dict containing answer, relevant documents, and query metadata
     """
     try:
-        # Initialize RAG components with specified LLM if not initialized
-        # or if LLM has changed
-        if rag_service.pipeline is None or rag_service.current_llm_id != query.llm_id:
-            await rag_service.initialize(query.llm_id)
-        
-        # Execute search with parameters
+        # Pipelines are built on first use of each LLM and cached
         result = await rag_service.query(
             query=query.query,
+            llm_id=query.llm_id,
             top_k=query.top_k,
             max_tokens=query.max_tokens,
             temperature=query.temperature,
@@ -47,4 +62,59 @@ async def rag_search(query: SearchQuery) -> Dict:
         raise HTTPException(
             status_code=500,
             detail=f"Enhanced RAG search failed: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.post("/retrieve")
+async def retrieve(query: RetrieveQuery) -> Dict:
+    """
+    Return the reranked documents for a query without generating an answer.
+    
+    Args:
+        query: Query text, number of documents and optional search weights
+    
+    Returns:
+        Dict containing the documents, query analysis and weights used
+    """
+    try:
+        await rag_service.initialize_retrieval()
+        result = await rag_service.retrieve(query.query, top_k=query.top_k or 5, weights=query.weights)
+        return {
+            "documents": [
+                {"content": doc.content, "score": doc.score, "meta": doc.meta}
+                for doc in result.documents
+            ],
+            "metadata": {
+                "query": rag_service.query_metadata(result.enhanced_query),
+                "weights": result.weights_dict()
+            }
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Retrieval failed: {str(e)}"
+        )
+
+@router.post("/generate")
+async def generate(query: GenerateQuery) -> Dict:
+    """
+    Answer a query from documents returned by /retrieve.
+    
+    Args:
+        query: Query text, LLM ID and the documents to answer from
+    
+    Returns:
+        Dict containing answer, sources and query metadata
+    """
+    try:
+        documents = [
+            Document(content=doc.content, score=doc.score, meta=doc.meta)
+            for doc in query.documents
+        ]
+        return await rag_service.generate(query.query, documents, query.llm_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Generation failed: {str(e)}"
+        )
@@ -1,9 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from config import config
 from app.api.v1.api import api_router
 from app.core.database import db
 from app.services.document_service import DocumentService
+from app.services.ingestion_metrics import set_document_counts
 from app.core.initialize import initialize_nlp
 import logging
 
@@ -34,6 +36,7 @@ async def startup_event():
     
     # Initialize document service
     app.state.document_service = DocumentService()
+    await app.state.document_service.ensure_indexes()
     
     # Initialize NLP components
     if not initialize_nlp():
@@ -49,6 +52,12 @@ async def shutdown_event():
 
 app.include_router(api_router, prefix="/api/v1")
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics, including the number of documents per status."""
+    set_document_counts(await app.state.document_service.count_documents_by_status())
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
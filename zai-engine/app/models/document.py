@@ -56,6 +56,22 @@ class DocumentMetadata(BaseModel):
     keywords: List[str] = Field(default_factory=list, description="Document keywords")
     processing_time: Optional[float] = Field(None, description="Processing time in seconds")
 
+class ProcessingMetrics(BaseModel):
+    """Represents stage timings and counters recorded while a document was ingested."""
+    stages: Dict[str, float] = Field(default_factory=dict, description="Seconds spent in each ingestion stage")
+    counters: Dict[str, int] = Field(default_factory=dict, description="Pages, chunks, cached chunks and embedding tokens and requests")
+    total_seconds: Optional[float] = Field(None, description="Time from claim to completion or failure")
+    chunks_per_second: Optional[float] = Field(None, description="Chunks stored per second of processing")
+    failed_stage: Optional[str] = Field(None, description="Stage that raised, if processing failed")
+    finished_at: Optional[datetime] = Field(None, description="When processing finished")
+
+class JobLease(BaseModel):
+    """Represents a processor's claim on a document."""
+    owner: str = Field(..., description="Identifier of the processor holding the lease")
+    claimed_at: datetime = Field(..., description="When the document was claimed")
+    heartbeat_at: Optional[datetime] = Field(None, description="Last lease renewal")
+    expires_at: datetime = Field(..., description="When the lease can be reclaimed")
+
 class Document(MongoBaseModel):
     """Represents a document in the system."""
     filename: str = Field(..., description="Original filename")
@@ -63,10 +79,17 @@ class Document(MongoBaseModel):
     mime_type: str = Field(..., description="MIME type of the document")
     size: int = Field(..., description="File size in bytes")
     file_path: str = Field(..., description="Path to the stored file")
+    content_hash: Optional[str] = Field(None, description="SHA-256 of the file content")
+    duplicate_of: Optional[str] = Field(None, description="Document whose chunks and vectors were reused")
+    batch_id: Optional[str] = Field(None, description="Batch upload the document belongs to")
     status: DocumentStatus = Field(default="pending", description="Processing status")
     processing_error: Optional[str] = Field(None, description="Error message if processing failed")
+    lease: Optional[JobLease] = Field(None, description="Active processing lease")
+    attempts: int = Field(default=0, description="Number of times processing was claimed")
+    checkpoints: Dict[str, Dict] = Field(default_factory=dict, description="Completed ingestion stages, used to resume retries")
     metadata: DocumentMetadata = Field(default_factory=DocumentMetadata, description="Document metadata")
     content_stats: ContentStats = Field(default_factory=ContentStats, description="Content statistics")
+    processing_metrics: Optional[ProcessingMetrics] = Field(None, description="Stage timings of the last processing attempt")
     processing_settings: ProcessingSettings = Field(default_factory=ProcessingSettings, description="Processing settings")
     version: int = Field(default=1, description="Document version")
     created_by: Optional[str] = Field(None, description="User who created the document")
@@ -77,6 +100,26 @@ class Document(MongoBaseModel):
         json_encoders = {ObjectId: str}
         allow_population_by_field_name = True
 
+class SkippedFile(BaseModel):
+    """Represents a file of a batch upload that was not ingested."""
+    name: str = Field(..., description="File or archive member name")
+    reason: str = Field(..., description="Why the file was skipped")
+
+class BatchUpload(BaseModel):
+    """Represents the result of a batch upload."""
+    batch_id: str = Field(..., description="Identifier for tracking the batch")
+    documents: List[Document] = Field(default_factory=list, description="Documents created")
+    skipped: List[SkippedFile] = Field(default_factory=list, description="Files that were not ingested, up to 100")
+    skipped_count: int = Field(default=0, description="Number of files that were not ingested")
+
+class BatchStatus(BaseModel):
+    """Represents the processing status of a batch upload."""
+    batch_id: str = Field(..., description="Batch identifier")
+    total: int = Field(default=0, description="Number of documents in the batch")
+    status_counts: Dict[str, int] = Field(default_factory=dict, description="Number of documents per status")
+    complete: bool = Field(default=False, description="Whether every document is processed or failed")
+    failed: List[Dict] = Field(default_factory=list, description="Failed documents with their errors")
+
 class ChunkPosition(BaseModel):
     """Represents position information for a chunk."""
     page_number: Optional[int] = Field(None, description="Page number")
@@ -96,7 +139,7 @@ class ChunkMetadata(BaseModel):
 class EmbeddingInfo(BaseModel):
     """Represents embedding information."""
     model: str = Field(..., description="Embedding model used")
-    vector: List[float] = Field(..., description="Vector embedding")
+    vector: Optional[List[float]] = Field(None, description="Vector embedding, omitted unless requested")
     dimensions: int = Field(..., description="Number of dimensions")
 
 class ChunkContentStats(BaseModel):
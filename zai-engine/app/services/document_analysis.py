@@ -1,7 +1,9 @@
 """Document analysis and processing utilities."""
 import re
 import nltk
-from typing import List, Dict, Tuple, Optional
+from array import array
+from bisect import bisect_left
+from typing import Any, List, Dict, Iterable, Iterator, Tuple, Optional
 from dataclasses import dataclass
 from langdetect import detect
 import spacy
@@ -13,6 +15,16 @@ nltk.download('averaged_perceptron_tagger')
 nltk.download('maxent_ne_chunker')
 nltk.download('words')
 
+def _load_sentence_tokenizer():
+    """Load the trained Punkt tokenizer used by nltk.sent_tokenize."""
+    try:
+        from nltk.tokenize import PunktTokenizer  # nltk >= 3.8.2
+        return PunktTokenizer('english')
+    except (ImportError, LookupError):
+        return nltk.data.load('tokenizers/punkt/english.pickle')
+
+sentence_tokenizer = _load_sentence_tokenizer()
+
 # Load spaCy model
 try:
     nlp = spacy.load('en_core_web_sm')
@@ -33,7 +45,15 @@ class TextSegment:
 class DocumentAnalyzer:
     """Analyzes document content and structure."""
     
-    def __init__(self):
+    # Chunk statistics only need sentences and noun chunks
+    chunk_analysis_disabled = ['ner', 'lemmatizer']
+    
+    def __init__(self, n_process: int = 1, batch_size: int = 64):
+        # nlp.pipe settings for batch chunk analysis
+        self.n_process = n_process
+        self.batch_size = batch_size
+        # Leading characters of a document used for metadata extraction
+        self.metadata_sample_size = 20000
         self.heading_patterns = [
             r'^#{1,6}\s+(.+)$',  # Markdown headings
             r'^(\d+\.)+\s+(.+)$',  # Numbered headings
@@ -85,13 +105,15 @@ class DocumentAnalyzer:
 
     def analyze_content(self, text: str) -> Dict:
         """Analyze content for statistics and key phrases."""
-        doc = nlp(text)
-        
+        return self._content_stats(text, nlp(text))
+
+    def _content_stats(self, text: str, doc, sentence_count: Optional[int] = None) -> Dict:
+        """Build content statistics from a parsed spaCy doc."""
         # Basic statistics
         stats = {
             'word_count': len(doc),
             'char_count': len(text),
-            'sentence_count': len(list(doc.sents)),
+            'sentence_count': sentence_count if sentence_count is not None else len(list(doc.sents)),
             'key_phrases': []
         }
         
@@ -106,8 +128,13 @@ class DocumentAnalyzer:
 
     def calculate_chunk_quality(self, chunk: str) -> Dict[str, float]:
         """Calculate quality metrics for a chunk."""
+        return self._quality_from_sentences(nltk.sent_tokenize(chunk))
+
+    def _quality_from_sentences(self, sentences: List[str]) -> Dict[str, float]:
+        """Calculate quality metrics from the sentences of a chunk."""
+        sentences = [s for s in sentences if s.strip()]
+        
         # Coherence score based on sentence flow
-        sentences = nltk.sent_tokenize(chunk)
         coherence_score = 1.0 if len(sentences) == 1 else min(1.0, len(sentences) / 10)
         
         # Completeness score based on sentence completeness
@@ -123,6 +150,108 @@ class DocumentAnalyzer:
             'relevance_score': relevance_score
         }
 
+    def iter_analysis(self, items: Iterable[Tuple[str, Any]]) -> Iterator[Tuple[str, Dict, Dict, Any]]:
+        """Analyze (text, context) pairs in a single nlp.pipe pass.
+
+        Yields (text, content_stats, quality, context). Word counts,
+        sentences, key phrases and quality metrics all come from the same
+        parse, with components the statistics do not use disabled.
+        """
+        disable = [name for name in self.chunk_analysis_disabled if name in nlp.pipe_names]
+        docs = nlp.pipe(
+            items,
+            as_tuples=True,
+            disable=disable,
+            n_process=self.n_process,
+            batch_size=self.batch_size
+        )
+        for doc, context in docs:
+            sentences = [sent.text for sent in doc.sents]
+            content_stats = self._content_stats(doc.text, doc, sentence_count=len(sentences))
+            yield doc.text, content_stats, self._quality_from_sentences(sentences), context
+
+    def analyze_batch(self, texts: List[str]) -> List[Dict]:
+        """Analyze many texts at once, returning content stats and quality for each."""
+        return [
+            {'content_stats': content_stats, 'quality': quality}
+            for _, content_stats, quality, _ in self.iter_analysis((text, None) for text in texts)
+        ]
+
+class BoundaryIndex:
+    """Sorted offsets of paragraph, sentence and word boundaries in a text.
+
+    The text is tokenized once; break points are then found by binary
+    search instead of re-tokenizing a window for every chunk.
+    """
+
+    def __init__(self, text: str):
+        self.length = len(text)
+        self.paragraphs = array('q', (m.start() for m in re.finditer(r'\n\n', text)))
+        self.sentences = array('q', (end for _, end in sentence_tokenizer.span_tokenize(text)))
+        self.words = array('q', (m.start() for m in re.finditer(r'\s+', text)))
+
+    @staticmethod
+    def _first_in(offsets: array, start: int, end: int) -> Optional[int]:
+        """Return the first offset in [start, end), if any."""
+        i = bisect_left(offsets, start)
+        if i < len(offsets) and offsets[i] < end:
+            return offsets[i]
+        return None
+
+    @staticmethod
+    def _last_in(offsets: array, start: int, end: int) -> Optional[int]:
+        """Return the last offset in [start, end), if any."""
+        i = bisect_left(offsets, end) - 1
+        if i >= 0 and offsets[i] >= start:
+            return offsets[i]
+        return None
+
+    def paragraph_after(self, position: int, limit: int) -> Optional[int]:
+        """First paragraph break in [position, position + limit)."""
+        return self._first_in(self.paragraphs, position, position + limit)
+
+    def sentence_near(self, position: int, limit: int, floor: int) -> Optional[int]:
+        """Sentence end closest after position, else before it (but past floor)."""
+        after = self._first_in(self.sentences, position, position + limit)
+        if after is not None:
+            return after
+        before = self._last_in(self.sentences, max(floor, position - limit), position)
+        return before
+
+    def word_after(self, position: int, limit: int) -> Optional[int]:
+        """First whitespace in [position, position + limit)."""
+        return self._first_in(self.words, position, position + limit)
+
+class SectionTracker:
+    """Builds the section structure of a document one page at a time."""
+
+    def __init__(self, analyzer: DocumentAnalyzer):
+        self.analyzer = analyzer
+        self.sections: List[Dict] = []
+        self.current_section: Optional[Dict] = None
+
+    def add_page(self, page_num: int, cells: Iterable[str]):
+        """Record the headings found among the cells of a page."""
+        for text in cells:
+            section_type, level = self.analyzer.identify_section_type(text)
+            if section_type == 'heading':
+                if self.current_section:
+                    self.current_section['end_page'] = page_num - 1
+                    self.sections.append(self.current_section)
+                self.current_section = {
+                    'title': text.strip(),
+                    'level': level,
+                    'start_page': page_num
+                }
+
+    def finish(self, page_count: int) -> List[Dict]:
+        """Close the last open section and return all sections."""
+        if self.current_section:
+            self.current_section['end_page'] = page_count
+            self.sections.append(self.current_section)
+            self.current_section = None
+        return self.sections
+
 class SmartChunker:
     """Implements intelligent document chunking strategies."""
     
@@ -132,79 +261,131 @@ class SmartChunker:
         self.max_chunk_size = 1000
         self.overlap_size = 50
     
-    def find_break_point(self, text: str, around_position: int) -> int:
+    @property
+    def lookahead(self) -> int:
+        """Characters past a chunk start needed to place its break point."""
+        return self.max_chunk_size + 200
+
+    def find_break_point(self, text: str, around_position: int, index: Optional[BoundaryIndex] = None,
+                         floor: int = 0) -> int:
         """Find the best position to break the text."""
+        if index is None:
+            index = BoundaryIndex(text)
+        
         # Try to break at paragraph
-        if '\n\n' in text[max(0, around_position-100):min(len(text), around_position+100)]:
-            return text.find('\n\n', around_position)
+        position = index.paragraph_after(around_position, 100)
+        if position is not None:
+            return position
         
         # Try to break at sentence
-        sentences = nltk.sent_tokenize(text[max(0, around_position-100):min(len(text), around_position+100)])
-        if sentences:
-            current_pos = 0
-            for sent in sentences:
-                current_pos += len(sent)
-                if current_pos >= 100:
-                    return around_position + current_pos
+        position = index.sentence_near(around_position, 100, floor)
+        if position is not None:
+            return position
         
         # Fall back to word boundary
-        words = text[max(0, around_position-50):min(len(text), around_position+50)].split()
-        if words:
-            return around_position + len(words[0])
+        position = index.word_after(around_position, 50)
+        if position is not None:
+            return position
         
         return around_position
 
+    def find_chunk_end(self, text: str, current_pos: int, index: Optional[BoundaryIndex] = None) -> int:
+        """Return the end position of the chunk starting at current_pos."""
+        # Determine chunk size based on content
+        if self.analyzer.identify_section_type(text[current_pos:current_pos + self.lookahead])[0] == 'heading':
+            target_size = self.min_chunk_size
+        else:
+            target_size = self.max_chunk_size
+        
+        # Find break point, never leaving a chunk shorter than the minimum
+        end_pos = self.find_break_point(
+            text, current_pos + target_size, index, floor=current_pos + self.min_chunk_size
+        )
+        if end_pos <= current_pos or end_pos > len(text):
+            end_pos = min(current_pos + self.max_chunk_size, len(text))
+        return end_pos
+
     def create_chunks(self, text: str, doc_id: str) -> List[Dict]:
         """Create intelligent chunks from text."""
-        chunks = []
+        return list(self.iter_chunks([text], doc_id))
+
+    def split(self, pages: Iterable[str]) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start_char, end_char, text) for each chunk of a page stream.
+
+        Only a window of a few lookaheads is kept in memory, and boundaries
+        are indexed once per window, so the total work is linear in the
+        length of the document.
+        """
+        pages = iter(pages)
+        buffer = ""
+        index = None
+        base = 0  # absolute offset of buffer[0]
         current_pos = 0
-        chunk_number = 0
-        
-        while current_pos < len(text):
-            # Determine chunk size based on content
-            if self.analyzer.identify_section_type(text[current_pos:])[0] == 'heading':
-                target_size = self.min_chunk_size
-            else:
-                target_size = self.max_chunk_size
-            
-            # Find break point
-            end_pos = self.find_break_point(text, current_pos + target_size)
-            if end_pos <= current_pos:
-                end_pos = min(current_pos + self.max_chunk_size, len(text))
-            
-            # Extract chunk content
-            chunk_text = text[current_pos:end_pos]
-            
-            # Analyze chunk
-            section_type, level = self.analyzer.identify_section_type(chunk_text)
-            content_stats = self.analyzer.analyze_content(chunk_text)
-            quality_metrics = self.analyzer.calculate_chunk_quality(chunk_text)
+        exhausted = False
+        
+        while True:
+            # Top up the window until the next break point is fully visible
+            while not exhausted and len(buffer) - (current_pos - base) < self.lookahead:
+                try:
+                    buffer += next(pages)
+                    index = None
+                except StopIteration:
+                    exhausted = True
             
-            # Create chunk
-            chunk = {
-                'document_id': doc_id,
-                'content': chunk_text,
-                'position': {
-                    'chunk_number': chunk_number,
-                    'start_char': current_pos,
-                    'end_char': end_pos
-                },
-                'metadata': {
-                    'section_type': section_type,
-                    'section_level': level,
-                    'section_number': chunk_number,
-                    'is_table_content': section_type == 'table',
-                    'is_figure_content': 'figure' in chunk_text.lower() or 'img' in chunk_text.lower(),
-                    'content_classification': 'technical' if section_type in ['code', 'table'] else 'narrative'
-                },
-                'content_stats': content_stats,
-                'quality': quality_metrics
-            }
+            start = current_pos - base
+            if start >= len(buffer):
+                break
             
-            chunks.append(chunk)
+            if index is None:
+                index = BoundaryIndex(buffer)
+            end = self.find_chunk_end(buffer, start, index)
+            yield current_pos, base + end, buffer[start:end]
+            if exhausted and end >= len(buffer):
+                break
             
             # Move position and handle overlap
-            current_pos = end_pos - self.overlap_size
-            chunk_number += 1
+            current_pos = max(base + end - self.overlap_size, current_pos + 1)
+            
+            # Drop text that no later chunk can reach; trimming only once the
+            # dead prefix dominates keeps the copying linear overall
+            if current_pos - base > max(self.lookahead, len(buffer) // 2):
+                buffer = buffer[current_pos - base:]
+                index = None
+                base = current_pos
+
+    def iter_chunks(self, pages: Iterable[str], doc_id: str) -> Iterator[Dict]:
+        """Create analyzed chunks from a stream of page texts.
+
+        All chunks of the document go through one streaming nlp.pipe call.
+        """
+        spans = ((chunk_text, (start_char, end_char)) for start_char, end_char, chunk_text in self.split(pages))
+        analyzed = self.analyzer.iter_analysis(spans)
+        for chunk_number, (chunk_text, content_stats, quality, (start_char, end_char)) in enumerate(analyzed):
+            yield self._build_chunk(
+                chunk_text, doc_id, chunk_number, start_char, end_char, content_stats, quality
+            )
+
+    def _build_chunk(self, chunk_text: str, doc_id: str, chunk_number: int, start_char: int, end_char: int,
+                     content_stats: Dict, quality_metrics: Dict) -> Dict:
+        """Build the record of an analyzed chunk."""
+        section_type, level = self.analyzer.identify_section_type(chunk_text)
         
-        return chunks 
\ No newline at end of file
+        return {
+            'document_id': doc_id,
+            'content': chunk_text,
+            'position': {
+                'chunk_number': chunk_number,
+                'start_char': start_char,
+                'end_char': end_char
+            },
+            'metadata': {
+                'section_type': section_type,
+                'section_level': level,
+                'section_number': chunk_number,
+                'is_table_content': section_type == 'table',
+                'is_figure_content': 'figure' in chunk_text.lower() or 'img' in chunk_text.lower(),
+                'content_classification': 'technical' if section_type in ['code', 'table'] else 'narrative'
+            },
+            'content_stats': content_stats,
+            'quality': quality_metrics
+        }
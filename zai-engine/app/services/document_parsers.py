@@ -0,0 +1,293 @@
+"""Lightweight parsers for formats that do not need docling's layout analysis.
+
+Every parser streams its input and writes the same page-per-line artifact
+as ``convert_document``. Cells are blocks that ``identify_section_type``
+recognises: headings are cells of their own, rendered Markdown-style
+(``## Title``), fenced code stays in one cell and table rows keep their
+pipes.
+"""
+import json
+import logging
+import os
+import re
+from functools import partial
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from app.services.parsing_pool import ParsedDocument
+
+logger = logging.getLogger(__name__)
+
+# Returns None when the file should be handed to docling instead
+ParserFunction = Callable[[str, str], Optional[ParsedDocument]]
+
+# Formats without real pages are split into pages of about this many characters
+PAGE_SIZE_CHARS = 3000
+
+READ_SIZE = 64 * 1024
+
+MARKDOWN_EXTENSIONS = {".md", ".markdown"}
+
+HEADING_LINE = re.compile(r'^#{1,6}\s+\S')
+FENCE_LINE = re.compile(r'^\s*(```|~~~)')
+
+def write_pages(pages: Iterable[List[str]], pages_path: str) -> ParsedDocument:
+    """Write pages of cells as a page-per-line JSON artifact."""
+    page_count = 0
+    with open(pages_path, "w", encoding="utf-8") as f:
+        for cells in pages:
+            f.write(json.dumps(cells, ensure_ascii=False))
+            f.write("\n")
+            page_count += 1
+    return ParsedDocument(page_count=page_count, pages_path=pages_path)
+
+def paginate(cells: Iterable[str], page_size: int = PAGE_SIZE_CHARS) -> Iterator[List[str]]:
+    """Group a stream of cells into pages of roughly ``page_size`` characters."""
+    page: List[str] = []
+    size = 0
+    for cell in cells:
+        page.append(cell)
+        size += len(cell)
+        if size >= page_size:
+            yield page
+            page, size = [], 0
+    if page:
+        yield page
+
+def iter_lines(file_path: str) -> Iterator[str]:
+    """Stream the lines of a text file, tolerating undecodable bytes."""
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+def iter_text_cells(lines: Iterable[str]) -> Iterator[str]:
+    """Split plain text into paragraph cells separated by blank lines."""
+    block: List[str] = []
+    for line in lines:
+        if line.strip():
+            block.append(line)
+        elif block:
+            yield "\n".join(block)
+            block = []
+    if block:
+        yield "\n".join(block)
+
+def iter_markdown_cells(lines: Iterable[str]) -> Iterator[str]:
+    """Split Markdown into headings, fenced code blocks and paragraph cells."""
+    block: List[str] = []
+    fence: List[str] = []
+    for line in lines:
+        if fence:
+            fence.append(line)
+            if FENCE_LINE.match(line):
+                yield "\n".join(fence)
+                fence = []
+            continue
+        if FENCE_LINE.match(line):
+            if block:
+                yield "\n".join(block)
+                block = []
+            fence = [line]
+        elif HEADING_LINE.match(line):
+            if block:
+                yield "\n".join(block)
+                block = []
+            yield line.strip()
+        elif line.strip():
+            block.append(line)
+        elif block:
+            yield "\n".join(block)
+            block = []
+    if fence:
+        yield "\n".join(fence)
+    if block:
+        yield "\n".join(block)
+
+def parse_text(file_path: str, pages_path: str) -> ParsedDocument:
+    """Parse a plain text file."""
+    return write_pages(paginate(iter_text_cells(iter_lines(file_path))), pages_path)
+
+def parse_markdown(file_path: str, pages_path: str) -> ParsedDocument:
+    """Parse a Markdown file."""
+    return write_pages(paginate(iter_markdown_cells(iter_lines(file_path))), pages_path)
+
+class HTMLCellParser(HTMLParser):
+    """Collects block-level HTML text as cells while the file is fed in pieces."""
+
+    BLOCK_TAGS = {
+        "p", "div", "section", "article", "header", "footer", "main", "aside",
+        "li", "dt", "dd", "blockquote", "pre", "tr", "caption", "figcaption",
+        "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr", "table", "ul", "ol"
+    }
+    SKIP_TAGS = {"script", "style", "head", "noscript", "template", "svg"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cells: List[str] = []
+        self._text: List[str] = []
+        self._row: Optional[List[str]] = None
+        self._block_tag: Optional[str] = None
+        self._skip_depth = 0
+        self._pre_depth = 0
+
+    def _flush(self):
+        if self._pre_depth:
+            text = "".join(self._text).strip("\n")
+        else:
+            text = " ".join("".join(self._text).split())
+        self._text = []
+        if not text:
+            return
+        tag = self._block_tag
+        if tag and tag[0] == "h" and tag[1:].isdigit():
+            text = f"{'#' * int(tag[1:])} {text}"
+        elif tag == "li":
+            text = f"- {text}"
+        elif tag == "blockquote":
+            text = f"> {text}"
+        elif tag == "pre":
+            text = f"```\n{text}\n```"
+        self.cells.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif self._skip_depth:
+            return
+        elif tag == "tr":
+            self._flush()
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._text = []
+        elif tag in self.BLOCK_TAGS and not self._pre_depth:
+            self._flush()
+            self._block_tag = tag
+            if tag == "pre":
+                self._pre_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif self._skip_depth:
+            return
+        elif tag in ("td", "th") and self._row is not None:
+            self._row.append(" ".join("".join(self._text).split()))
+            self._text = []
+        elif tag == "tr" and self._row is not None:
+            if any(self._row):
+                self.cells.append("| " + " | ".join(self._row) + " |")
+            self._row = None
+        elif tag == "pre" and self._pre_depth:
+            self._flush()
+            self._pre_depth -= 1
+            self._block_tag = None
+        elif tag in self.BLOCK_TAGS and not self._pre_depth:
+            self._flush()
+            self._block_tag = None
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+def iter_html_cells(file_path: str) -> Iterator[str]:
+    """Stream the cells of an HTML file."""
+    parser = HTMLCellParser()
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        while True:
+            data = f.read(READ_SIZE)
+            if not data:
+                break
+            parser.feed(data)
+            # Hand over finished cells so only the current block stays in memory
+            cells, parser.cells = parser.cells, []
+            yield from cells
+    parser.close()
+    yield from parser.cells
+
+def parse_html(file_path: str, pages_path: str) -> ParsedDocument:
+    """Parse an HTML file."""
+    return write_pages(paginate(iter_html_cells(file_path)), pages_path)
+
+def parse_pdf_text_layer(
+    file_path: str,
+    pages_path: str,
+    min_chars_per_page: int = 100,
+    max_sparse_page_ratio: float = 0.2
+) -> Optional[ParsedDocument]:
+    """Extract the embedded text layer of a PDF.
+
+    Pages with fewer than ``min_chars_per_page`` characters are sparse.
+    Covers, blank pages and figures are expected, so a few sparse pages are
+    kept as they are; when more than ``max_sparse_page_ratio`` of the pages
+    are sparse the PDF is treated as scanned and None is returned, so that
+    docling (with OCR and layout analysis) handles it.
+    """
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(file_path)
+    if reader.is_encrypted:
+        return None
+    page_count = len(reader.pages)
+    if page_count == 0:
+        return None
+
+    allowed = int(page_count * max_sparse_page_ratio)
+    sparse = 0
+    with open(pages_path, "w", encoding="utf-8") as f:
+        for page in reader.pages:
+            text = page.extract_text() or ""
+            if len(text.strip()) < min_chars_per_page:
+                sparse += 1
+                if sparse > allowed:
+                    logger.info(f"{file_path} has more than {allowed} of {page_count} pages without a usable text layer; using docling")
+                    break
+            cells = [line.strip() for line in text.splitlines() if line.strip()]
+            f.write(json.dumps(cells, ensure_ascii=False))
+            f.write("\n")
+    if sparse > allowed:
+        os.remove(pages_path)
+        return None
+    return ParsedDocument(page_count=page_count, pages_path=pages_path)
+
+class ParserRegistry:
+    """Maps MIME types to fast parsers; unmapped types go to docling."""
+
+    def __init__(self):
+        self._parsers: Dict[str, ParserFunction] = {}
+
+    def register(self, mime_types: Iterable[str], parser: ParserFunction):
+        """Use ``parser`` for each of ``mime_types``."""
+        for mime_type in mime_types:
+            self._parsers[mime_type] = parser
+
+    def get(self, mime_type: str, file_path: str = "") -> Optional[ParserFunction]:
+        """Fast parser for a file, if one is registered for its type."""
+        # libmagic reports Markdown as plain text
+        if mime_type == "text/plain" and os.path.splitext(file_path)[1].lower() in MARKDOWN_EXTENSIONS:
+            mime_type = "text/markdown"
+        return self._parsers.get(mime_type)
+
+def default_registry(
+    pdf_text_layer: bool = True,
+    min_pdf_chars_per_page: int = 100,
+    max_sparse_pdf_page_ratio: float = 0.2
+) -> ParserRegistry:
+    """Registry with the built-in text, Markdown, HTML and PDF parsers."""
+    registry = ParserRegistry()
+    registry.register(["text/plain"], parse_text)
+    registry.register(["text/markdown", "text/x-markdown"], parse_markdown)
+    registry.register(["text/html", "application/xhtml+xml"], parse_html)
+    if pdf_text_layer:
+        registry.register(
+            ["application/pdf"],
+            partial(
+                parse_pdf_text_layer,
+                min_chars_per_page=min_pdf_chars_per_page,
+                max_sparse_page_ratio=max_sparse_pdf_page_ratio
+            )
+        )
+    return registry
@@ -1,7 +1,12 @@
-from typing import List, Optional
+import asyncio
+import tarfile
+import uuid
+import zipfile
+from typing import AsyncIterator, Dict, List, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from fastapi import UploadFile, HTTPException
 from bson import ObjectId
+from pymongo import ReturnDocument
 from elasticsearch import AsyncElasticsearch, Elasticsearch
 import shutil
 import os
@@ -10,22 +15,47 @@ from langchain_openai import OpenAIEmbeddings
 from openai import OpenAI
 
 from app.core.database import db
-from app.models.document import Document, DocumentChunk
-from app.utils.file_utils import get_storage_path, save_upload_file
+from app.models.document import (
+    BatchStatus, BatchUpload, ContentStats, Document, DocumentChunk, DocumentMetadata, ProcessingSettings, SkippedFile
+)
+from app.services.embedding_cache import CachedEmbeddings, embedding_cache
+from app.services.es_indexer import ChunkIndexer
+from app.services.ingestion_events import (
+    TERMINAL_STATUSES, EventSubscription, IngestionEventBroker, ensure_events_collection
+)
+from app.utils.archive_utils import StoredFile, extract_archive, is_archive
+from app.utils.file_utils import UploadTooLargeError, get_storage_path, save_upload_file
+from app.utils.vector_utils import vector_to_list
 from config import config
 
+# Chunks per insert_many when copying the results of a duplicate upload
+CHUNK_COPY_BATCH_SIZE = 500
+
+# Failed documents listed in a batch status response
+BATCH_STATUS_MAX_FAILED = 100
+
+# Skipped files listed in a batch upload response; the rest are only counted
+BATCH_UPLOAD_MAX_SKIPPED = 100
+
+
 class DocumentService:
     def __init__(self):
         """Initialize document service."""
         self.db: AsyncIOMotorDatabase = None
         self.es: AsyncElasticsearch = None
+        self.indexer: ChunkIndexer = None
+        self.events: IngestionEventBroker = None
         
-        # Initialize embeddings with the new v0.3 format
-        self.embeddings = OpenAIEmbeddings(
-            api_key=config["openai"]["api_key"],
-            model="text-embedding-ada-002",
-            dimensions=1536,
-            show_progress_bar=True
+        # Initialize embeddings with the new v0.3 format; repeated queries hit the cache
+        self.embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(
+                api_key=config["openai"]["api_key"],
+                model="text-embedding-ada-002",
+                dimensions=1536,
+                show_progress_bar=True
+            ),
+            embedding_cache,
+            "text-embedding-ada-002"
         )
 
     async def connect(self):
@@ -33,6 +63,7 @@ class DocumentService:
         if self.db is None:
             await db.connect()
             self.db = db.get_database()
+            self.events = IngestionEventBroker(self.db, config["ingestion_events"]["collection"])
         
         if self.es is None:
             self.es = AsyncElasticsearch(
@@ -42,9 +73,13 @@ class DocumentService:
                     config["elasticsearch"]["connection"]["password"]
                 )
             )
+            self.indexer = ChunkIndexer(self.es, f"{config['elasticsearch']['index']['prefix']}_chunks")
 
     async def close(self):
         """Close database connections."""
+        if self.events is not None:
+            await self.events.close()
+            self.events = None
         if self.db is not None:
             await db.close()
             self.db = None
@@ -53,6 +88,18 @@ class DocumentService:
             await self.es.close()
             self.es = None
 
+    async def ensure_indexes(self):
+        """Create the MongoDB indexes used by upload deduplication and chunk reads."""
+        await self.connect()
+        await self.db.documents.create_index([("content_hash", 1), ("status", 1)])
+        await self.db.documents.create_index([("batch_id", 1), ("status", 1)])
+        await ensure_events_collection(
+            self.db,
+            config["ingestion_events"]["collection"],
+            config["ingestion_events"]["capped_size_bytes"]
+        )
+        await self.db.document_chunks.create_index("document_id")
+
     async def create_es_index(self):
         """Create Elasticsearch index with proper mapping for embeddings."""
         await self.connect()
@@ -110,33 +157,425 @@ class DocumentService:
             
             # Save file to uploads directory
             upload_path = get_storage_path(config["storage"]["directories"]["upload"])
-            file_path, mime_type = await save_upload_file(file, upload_path)
-            
-            # Get file size
-            file_size = os.path.getsize(file_path)
+            try:
+                file_path, mime_type, content_hash = await save_upload_file(
+                    file,
+                    upload_path,
+                    max_size=config["storage"]["limits"]["max_file_size"]
+                )
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
             
-            # Create document record with a new ObjectId
-            doc_id = ObjectId()
-            document = Document(
-                id=doc_id,
-                filename=file.filename,
-                original_name=file.filename,
+            document = await self._new_document(StoredFile(
+                name=file.filename,
                 file_path=file_path,
                 mime_type=mime_type,
-                size=file_size,
-                status="pending"
-            )
+                content_hash=content_hash,
+                size=os.path.getsize(file_path)
+            ))
             
             # Save initial document record
             await self.db.documents.insert_one(document.dict(by_alias=True))
             return document
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to create document: {str(e)}"
             )
 
+    async def _new_document(
+        self,
+        stored: StoredFile,
+        batch_id: Optional[str] = None,
+        duplicates: Optional[Dict[str, dict]] = None
+    ) -> Document:
+        """Build the record of a stored file, reusing results of identical content.
+
+        ``duplicates`` maps content hashes to processed documents already
+        looked up for a batch; without it the lookup is made here.
+        """
+        # Create document record with a new ObjectId
+        doc_id = ObjectId()
+        document = Document(
+            id=doc_id,
+            filename=stored.name,
+            original_name=stored.name,
+            file_path=stored.file_path,
+            content_hash=stored.content_hash,
+            mime_type=stored.mime_type,
+            size=stored.size,
+            batch_id=batch_id,
+            status="pending"
+        )
+
+        # Identical content already processed with the current model is not ingested again
+        if duplicates is None:
+            source = await self.find_processed_duplicate(stored.content_hash)
+        else:
+            source = duplicates.get(stored.content_hash)
+        if source is not None:
+            try:
+                await self.reuse_processed_results(source, document)
+            except Exception as e:
+                logging.error(f"Reusing results of document {source['_id']} failed, queueing upload: {str(e)}")
+                await self.db.document_chunks.delete_many({"document_id": str(doc_id)})
+                await self.indexer.delete_document(str(doc_id))
+                document.status = "pending"
+                document.duplicate_of = None
+        return document
+
+    async def create_batch(self, files: List[UploadFile]) -> BatchUpload:
+        """Store many uploaded files and archives and create their documents at once.
+
+        Archives (zip, tar, tar.gz, ...) are stream-extracted; members with a
+        type that is not allowed, over the size limit or past the batch limit
+        are reported as skipped instead of failing the whole batch. If the
+        batch fails, the files it stored are removed.
+        """
+        await self.connect()
+        limits = config["storage"]["limits"]
+        upload_path = get_storage_path(config["storage"]["directories"]["upload"])
+        batch_id = uuid.uuid4().hex
+        stored: List[StoredFile] = []
+        skipped: List[SkippedFile] = []
+        documents: List[Document] = []
+        try:
+            for file in files:
+                remaining = limits["max_batch_files"] - len(stored)
+                if is_archive(file.filename):
+                    try:
+                        archive_path, _, _ = await save_upload_file(file, upload_path, max_size=limits["max_archive_size"])
+                    except UploadTooLargeError as e:
+                        skipped.append(SkippedFile(name=file.filename, reason=str(e)))
+                        continue
+                    try:
+                        extracted, skipped_members = await asyncio.to_thread(
+                            extract_archive,
+                            archive_path,
+                            upload_path,
+                            limits["allowed_extensions"],
+                            limits["max_file_size"],
+                            remaining
+                        )
+                    except (zipfile.BadZipFile, tarfile.TarError) as e:
+                        skipped.append(SkippedFile(name=file.filename, reason=f"unreadable archive: {str(e)}"))
+                        continue
+                    finally:
+                        await asyncio.to_thread(os.remove, archive_path)
+                    stored.extend(extracted)
+                    skipped.extend(SkippedFile(**member) for member in skipped_members)
+                elif not any(file.filename.lower().endswith(ext) for ext in limits["allowed_extensions"]):
+                    skipped.append(SkippedFile(name=file.filename, reason="file type not allowed"))
+                elif remaining <= 0:
+                    skipped.append(SkippedFile(name=file.filename, reason=f"batch is limited to {limits['max_batch_files']} files"))
+                else:
+                    try:
+                        file_path, mime_type, content_hash = await save_upload_file(
+                            file,
+                            upload_path,
+                            max_size=limits["max_file_size"]
+                        )
+                    except UploadTooLargeError as e:
+                        skipped.append(SkippedFile(name=file.filename, reason=str(e)))
+                        continue
+                    stored.append(StoredFile(
+                        name=file.filename,
+                        file_path=file_path,
+                        mime_type=mime_type,
+                        content_hash=content_hash,
+                        size=os.path.getsize(file_path)
+                    ))
+
+            # One lookup for the duplicates of the whole batch
+            duplicates = await self.find_processed_duplicates([item.content_hash for item in stored])
+            for item in stored:
+                documents.append(await self._new_document(item, batch_id, duplicates))
+            if documents:
+                # One round trip for the whole batch
+                await self.db.documents.insert_many([document.dict(by_alias=True) for document in documents])
+        except BaseException:
+            await self._discard_batch(stored, documents)
+            raise
+
+        logging.info(f"Batch {batch_id}: {len(documents)} documents created, {len(skipped)} files skipped")
+        return BatchUpload(
+            batch_id=batch_id,
+            documents=documents,
+            skipped=skipped[:BATCH_UPLOAD_MAX_SKIPPED],
+            skipped_count=len(skipped)
+        )
+
+    async def _discard_batch(self, stored: List[StoredFile], documents: List[Document]):
+        """Remove the files and copied results of a batch that failed before it was recorded."""
+        logging.warning(f"Batch upload failed, removing {len(stored)} stored files")
+        for document in documents:
+            if document.duplicate_of is not None:
+                await self.db.document_chunks.delete_many({"document_id": str(document.id)})
+                await self.indexer.delete_document(str(document.id))
+        # Reused duplicates were moved to the processed directory
+        paths = {item.file_path for item in stored} | {document.file_path for document in documents}
+        for path in paths:
+            try:
+                await asyncio.to_thread(os.remove, path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.error(f"Could not remove {path}: {str(e)}")
+
+    async def get_batch_status(self, batch_id: str) -> Optional[BatchStatus]:
+        """Summarize the statuses of every document in a batch with one aggregation."""
+        await self.connect()
+        counts = {}
+        async for group in self.db.documents.aggregate([
+            {"$match": {"batch_id": batch_id}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]):
+            counts[group["_id"]] = group["count"]
+        if not counts:
+            return None
+
+        failed = []
+        if counts.get("failed"):
+            cursor = self.db.documents.find(
+                {"batch_id": batch_id, "status": "failed"},
+                {"filename": 1, "processing_error": 1}
+            ).limit(BATCH_STATUS_MAX_FAILED)
+            async for doc in cursor:
+                failed.append({
+                    "id": str(doc["_id"]),
+                    "filename": doc.get("filename"),
+                    "error": (doc.get("processing_error") or "").split("\n", 1)[0]
+                })
+
+        total = sum(counts.values())
+        return BatchStatus(
+            batch_id=batch_id,
+            total=total,
+            status_counts=counts,
+            complete=counts.get("processed", 0) + counts.get("failed", 0) == total,
+            failed=failed
+        )
+
+    async def count_documents_by_status(self) -> Dict[str, int]:
+        """Number of documents in each processing status."""
+        await self.connect()
+        counts = {}
+        async for group in self.db.documents.aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]):
+            counts[group["_id"]] = group["count"]
+        return counts
+
+    async def _replay(self, subscription: EventSubscription, last_event_id: Optional[str]) -> Optional[List[Dict]]:
+        """Events a reconnecting client missed, or None when they cannot all be replayed."""
+        if last_event_id is None or not ObjectId.is_valid(last_event_id):
+            return None
+        events = await self.events.events_after(subscription, ObjectId(last_event_id))
+        if events is None:
+            logging.info(f"Event {last_event_id} is no longer retained; resetting the client")
+        return events
+
+    async def stream_document_events(
+        self,
+        document: Document,
+        heartbeat_seconds: float,
+        last_event_id: Optional[str] = None
+    ) -> AsyncIterator[Optional[Dict]]:
+        """Yield the current state of a document, then its events until it finishes.
+
+        A client resuming from ``last_event_id`` gets the events it missed
+        instead of the state, or a ``reset`` event with the current state
+        when those events were already overwritten. ``None`` is yielded
+        whenever ``heartbeat_seconds`` pass without an event. A ``deleted``
+        event ends the stream if the document is removed.
+        """
+        await self.connect()
+        subscription = self.events.subscribe(document_id=str(document.id))
+        try:
+            # Read after subscribing so no update falls in between
+            replayed = await self._replay(subscription, last_event_id)
+            after = None
+            if replayed is None:
+                doc = await self.db.documents.find_one({"_id": document.id}, {"status": 1, "batch_id": 1, "processing_error": 1})
+                if doc is None:
+                    yield self._deleted_event(document)
+                    return
+                yield {
+                    "type": "snapshot" if last_event_id is None else "reset",
+                    "document_id": str(document.id),
+                    "batch_id": doc.get("batch_id"),
+                    "status": doc["status"],
+                    "error": doc.get("processing_error")
+                }
+                if doc["status"] in TERMINAL_STATUSES:
+                    return
+            else:
+                for event in replayed:
+                    after = event["_id"]
+                    yield self._event_payload(event)
+                    if event.get("status") in TERMINAL_STATUSES:
+                        return
+            async for event in self._next_events(subscription, heartbeat_seconds, after):
+                if event is None and await self.db.documents.count_documents({"_id": document.id}, limit=1) == 0:
+                    # Deleted while the client was waiting; nothing more will happen
+                    yield self._deleted_event(document)
+                    return
+                yield event
+                if event and event.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            self.events.unsubscribe(subscription)
+
+    @staticmethod
+    def _deleted_event(document: Document) -> Dict:
+        """Final event of a stream whose document no longer exists."""
+        return {"type": "deleted", "document_id": str(document.id), "batch_id": document.batch_id}
+
+    async def stream_batch_events(
+        self,
+        batch_id: str,
+        heartbeat_seconds: float,
+        last_event_id: Optional[str] = None
+    ) -> AsyncIterator[Optional[Dict]]:
+        """Yield the status counts of a batch, then its events until every document finishes.
+
+        Resuming from ``last_event_id`` works as for a single document.
+        """
+        await self.connect()
+        subscription = self.events.subscribe(batch_id=batch_id)
+        try:
+            # Documents still to finish, read after subscribing
+            unfinished = {
+                str(doc["_id"])
+                async for doc in self.db.documents.find(
+                    {"batch_id": batch_id, "status": {"$nin": list(TERMINAL_STATUSES)}},
+                    {"_id": 1}
+                )
+            }
+            replayed = await self._replay(subscription, last_event_id)
+            after = None
+            if replayed is None:
+                status = await self.get_batch_status(batch_id)
+                if status is None:
+                    # Every document of the batch was deleted
+                    yield {"type": "deleted", "batch_id": batch_id}
+                    return
+                yield {"type": "snapshot" if last_event_id is None else "reset", **status.dict()}
+            else:
+                for event in replayed:
+                    after = event["_id"]
+                    yield self._event_payload(event)
+            if not unfinished:
+                return
+            async for event in self._next_events(subscription, heartbeat_seconds, after):
+                yield event
+                if event and event.get("status") in TERMINAL_STATUSES:
+                    unfinished.discard(event["document_id"])
+                    if not unfinished:
+                        return
+        finally:
+            self.events.unsubscribe(subscription)
+
+    @staticmethod
+    def _event_payload(event: Dict) -> Dict:
+        """Serialize a stored ingestion event for clients."""
+        return {
+            "type": "progress" if event.get("status") is None else "status",
+            "id": str(event["_id"]),
+            "document_id": event["document_id"],
+            "batch_id": event.get("batch_id"),
+            "status": event.get("status"),
+            "progress": event.get("progress", {}),
+            "error": event.get("error"),
+            "timestamp": event["timestamp"].isoformat()
+        }
+
+    async def _next_events(
+        self,
+        subscription: EventSubscription,
+        heartbeat_seconds: float,
+        after: Optional[ObjectId] = None
+    ) -> AsyncIterator[Optional[Dict]]:
+        """Serialize queued events, yielding None as a heartbeat while idle.
+
+        Events up to ``after`` were already replayed and are skipped.
+        """
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if after is not None and event["_id"] <= after:
+                continue
+            yield self._event_payload(event)
+
+    async def find_processed_duplicate(self, content_hash: str) -> Optional[dict]:
+        """Find a processed document with the same content and embedding model."""
+        return await self.db.documents.find_one(
+            {
+                "content_hash": content_hash,
+                "status": "processed",
+                "duplicate_of": None,
+                "processing_settings.embedding_model": config["openai"]["model"]
+            },
+            sort=[("created_at", 1)]
+        )
+
+    async def find_processed_duplicates(self, content_hashes: List[str]) -> Dict[str, dict]:
+        """Find the processed document of each content hash with one query."""
+        duplicates: Dict[str, dict] = {}
+        if not content_hashes:
+            return duplicates
+        cursor = self.db.documents.find(
+            {
+                "content_hash": {"$in": list(set(content_hashes))},
+                "status": "processed",
+                "duplicate_of": None,
+                "processing_settings.embedding_model": config["openai"]["model"]
+            },
+            sort=[("created_at", 1)]
+        )
+        async for doc in cursor:
+            # The oldest document of each hash, as in find_processed_duplicate
+            duplicates.setdefault(doc["content_hash"], doc)
+        return duplicates
+
+    async def reuse_processed_results(self, source: dict, document: Document):
+        """Give a new document copies of the chunks and vectors of a processed one."""
+        source_id = str(source["_id"])
+        document_id = str(document.id)
+
+        # Copy chunks in batches; vectors are copied as stored (none, packed or arrays)
+        batch = []
+        async for chunk in self.db.document_chunks.find({"document_id": source_id}):
+            chunk.pop("_id")
+            chunk["document_id"] = document_id
+            batch.append(chunk)
+            if len(batch) >= CHUNK_COPY_BATCH_SIZE:
+                await self.db.document_chunks.insert_many(batch)
+                batch = []
+        if batch:
+            await self.db.document_chunks.insert_many(batch)
+        copied = await self.indexer.copy_document(source_id, document_id)
+
+        # The file is already on disk under a fresh name; move it like a processed upload
+        processed_path = get_storage_path(config["storage"]["directories"]["processed"])
+        os.makedirs(processed_path, exist_ok=True)
+        processed_file = os.path.join(processed_path, os.path.basename(document.file_path))
+        await asyncio.to_thread(shutil.move, document.file_path, processed_file)
+
+        document.file_path = processed_file
+        document.status = "processed"
+        document.duplicate_of = source_id
+        document.metadata = DocumentMetadata.parse_obj(source.get("metadata") or {})
+        document.content_stats = ContentStats.parse_obj(source.get("content_stats") or {})
+        document.processing_settings = ProcessingSettings.parse_obj(source.get("processing_settings") or {})
+        logging.info(f"Document {document_id} reuses {copied} indexed chunks of identical document {source_id}")
+
     async def list_documents(self) -> list[Document]:
         """List all documents."""
         await self.connect()
@@ -151,12 +590,35 @@ class DocumentService:
         await self.connect()
         doc = await self.db.documents.find_one({"_id": ObjectId(document_id)})
         return Document.parse_obj(doc) if doc else None
+
+    async def retry_document(self, document_id: str) -> Optional[Document]:
+        """Queue a failed document again; processing resumes from its checkpoints."""
+        await self.connect()
+        doc = await self.db.documents.find_one_and_update(
+            {"_id": ObjectId(document_id), "status": "failed"},
+            {
+                "$set": {"status": "pending", "attempts": 0},
+                "$unset": {"processing_error": "", "lease": ""}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            if await self.db.documents.count_documents({"_id": ObjectId(document_id)}, limit=1):
+                raise HTTPException(status_code=409, detail="Only failed documents can be retried")
+            return None
+        return Document.parse_obj(doc)
     
-    async def get_document_chunks(self, document_id: str) -> List[DocumentChunk]:
-        """Retrieve all chunks for a document."""
+    async def get_document_chunks(self, document_id: str, include_vectors: bool = False) -> List[DocumentChunk]:
+        """Retrieve all chunks for a document, without embedding vectors by default."""
         await self.connect()
-        cursor = self.db.document_chunks.find({"document_id": document_id})
+        projection = None if include_vectors else {"embedding.vector": 0}
+        cursor = self.db.document_chunks.find({"document_id": document_id}, projection)
         chunks = await cursor.to_list(length=None)
+        for chunk in chunks:
+            embedding = chunk.get("embedding") or {}
+            if embedding.get("vector") is not None:
+                # Packed float32 vectors are decoded for the response
+                embedding["vector"] = vector_to_list(embedding["vector"])
         return [DocumentChunk.parse_obj(chunk) for chunk in chunks]
 
     async def semantic_search(self, query: str, limit: int = 5) -> List[dict]:
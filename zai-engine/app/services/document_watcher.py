@@ -0,0 +1,96 @@
+"""Change-stream watcher that reports newly pending documents as they arrive."""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Server error codes meaning change streams cannot be used on this deployment
+# (standalone mongod, or a storage engine without majority read concern)
+UNSUPPORTED_CODES = {40573, 40414, 136}
+
+# Server error codes meaning the stored resume token is no longer usable
+RESUME_LOST_CODES = {260, 280, 286}
+
+PENDING_PIPELINE = [
+    {
+        "$match": {
+            "$or": [
+                {"operationType": "insert", "fullDocument.status": "pending"},
+                {"operationType": "update", "updateDescription.updatedFields.status": "pending"}
+            ]
+        }
+    },
+    {"$project": {"operationType": 1, "documentKey": 1}}
+]
+
+class ChangeStreamUnavailable(Exception):
+    """Raised when the MongoDB deployment does not support change streams."""
+    pass
+
+class PendingDocumentWatcher:
+    """Watches the documents collection for pending work and keeps a resume token."""
+
+    def __init__(self, db: AsyncIOMotorDatabase, state_key: str, max_await_ms: int = 1000):
+        self.db = db
+        self.state_key = f"change_stream:documents:{state_key}"
+        self.max_await_ms = max_await_ms
+
+    async def load_resume_token(self) -> Optional[Dict]:
+        """Return the last stored resume token, if any."""
+        state = await self.db.processor_state.find_one({"_id": self.state_key})
+        return state.get("resume_token") if state else None
+
+    async def save_resume_token(self, token: Dict):
+        """Persist the resume token of the last handled event."""
+        await self.db.processor_state.update_one(
+            {"_id": self.state_key},
+            {"$set": {"resume_token": token, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def clear_resume_token(self):
+        """Forget the stored resume token."""
+        await self.db.processor_state.delete_one({"_id": self.state_key})
+
+    async def watch(
+        self,
+        on_pending: Callable[[Dict], Awaitable[None]],
+        on_gap: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        """Call ``on_pending`` for every document that becomes pending.
+
+        ``on_gap`` is awaited whenever events may have been missed (no usable
+        resume token), so the caller can fall back to a one-off scan.
+        Raises ChangeStreamUnavailable when the server cannot open a change stream.
+        """
+        while True:
+            token = await self.load_resume_token()
+            if token is None and on_gap is not None:
+                await on_gap()
+            try:
+                async with self.db.documents.watch(
+                    PENDING_PIPELINE,
+                    resume_after=token,
+                    max_await_time_ms=self.max_await_ms
+                ) as stream:
+                    logger.info("Watching documents collection for pending documents")
+                    async for change in stream:
+                        await on_pending(change)
+                        await self.save_resume_token(stream.resume_token)
+            except OperationFailure as e:
+                if e.code in UNSUPPORTED_CODES:
+                    raise ChangeStreamUnavailable(str(e)) from e
+                if e.code in RESUME_LOST_CODES:
+                    logger.warning(f"Resume token is no longer valid, restarting stream: {str(e)}")
+                    await self.clear_resume_token()
+                    continue
+                raise
+            except PyMongoError as e:
+                # Network errors and elections: back off and resume from the token
+                logger.error(f"Change stream interrupted: {str(e)}")
+                await asyncio.sleep(1)
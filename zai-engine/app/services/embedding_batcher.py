@@ -0,0 +1,166 @@
+"""Token-aware embedding batching with concurrency and rate-limit control."""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken ships with langchain-openai
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+EmbedFunction = Callable[[List[str]], Awaitable[List[List[float]]]]
+BatchCallback = Callable[[List[str], List[List[float]]], Awaitable[None]]
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget shared by all callers.
+
+    Both budgets are token buckets that refill continuously; ``acquire``
+    waits until a request of the given size fits in both.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    async def acquire(self, tokens: int):
+        """Wait until one request carrying ``tokens`` tokens is within budget."""
+        if self.tokens_per_minute:
+            # A single oversized request may use the whole bucket
+            tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute and self._requests < 1:
+                    wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+                if wait <= 0:
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    if self.tokens_per_minute:
+                        self._tokens -= tokens
+                    return
+                await asyncio.sleep(wait)
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether an embedding API error is a 429 worth retrying."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+class EmbeddingBatcher:
+    """Packs texts into token-bounded batches and embeds them concurrently."""
+
+    def __init__(
+        self,
+        embed: EmbedFunction,
+        rate_limiter: Optional[RateLimiter] = None,
+        model: str = "text-embedding-ada-002",
+        max_batch_tokens: int = 50000,
+        max_batch_size: int = 512,
+        max_concurrency: int = 4,
+        max_retries: int = 5
+    ):
+        self.embed_fn = embed
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens the embedding API will bill for a text."""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        # Rough estimate for English text when tiktoken is unavailable
+        return len(text) // 4 + 1
+
+    def make_batches(self, texts: List[str], token_counts: Optional[List[int]] = None) -> List[List[int]]:
+        """Group text indices into batches bounded by token count and size."""
+        if token_counts is None:
+            token_counts = [self.count_tokens(text) for text in texts]
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for index, tokens in enumerate(token_counts):
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= self.max_batch_size):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _embed_batch(self, texts: List[str], tokens: int) -> List[List[float]]:
+        """Embed one batch, backing off on rate-limit errors."""
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(tokens)
+            try:
+                return await self.embed_fn(texts)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                delay = min(60.0, 2 ** attempt) + random.random()
+                logger.warning(f"Embedding rate limited, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def embed(
+        self,
+        texts: List[str],
+        on_batch: Optional[BatchCallback] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> List[List[float]]:
+        """Embed texts in batches, calling ``on_batch`` as each batch succeeds.
+
+        A failing batch does not cancel the others: every batch that can
+        finish is checkpointed through ``on_batch`` before the first error
+        is raised. ``usage`` accumulates the ``tokens`` and ``requests`` of
+        successful batches.
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        token_counts = [self.count_tokens(text) for text in texts]
+
+        async def run(indices: List[int]):
+            batch = [texts[i] for i in indices]
+            tokens = sum(token_counts[i] for i in indices)
+            async with self._semaphore:
+                vectors = await self._embed_batch(batch, tokens)
+            if usage is not None:
+                usage["tokens"] = usage.get("tokens", 0) + tokens
+                usage["requests"] = usage.get("requests", 0) + 1
+            for i, vector in zip(indices, vectors):
+                results[i] = vector
+            if on_batch is not None:
+                await on_batch(batch, vectors)
+
+        batches = self.make_batches(texts, token_counts)
+        outcomes = await asyncio.gather(*(run(indices) for indices in batches), return_exceptions=True)
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if errors:
+            logger.error(f"{len(errors)} of {len(batches)} embedding batches failed")
+            raise errors[0]
+        return results
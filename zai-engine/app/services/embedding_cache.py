@@ -0,0 +1,216 @@
+"""Content-hash embedding cache shared by ingestion and query paths."""
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.core.database import db
+from app.utils.vector_utils import VECTOR_DTYPE, pack_vector, unpack_vector
+from config import config
+
+logger = logging.getLogger(__name__)
+
+EmbedFunction = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+# Keys per $in query against the persistent tier
+LOOKUP_BATCH_SIZE = 1000
+
+class EmbeddingCache:
+    """Two-tier cache of embeddings keyed by (model, sha256(text)).
+
+    A bounded in-memory LRU sits in front of a MongoDB collection, so
+    repeated text (boilerplate, re-uploads, repeated queries) is embedded
+    only once per model. Both tiers hold vectors as float32 (about 6 KB
+    per 1536-dimension vector); they are returned as lists of floats.
+    """
+
+    def __init__(
+        self,
+        database: Optional[AsyncIOMotorDatabase] = None,
+        max_memory_entries: int = 10000,
+        collection_name: str = "embedding_cache",
+        persistent: bool = True
+    ):
+        self.db = database
+        self.max_memory_entries = max_memory_entries
+        self.collection_name = collection_name
+        self.persistent = persistent
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._counters = {"memory_hits": 0, "persistent_hits": 0, "misses": 0}
+        self._flushed = dict(self._counters)
+
+    async def connect(self):
+        """Establish database connection."""
+        if self.db is None and self.persistent:
+            await db.connect()
+            self.db = db.get_database()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        """Cache key for a text embedded with a model."""
+        return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert a float32 vector into the LRU tier, evicting the least recently used entry."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    async def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up embeddings; missing entries are returned as None."""
+        keys = [self.key(model, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        for key in keys:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                found[key] = vector.tolist()
+        self._counters["memory_hits"] += sum(1 for key in keys if key in found)
+
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing and self.persistent:
+            await self.connect()
+            collection = self.db[self.collection_name]
+            for i in range(0, len(missing), LOOKUP_BATCH_SIZE):
+                cursor = collection.find(
+                    {"_id": {"$in": missing[i:i + LOOKUP_BATCH_SIZE]}},
+                    {"vector": 1}
+                )
+                async for entry in cursor:
+                    stored = entry["vector"]
+                    # Entries written before vectors were packed hold plain arrays
+                    if isinstance(stored, (bytes, bytearray, memoryview)):
+                        vector = unpack_vector(stored)
+                    else:
+                        vector = np.asarray(stored, dtype=VECTOR_DTYPE)
+                    found[entry["_id"]] = vector.tolist()
+                    self._remember(entry["_id"], vector)
+            looked_up = set(missing)
+            self._counters["persistent_hits"] += sum(1 for key in keys if key in looked_up and key in found)
+
+        self._counters["misses"] += sum(1 for key in keys if key not in found)
+        return [found.get(key) for key in keys]
+
+    async def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        """Store embeddings in both tiers."""
+        entries = {}
+        for text, vector in zip(texts, vectors):
+            key = self.key(model, text)
+            self._remember(key, np.asarray(vector, dtype=VECTOR_DTYPE))
+            entries[key] = vector
+
+        if entries and self.persistent:
+            await self.connect()
+            now = datetime.utcnow()
+            collection = self.db[self.collection_name]
+            # Upserts keep concurrent writers of the same text from colliding
+            await collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": key},
+                        {"$setOnInsert": {
+                            "model": model,
+                            # Packed float32, like the vectors of document chunks
+                            "vector": pack_vector(vector),
+                            "dimensions": len(vector),
+                            "created_at": now
+                        }},
+                        upsert=True
+                    )
+                    for key, vector in entries.items()
+                ],
+                ordered=False
+            )
+
+    async def embed_documents(
+        self,
+        model: str,
+        texts: List[str],
+        embed: EmbedFunction,
+        store_results: bool = True
+    ) -> List[List[float]]:
+        """Return embeddings for texts, calling ``embed`` only for cache misses.
+
+        Pass ``store_results=False`` when ``embed`` already writes its results
+        to the cache, e.g. batch by batch.
+        """
+        vectors = await self.get_many(model, texts)
+
+        # Identical texts within one request are embedded once
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            new_vectors = await embed(missing)
+            if store_results:
+                await self.put_many(model, missing, new_vectors)
+            by_text = dict(zip(missing, new_vectors))
+            vectors = [vector if vector is not None else by_text[text] for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def stats(self) -> Dict:
+        """Hit and miss counters for this process."""
+        hits = self._counters["memory_hits"] + self._counters["persistent_hits"]
+        lookups = hits + self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory)
+        }
+
+    async def flush_stats(self, source: str):
+        """Add counters accumulated since the last flush to the shared totals."""
+        if not self.persistent:
+            return
+        delta = {name: value - self._flushed[name] for name, value in self._counters.items()}
+        if not any(delta.values()):
+            return
+        await self.connect()
+        await self.db[f"{self.collection_name}_stats"].update_one(
+            {"_id": source},
+            {"$inc": delta, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self._flushed = dict(self._counters)
+
+    async def persisted_stats(self) -> List[Dict]:
+        """Counter totals flushed by every process, by source."""
+        if not self.persistent:
+            return []
+        await self.connect()
+        cursor = self.db[f"{self.collection_name}_stats"].find()
+        return await cursor.to_list(length=None)
+
+class CachedEmbeddings:
+    """Wraps a LangChain embeddings client with an EmbeddingCache."""
+
+    def __init__(self, embeddings, cache: EmbeddingCache, model: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, serving repeated texts from the cache."""
+        return await self.cache.embed_documents(self.model, texts, self.embeddings.aembed_documents)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query string, serving repeated queries from the cache."""
+        async def embed(texts: List[str]) -> List[List[float]]:
+            return [await self.embeddings.aembed_query(texts[0])]
+        return (await self.cache.embed_documents(self.model, [text], embed))[0]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several query strings with one batched request for the misses."""
+        return await self.cache.embed_documents(self.model, texts, self.embeddings.aembed_documents)
+
+# Cache shared by the API services of this process
+embedding_cache = EmbeddingCache(
+    max_memory_entries=config["embedding_cache"]["memory_entries"],
+    collection_name=config["embedding_cache"]["collection"],
+    persistent=config["embedding_cache"]["persistent"]
+)
@@ -1,27 +1,50 @@
 """Enhanced RAG service with hybrid search capabilities using Haystack 2.x."""
 from typing import Dict, List, Optional
 from haystack import Pipeline, Document
-from haystack.components.embedders import OpenAITextEmbedder
 from haystack_integrations.components.retrievers.elasticsearch import (
     ElasticsearchBM25Retriever,
     ElasticsearchEmbeddingRetriever
 )
 from haystack.components.generators import OpenAIGenerator
 from haystack.components.builders import PromptBuilder
-from haystack.components.joiners import DocumentJoiner
 from haystack.components.rankers import TransformersSimilarityRanker
 from haystack.utils import Secret
 from haystack_integrations.document_stores.elasticsearch import ElasticsearchDocumentStore
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+from elasticsearch import AsyncElasticsearch
+from langchain_openai import OpenAIEmbeddings
 
+from app.services.embedding_cache import CachedEmbeddings, embedding_cache
+from app.ai.llm.providers.base import BaseLLMProvider
 from app.services.llm_service import LLMService
+from app.services.pipeline_cache import PipelineCache, config_fingerprint
+from app.services.hybrid_search import MultiQueryRetriever
+from app.services.rag_components import BoundedRanker, WeightedFusion, reciprocal_rank_fusion
 from app.core.database import db
 from config import config
-from app.services.query_service import QueryService, QueryIntent
+from app.services.query_service import EnhancedQuery, QueryService, QueryIntent
 from app.services.response_service import ResponseService, ResponseStyle
 
+# Fields and boosts of keyword (BM25) retrieval
+KEYWORD_FIELDS = {
+    # Primary content fields
+    "content": 1.0,
+    "content.english": 0.8,
+
+    # Important structural metadata
+    "metadata.section_type": 1.2,
+    "metadata.section_level": 1.1,
+    "metadata.content_classification": 1.1,
+
+    # Quality-based boosting
+    "quality.coherence_score": 0.8,
+    "quality.completeness_score": 0.8
+}
+
 class WeightValidationError(Exception):
     """Exception raised for invalid weight configurations."""
     pass
@@ -57,6 +80,21 @@ class SearchWeights:
                 f"Weights must sum to 1.0, got {total:.2f}"
             )
 
+@dataclass
+class RetrievalResult:
+    """Reranked documents for a query, with the analysis that shaped the search."""
+    query: str
+    documents: List[Document]
+    enhanced_query: EnhancedQuery
+    weights: SearchWeights
+
+    def weights_dict(self) -> Dict[str, float]:
+        return {
+            "semantic": self.weights.semantic_weight,
+            "keyword": self.weights.keyword_weight,
+            "rerank": self.weights.rerank_weight
+        }
+
 class EnhancedRAGService:
     """Enhanced RAG service using Haystack 2.x pipeline architecture."""
     
@@ -64,12 +102,36 @@ class EnhancedRAGService:
         """Initialize enhanced RAG service."""
         self.llm_service = LLMService()
         self.document_store = None
-        self.pipeline = None
-        self.current_llm_id = None
+        self.multi_query_retriever: Optional[MultiQueryRetriever] = None
+        # Retrieval does not depend on the LLM; only generation does
+        self.retrieval_pipeline: Optional[Pipeline] = None
+        self._retrieval_lock = asyncio.Lock()
         self.query_service = QueryService()
         self.response_service = ResponseService()
+
+        # Haystack pipelines and query analysis are synchronous; they run here
+        # so that a slow query does not block the event loop
+        self.rag_settings = config["rag"]
+        # Generation pipelines of recently used LLMs; they share the retrieval pipeline
+        self.generation_pipelines = PipelineCache(self.rag_settings["max_generation_pipelines"])
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.rag_settings["pipeline_workers"],
+            thread_name_prefix="rag-pipeline"
+        )
+        
+        # Query embeddings are computed outside the pipeline so they can be cached
+        self.embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(
+                api_key=config["openai"]["api_key"],
+                model="text-embedding-ada-002"
+            ),
+            embedding_cache,
+            "text-embedding-ada-002"
+        )
+        # Defaults for queries that do not set their own; the shared pipeline
+        # never holds per-query state, so concurrent queries cannot interfere
         try:
-            self.current_weights = SearchWeights()
+            self.default_weights = SearchWeights()
         except WeightValidationError as e:
             raise RuntimeError(f"Invalid default weights: {str(e)}")
         
@@ -86,79 +148,84 @@ class EnhancedRAGService:
 
         Answer: """
 
-    async def initialize(self, llm_id: str):
-        """Initialize Haystack 2.x pipeline with multiple retrievers."""
-        # Get LLM provider
-        provider = await self.llm_service.get_provider(llm_id)
-        if not provider:
-            raise ValueError(f"Failed to initialize LLM provider: {llm_id}")
-        
-        # Initialize document store
-        self.document_store = ElasticsearchDocumentStore(
-            hosts=[config["elasticsearch"]["connection"]["url"]],
-            basic_auth=(
-                config["elasticsearch"]["connection"]["user"],
-                config["elasticsearch"]["connection"]["password"]
-            ),
-            index=f"{config['elasticsearch']['index']['prefix']}_chunks"
-        )
-        
-        # Initialize pipeline components
-        embedder = OpenAITextEmbedder(
-            api_key=Secret.from_token(config["openai"]["api_key"]),
-            model_name="text-embedding-ada-002"
-        )
-        
-        # Initialize retrievers with enhanced metadata fields
-        semantic_retriever = ElasticsearchEmbeddingRetriever(
-            document_store=self.document_store,
-            top_k=5,
-            embedding_field="embedding",
-            metadata_fields=[
-                "section_type",
-                "section_level",
-                "content_classification",
-                "quality.coherence_score",
-                "quality.completeness_score"
-            ]
-        )
-        
-        keyword_retriever = ElasticsearchBM25Retriever(
-            document_store=self.document_store,
-            top_k=5,
-            fields={
-                # Primary content fields
-                "content": 1.0,
-                "content.english": 0.8,
-                
-                # Important structural metadata
-                "metadata.section_type": 1.2,
-                "metadata.section_level": 1.1,
-                "metadata.content_classification": 1.1,
-                
-                # Quality-based boosting
-                "quality.coherence_score": 0.8,
-                "quality.completeness_score": 0.8
-            }
-        )
-        
-        # Initialize re-ranker
-        reranker = TransformersSimilarityRanker(
-            model_name_or_path="cross-encoder/ms-marco-MiniLM-L-6-v2",
-            top_k=5
-        )
-        
-        # Initialize document joiner with validated weights
-        joiner = DocumentJoiner(
-            join_mode="reciprocal_rank_fusion",
-            weights={
-                "semantic": self.current_weights.semantic_weight,
-                "keyword": self.current_weights.keyword_weight
-            }
-        )
-        
-        # Initialize prompt builder and generator
-        prompt_builder = PromptBuilder(template=self.prompt_template)
+    async def initialize_retrieval(self):
+        """Build the retrieval pipeline shared by every LLM; later calls return at once."""
+        async with self._retrieval_lock:
+            if self.retrieval_pipeline is not None:
+                return
+
+            # Initialize document store
+            self.document_store = ElasticsearchDocumentStore(
+                hosts=[config["elasticsearch"]["connection"]["url"]],
+                basic_auth=(
+                    config["elasticsearch"]["connection"]["user"],
+                    config["elasticsearch"]["connection"]["password"]
+                ),
+                index=f"{config['elasticsearch']['index']['prefix']}_chunks"
+            )
+
+            # Initialize retrievers with enhanced metadata fields
+            semantic_retriever = ElasticsearchEmbeddingRetriever(
+                document_store=self.document_store,
+                top_k=5,
+                embedding_field="embedding",
+                metadata_fields=[
+                    "section_type",
+                    "section_level",
+                    "content_classification",
+                    "quality.coherence_score",
+                    "quality.completeness_score"
+                ]
+            )
+
+            keyword_retriever = ElasticsearchBM25Retriever(
+                document_store=self.document_store,
+                top_k=5,
+                fields=KEYWORD_FIELDS
+            )
+
+            # Sub-queries of complex questions are searched together in one _msearch
+            self.multi_query_retriever = MultiQueryRetriever(
+                AsyncElasticsearch(
+                    hosts=[config["elasticsearch"]["connection"]["url"]],
+                    basic_auth=(
+                        config["elasticsearch"]["connection"]["user"],
+                        config["elasticsearch"]["connection"]["password"]
+                    )
+                ),
+                f"{config['elasticsearch']['index']['prefix']}_chunks",
+                KEYWORD_FIELDS
+            )
+
+            # Initialize re-ranker
+            reranker = BoundedRanker(
+                TransformersSimilarityRanker(
+                    model_name_or_path="cross-encoder/ms-marco-MiniLM-L-6-v2",
+                    top_k=5
+                ),
+                max_concurrency=self.rag_settings["rerank_concurrency"]
+            )
+
+            # Fuse both result lists with weights given per run
+            joiner = WeightedFusion()
+
+            pipeline = Pipeline()
+            pipeline.add_component("semantic_retriever", semantic_retriever)
+            pipeline.add_component("keyword_retriever", keyword_retriever)
+            pipeline.add_component("joiner", joiner)
+            pipeline.add_component("reranker", reranker)
+            pipeline.connect("semantic_retriever.documents", "joiner.semantic_documents")
+            pipeline.connect("keyword_retriever.documents", "joiner.keyword_documents")
+            pipeline.connect("joiner.documents", "reranker.documents")
+
+            # Load the cross-encoder now rather than inside the first query
+            await self._run_blocking(pipeline.warm_up)
+            self.retrieval_pipeline = pipeline
+
+    def _build_generation_pipeline(self, provider: BaseLLMProvider) -> Pipeline:
+        """Build the prompt builder and generator pipeline of an LLM."""
+        # Templates are given per run
+        prompt_builder = PromptBuilder(template=self.prompt_template, variables=["query", "documents"])
         generator = OpenAIGenerator(
             api_key=Secret.from_token(provider.api_key),
             model=provider.model_name,
@@ -167,60 +234,61 @@ class EnhancedRAGService:
                 "temperature": provider.temperature
             }
         )
-        
-        # Create pipeline
-        self.pipeline = Pipeline()
-        
-        # Add components
-        self.pipeline.add_component("embedder", embedder)
-        self.pipeline.add_component("semantic_retriever", semantic_retriever)
-        self.pipeline.add_component("keyword_retriever", keyword_retriever)
-        self.pipeline.add_component("joiner", joiner)
-        self.pipeline.add_component("reranker", reranker)
-        self.pipeline.add_component("prompt_builder", prompt_builder)
-        self.pipeline.add_component("generator", generator)
-        
-        # Connect components
-        self.pipeline.connect("embedder.embedding", "semantic_retriever.query_embedding")
-        self.pipeline.connect("semantic_retriever.documents", "joiner.documents_1")
-        self.pipeline.connect("keyword_retriever.documents", "joiner.documents_2")
-        self.pipeline.connect("joiner.documents", "reranker.documents")
-        self.pipeline.connect("reranker.documents", "prompt_builder.documents")
-        self.pipeline.connect("prompt_builder", "generator")
-        
-        self.current_llm_id = llm_id
 
-    def update_weights(self, weights: Dict[str, float]):
-        """Update search weights with validation."""
+        pipeline = Pipeline()
+        pipeline.add_component("prompt_builder", prompt_builder)
+        pipeline.add_component("generator", generator)
+        pipeline.connect("prompt_builder", "generator")
+        return pipeline
+
+    async def initialize(self, llm_id: str) -> Pipeline:
+        """Return the generation pipeline of an LLM, building what is missing.
+
+        The LLM config is read on every call, so a pipeline whose config was
+        edited is rebuilt and a deactivated LLM is refused.
+        """
+        # Get LLM provider
+        provider = await self.llm_service.get_provider(llm_id)
+        if not provider:
+            raise ValueError(f"Failed to initialize LLM provider: {llm_id}")
+
+        await self.initialize_retrieval()
+
+        return self.generation_pipelines.get(
+            llm_id,
+            config_fingerprint(provider.config),
+            partial(self._build_generation_pipeline, provider)
+        )
+
+    def invalidate_llm(self, llm_id: Optional[str] = None):
+        """Drop the cached generation pipeline of one LLM, or of all LLMs."""
+        self.generation_pipelines.invalidate(llm_id)
+
+    async def _run_blocking(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a synchronous call in the pipeline executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    def resolve_weights(self, weights: Optional[Dict[str, float]] = None) -> SearchWeights:
+        """Validate weights for one query, filling gaps from the defaults."""
+        weights = weights or {}
         try:
-            # Create and validate new weights
-            new_weights = SearchWeights(
-                semantic_weight=weights.get("semantic", self.current_weights.semantic_weight),
-                keyword_weight=weights.get("keyword", self.current_weights.keyword_weight),
-                rerank_weight=weights.get("rerank", self.current_weights.rerank_weight)
+            return SearchWeights(
+                semantic_weight=weights.get("semantic", self.default_weights.semantic_weight),
+                keyword_weight=weights.get("keyword", self.default_weights.keyword_weight),
+                rerank_weight=weights.get("rerank", self.default_weights.rerank_weight)
             )
-            
-            if self.pipeline:
-                # Update joiner weights
-                joiner = self.pipeline.get_component("joiner")
-                joiner.weights = {
-                    "semantic": new_weights.semantic_weight,
-                    "keyword": new_weights.keyword_weight
-                }
-                
-                # Update reranker weight
-                reranker = self.pipeline.get_component("reranker")
-                reranker.weight = new_weights.rerank_weight
-                
-                self.current_weights = new_weights
-                
         except WeightValidationError as e:
             raise ValueError(f"Invalid weight configuration: {str(e)}")
 
+    def update_weights(self, weights: Dict[str, float]):
+        """Change the default search weights used by queries without their own."""
+        self.default_weights = self.resolve_weights(weights)
+
     def _optimize_context_window(self, documents: List[Document], query: str) -> List[Document]:
         """Optimize context window for better answer generation."""
         # Sort by score
-        ranked_docs = sorted(documents, key=lambda x: x.score, reverse=True)
+        ranked_docs = sorted(documents, key=lambda x: x.score or 0.0, reverse=True)
         
         # Calculate optimal window size
         total_tokens = sum(len(doc.content.split()) for doc in ranked_docs)
@@ -247,155 +315,211 @@ class EnhancedRAGService:
         
         return selected_docs
 
-    async def query(self, query: str, **kwargs) -> Dict:
-        """Execute RAG query using Haystack 2.x pipeline."""
-        if not self.pipeline:
-            raise RuntimeError("Pipeline not initialized. Call initialize() first.")
-        
-        try:
-            # Get parameters
-            top_k = kwargs.get("top_k", 5)
-            
-            # Enhance query
-            enhanced_query = await self.query_service.enhance_query(query)
-            
-            # Adjust weights based on query intent and complexity
-            if enhanced_query.context.intent in [QueryIntent.TECHNICAL, QueryIntent.ANALYTICAL]:
-                weights = {
-                    "semantic": 0.6,
-                    "keyword": 0.2,
-                    "rerank": 0.2
-                }
-            elif enhanced_query.context.intent == QueryIntent.FACTUAL:
-                weights = {
-                    "semantic": 0.3,
-                    "keyword": 0.5,
-                    "rerank": 0.2
-                }
-            else:
-                weights = kwargs.get("weights", {
-                    "semantic": 0.4,
-                    "keyword": 0.4,
-                    "rerank": 0.2
-                })
-            
-            self.update_weights(weights)
-            
-            # Update retrievers' top_k
-            self.pipeline.get_component("semantic_retriever").top_k = top_k
-            self.pipeline.get_component("keyword_retriever").top_k = top_k
-            self.pipeline.get_component("reranker").top_k = top_k
-            
-            # Process sub-queries if they exist
-            if enhanced_query.sub_queries:
-                all_results = []
-                for sub_query in enhanced_query.sub_queries:
-                    result = self.pipeline.run({
-                        "embedder": {"text": sub_query},
-                        "keyword_retriever": {"query": sub_query},
-                        "prompt_builder": {"query": sub_query}
-                    })
-                    all_results.extend(result["reranker"]["documents"])
-                
-                # Deduplicate and sort results
-                seen = set()
-                unique_results = []
-                for doc in sorted(all_results, key=lambda x: x.score, reverse=True):
-                    if doc.content not in seen:
-                        seen.add(doc.content)
-                        unique_results.append(doc)
-                results = unique_results[:top_k]
-            else:
-                # Run pipeline with enhanced query
-                result = self.pipeline.run({
-                    "embedder": {"text": enhanced_query.expanded},
-                    "keyword_retriever": {"query": enhanced_query.expanded},
-                    "prompt_builder": {"query": query}  # Use original query for answer generation
-                })
-                results = result["reranker"]["documents"]
-            
-            # Optimize context window
-            optimized_results = self._optimize_context_window(results, query)
-            
-            # Get appropriate response style and prompt template
-            response_style = self.response_service._determine_style(
-                query, 
-                {"is_technical": enhanced_query.context.is_technical}
+    async def _retrieve_sub_queries(
+        self,
+        query: str,
+        sub_queries: List[str],
+        top_k: int,
+        weights: Dict[str, float]
+    ) -> List[Document]:
+        """Retrieve for all sub-queries at once and rerank the union against the query.
+
+        One batched embedding request and one _msearch replace a pipeline run
+        per sub-query, so latency stays close to that of a single query.
+        """
+        embeddings = await self.embeddings.aembed_queries(sub_queries)
+        semantic, keyword = await self.multi_query_retriever.retrieve(sub_queries, embeddings, top_k)
+
+        # Each sub-query gets an equal share of the semantic and keyword weights
+        ranked_lists = semantic + keyword
+        list_weights = (
+            [weights["semantic"] / len(sub_queries)] * len(semantic)
+            + [weights["keyword"] / len(sub_queries)] * len(keyword)
+        )
+        candidates = reciprocal_rank_fusion(ranked_lists, list_weights, top_k=top_k * len(sub_queries))
+
+        reranked = await self._run_blocking(
+            self.retrieval_pipeline.get_component("reranker").run,
+            query=query,
+            documents=candidates,
+            top_k=len(candidates)
+        )
+
+        # The same passage can be stored under several documents
+        seen = set()
+        results = []
+        for doc in reranked["documents"]:
+            if doc.content not in seen:
+                seen.add(doc.content)
+                results.append(doc)
+        return results[:top_k]
+
+    async def retrieve(
+        self,
+        query: str,
+        top_k: int = 5,
+        weights: Optional[Dict[str, float]] = None
+    ) -> RetrievalResult:
+        """Find and rerank the documents for a query, without calling an LLM."""
+        if self.retrieval_pipeline is None:
+            raise RuntimeError("Retrieval pipeline not initialized. Call initialize_retrieval() first.")
+
+        # Enhance query
+        enhanced_query = await self._run_blocking(self.query_service.enhance, query)
+
+        # Adjust weights based on query intent and complexity
+        if enhanced_query.context.intent in [QueryIntent.TECHNICAL, QueryIntent.ANALYTICAL]:
+            weights = {
+                "semantic": 0.6,
+                "keyword": 0.2,
+                "rerank": 0.2
+            }
+        elif enhanced_query.context.intent == QueryIntent.FACTUAL:
+            weights = {
+                "semantic": 0.3,
+                "keyword": 0.5,
+                "rerank": 0.2
+            }
+        elif weights is None:
+            weights = {
+                "semantic": 0.4,
+                "keyword": 0.4,
+                "rerank": 0.2
+            }
+
+        search_weights = self.resolve_weights(weights)
+        fusion_weights = {
+            "semantic": search_weights.semantic_weight,
+            "keyword": search_weights.keyword_weight
+        }
+
+        # Process sub-queries if they exist
+        if enhanced_query.sub_queries:
+            documents = await self._retrieve_sub_queries(
+                query, enhanced_query.sub_queries, top_k, fusion_weights
             )
-            prompt_template = self.response_service.get_prompt_template(response_style)
-            
-            # Update prompt template for answer generation
-            self.pipeline.get_component("prompt_builder").template = prompt_template
-            
-            # Generate answer with optimized context
-            final_result = self.pipeline.run({
-                "prompt_builder": {
-                    "query": query,
-                    "documents": optimized_results
-                }
+        else:
+            query_embedding = await self.embeddings.aembed_query(enhanced_query.expanded)
+            result = await self._run_blocking(self.retrieval_pipeline.run, {
+                "semantic_retriever": {"query_embedding": query_embedding, "top_k": top_k},
+                "keyword_retriever": {"query": enhanced_query.expanded, "top_k": top_k},
+                "joiner": {"weights": fusion_weights},
+                # Rerank against the original question
+                "reranker": {"query": query, "top_k": top_k}
             })
-            
-            # Format response
-            formatted_response = self.response_service.format_response(
-                answer=final_result["generator"]["replies"][0],
-                documents=[{
-                    "content": doc.content,
-                    "score": doc.score,
-                    "meta": doc.meta
-                } for doc in optimized_results],
-                query=query,
-                context={
-                    "is_technical": enhanced_query.context.is_technical,
-                    "intent": enhanced_query.context.intent.value,
-                    "complexity": enhanced_query.context.complexity
+            documents = result["reranker"]["documents"]
+
+        return RetrievalResult(
+            query=query,
+            documents=documents,
+            enhanced_query=enhanced_query,
+            weights=search_weights
+        )
+
+    async def generate(
+        self,
+        query: str,
+        documents: List[Document],
+        llm_id: str,
+        enhanced_query: Optional[EnhancedQuery] = None
+    ) -> Dict:
+        """Answer a query from given documents with exactly one LLM call."""
+        pipeline = await self.initialize(llm_id)
+        if enhanced_query is None:
+            enhanced_query = await self._run_blocking(self.query_service.enhance, query)
+
+        # Optimize context window
+        optimized_results = self._optimize_context_window(documents, query)
+
+        # Get appropriate response style and prompt template
+        response_style = self.response_service._determine_style(
+            query,
+            {"is_technical": enhanced_query.context.is_technical}
+        )
+        prompt_template = self.response_service.get_prompt_template(response_style)
+
+        # Generate answer with optimized context and the template of this query
+        final_result = await self._run_blocking(pipeline.run, {
+            "prompt_builder": {
+                "query": query,
+                "documents": optimized_results,
+                "template": prompt_template
+            }
+        })
+
+        # Format response
+        formatted_response = self.response_service.format_response(
+            answer=final_result["generator"]["replies"][0],
+            documents=[{
+                "content": doc.content,
+                "score": doc.score,
+                "meta": doc.meta
+            } for doc in optimized_results],
+            query=query,
+            context={
+                "is_technical": enhanced_query.context.is_technical,
+                "intent": enhanced_query.context.intent.value,
+                "complexity": enhanced_query.context.complexity
+            }
+        )
+
+        return {
+            "answer": formatted_response.answer,
+            "formatted_answer": formatted_response.formatted_answer,
+            "sources": [
+                {
+                    "content": source.content,
+                    "score": source.score,
+                    "document_id": source.document_id,
+                    "section": source.section,
+                    "page": source.page
                 }
+                for source in formatted_response.sources
+            ],
+            "metadata": {
+                "response_style": formatted_response.style.value,
+                "context_window": formatted_response.context_window,
+                "query": self.query_metadata(enhanced_query)
+            },
+            "llm_id": llm_id
+        }
+
+    @staticmethod
+    def query_metadata(enhanced_query: EnhancedQuery) -> Dict:
+        """Describe the query analysis for API responses."""
+        return {
+            "original": enhanced_query.original,
+            "enhanced": enhanced_query.expanded,
+            "intent": enhanced_query.context.intent.value,
+            "complexity": enhanced_query.context.complexity,
+            "is_technical": enhanced_query.context.is_technical,
+            "sub_queries": enhanced_query.sub_queries
+        }
+
+    async def query(self, query: str, llm_id: str, **kwargs) -> Dict:
+        """Retrieve documents for a query and answer it from them with an LLM."""
+        try:
+            await self.initialize_retrieval()
+            retrieval = await self.retrieve(
+                query,
+                top_k=kwargs.get("top_k") or 5,
+                weights=kwargs.get("weights")
             )
-            
-            # Prepare final response
-            return {
-                "answer": formatted_response.answer,
-                "formatted_answer": formatted_response.formatted_answer,
-                "sources": [
-                    {
-                        "content": source.content,
-                        "score": source.score,
-                        "document_id": source.document_id,
-                        "section": source.section,
-                        "page": source.page
-                    }
-                    for source in formatted_response.sources
-                ],
-                "metadata": {
-                    "response_style": formatted_response.style.value,
-                    "context_window": formatted_response.context_window,
-                    "query": {
-                        "original": query,
-                        "enhanced": enhanced_query.expanded,
-                        "intent": enhanced_query.context.intent.value,
-                        "complexity": enhanced_query.context.complexity,
-                        "is_technical": enhanced_query.context.is_technical,
-                        "sub_queries": enhanced_query.sub_queries
-                    },
-                    "weights": {
-                        "semantic": self.current_weights.semantic_weight,
-                        "keyword": self.current_weights.keyword_weight,
-                        "rerank": self.current_weights.rerank_weight
-                    }
-                },
-                "llm_id": self.current_llm_id
-            }
-            
+            response = await self.generate(query, retrieval.documents, llm_id, retrieval.enhanced_query)
+            response["metadata"]["weights"] = retrieval.weights_dict()
+            return response
         except Exception as e:
             raise RuntimeError(f"Enhanced RAG pipeline error: {str(e)}")
 
     def update_prompt_template(self, template: str):
-        """Update the prompt template used by the RAG pipeline."""
-        if self.pipeline:
-            prompt_builder = self.pipeline.get_component("prompt_builder")
-            prompt_builder.template = template
+        """Change the default prompt template used when building generation pipelines."""
         self.prompt_template = template
+        self.generation_pipelines.invalidate()
 
     async def close(self):
         """Close connections."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.multi_query_retriever:
+            await self.multi_query_retriever.close()
         if self.document_store:
             await self.document_store.close() 
\ No newline at end of file
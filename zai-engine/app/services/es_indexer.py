@@ -0,0 +1,174 @@
+"""Size-bounded bulk indexing of chunks into Elasticsearch."""
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_streaming_bulk
+
+logger = logging.getLogger(__name__)
+
+# Failed items kept in a report; the rest are only counted
+MAX_REPORTED_FAILURES = 50
+
+@dataclass
+class BulkIndexReport:
+    """Outcome of one indexing call, with the error of each failed item."""
+    indexed: int = 0
+    failed: int = 0
+    errors: List[Dict] = field(default_factory=list)
+
+class BulkIndexError(Exception):
+    """Raised when some items of a bulk indexing call were rejected."""
+
+    def __init__(self, report: BulkIndexReport):
+        self.report = report
+        first = report.errors[0] if report.errors else {}
+        super().__init__(
+            f"{report.failed} of {report.indexed + report.failed} chunks failed to index "
+            f"(first error on {first.get('id')}: {first.get('error')})"
+        )
+
+class ChunkIndexer:
+    """Streams chunk documents into the chunks index in bounded bulk requests.
+
+    Requests never force a refresh; new chunks become searchable on the
+    index's refresh interval, or when a backfill finishes.
+    """
+
+    def __init__(
+        self,
+        es: AsyncElasticsearch,
+        index: str,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        max_retries: int = 3
+    ):
+        self.es = es
+        self.index_name = index
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_retries = max_retries
+
+    def _actions(self, docs: Iterable[Tuple[str, Dict]]):
+        for doc_id, source in docs:
+            yield {"_op_type": "index", "_index": self.index_name, "_id": doc_id, "_source": source}
+
+    async def index(
+        self,
+        docs: Iterable[Tuple[str, Dict]],
+        raise_on_error: bool = True,
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> BulkIndexReport:
+        """Index ``(id, source)`` pairs, reporting failures per item.
+
+        ``on_progress`` is awaited with the running count of indexed items
+        every ``chunk_size`` items. Raises BulkIndexError when any item failed and
+        ``raise_on_error`` is set.
+        """
+        report = BulkIndexReport()
+        async for ok, item in async_streaming_bulk(
+            self.es,
+            self._actions(docs),
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_chunk_bytes,
+            max_retries=self.max_retries,
+            raise_on_error=False,
+            raise_on_exception=True
+        ):
+            if ok:
+                report.indexed += 1
+                if on_progress is not None and report.indexed % self.chunk_size == 0:
+                    await on_progress(report.indexed)
+                continue
+            report.failed += 1
+            if len(report.errors) < MAX_REPORTED_FAILURES:
+                result = item.get("index", {})
+                report.errors.append({
+                    "id": result.get("_id"),
+                    "status": result.get("status"),
+                    "error": result.get("error")
+                })
+
+        if report.failed:
+            logger.error(f"Bulk indexing into {self.index_name}: {report.failed} failed, {report.indexed} indexed")
+            if raise_on_error:
+                raise BulkIndexError(report)
+        return report
+
+    async def copy_document(self, source_document_id: str, target_document_id: str) -> int:
+        """Copy the chunks of one document to another inside Elasticsearch.
+
+        Uses a server-side reindex, so vectors never leave the cluster.
+        Returns the number of chunks copied.
+        """
+        response = await self.es.reindex(
+            source={"index": self.index_name, "query": {"term": {"document_id": source_document_id}}},
+            dest={"index": self.index_name, "op_type": "create"},
+            script={
+                "lang": "painless",
+                "source": (
+                    "ctx._id = params.document_id + ':' + ctx._id; "
+                    "ctx._source.chunk_id = ctx._id; "
+                    "ctx._source.document_id = params.document_id"
+                ),
+                "params": {"document_id": target_document_id}
+            },
+            wait_for_completion=True
+        )
+        if response.get("failures"):
+            raise BulkIndexError(BulkIndexReport(
+                indexed=response.get("created", 0),
+                failed=len(response["failures"]),
+                errors=[
+                    {"id": failure.get("id"), "status": failure.get("status"), "error": failure.get("cause")}
+                    for failure in response["failures"][:MAX_REPORTED_FAILURES]
+                ]
+            ))
+        return response.get("created", 0)
+
+    async def delete_document(self, document_id: str):
+        """Delete every chunk of a document, including chunks not yet refreshed."""
+        # delete_by_query only sees searchable chunks, and neither index() nor
+        # a backfill refreshes, so an interrupted attempt's chunks would survive
+        await self.es.indices.refresh(index=self.index_name, ignore_unavailable=True)
+        await self.es.delete_by_query(
+            index=self.index_name,
+            query={"term": {"document_id": document_id}},
+            ignore_unavailable=True,
+            refresh=True
+        )
+
+    async def _index_settings(self) -> Dict:
+        """Current refresh interval and replica count of the index."""
+        response = await self.es.indices.get_settings(
+            index=self.index_name,
+            flat_settings=True,
+            include_defaults=True
+        )
+        settings = response[self.index_name]
+        values = {**settings.get("defaults", {}), **settings.get("settings", {})}
+        return {
+            "refresh_interval": values.get("index.refresh_interval", "1s"),
+            "number_of_replicas": values.get("index.number_of_replicas", "1")
+        }
+
+    @asynccontextmanager
+    async def backfill(self) -> AsyncIterator["ChunkIndexer"]:
+        """Disable refreshes and replicas while bulk loading, then restore them.
+
+        The index is refreshed once on exit, whether or not the load succeeded.
+        """
+        original = await self._index_settings()
+        logger.info(f"Backfill mode on {self.index_name} (restoring {original} afterwards)")
+        await self.es.indices.put_settings(
+            index=self.index_name,
+            settings={"index": {"refresh_interval": "-1", "number_of_replicas": 0}}
+        )
+        try:
+            yield self
+        finally:
+            await self.es.indices.put_settings(index=self.index_name, settings={"index": original})
+            await self.es.indices.refresh(index=self.index_name)
+            logger.info(f"Backfill mode off on {self.index_name}")
@@ -0,0 +1,79 @@
+"""Semantic and keyword retrieval for many queries in one Elasticsearch round trip."""
+import logging
+from typing import Dict, List, Tuple
+
+from elasticsearch import AsyncElasticsearch
+from haystack import Document
+
+logger = logging.getLogger(__name__)
+
+class MultiQueryRetriever:
+    """Runs a kNN and a BM25 search per query as one ``_msearch`` request."""
+
+    def __init__(
+        self,
+        es: AsyncElasticsearch,
+        index: str,
+        keyword_fields: Dict[str, float],
+        embedding_field: str = "embedding"
+    ):
+        self.es = es
+        self.index = index
+        self.keyword_fields = [f"{name}^{boost}" for name, boost in keyword_fields.items()]
+        self.embedding_field = embedding_field
+
+    def _searches(self, queries: List[str], embeddings: List[List[float]], top_k: int) -> List[Dict]:
+        """Header and body pairs: the kNN search, then the BM25 search, of each query."""
+        searches = []
+        for query, embedding in zip(queries, embeddings):
+            searches.append({"index": self.index})
+            searches.append({
+                "size": top_k,
+                "knn": {
+                    "field": self.embedding_field,
+                    "query_vector": embedding,
+                    "k": top_k,
+                    "num_candidates": top_k * 10
+                },
+                "_source": {"excludes": [self.embedding_field]}
+            })
+            searches.append({"index": self.index})
+            searches.append({
+                "size": top_k,
+                "query": {
+                    "multi_match": {
+                        "query": query,
+                        "fields": self.keyword_fields,
+                        "type": "most_fields",
+                        # Numeric and keyword fields must not fail a text query
+                        "lenient": True
+                    }
+                },
+                "_source": {"excludes": [self.embedding_field]}
+            })
+        return searches
+
+    @staticmethod
+    def _to_documents(response: Dict) -> List[Document]:
+        if "error" in response:
+            raise RuntimeError(f"Search failed: {response['error'].get('reason', response['error'])}")
+        documents = []
+        for hit in response["hits"]["hits"]:
+            source = dict(hit["_source"])
+            content = source.pop("content", "")
+            documents.append(Document(id=hit["_id"], content=content, meta=source, score=hit["_score"]))
+        return documents
+
+    async def retrieve(
+        self,
+        queries: List[str],
+        embeddings: List[List[float]],
+        top_k: int
+    ) -> Tuple[List[List[Document]], List[List[Document]]]:
+        """Return the semantic and the keyword results of each query, in query order."""
+        response = await self.es.msearch(searches=self._searches(queries, embeddings, top_k))
+        results = [self._to_documents(item) for item in response["responses"]]
+        return results[0::2], results[1::2]
+
+    async def close(self):
+        await self.es.close()
@@ -0,0 +1,88 @@
+"""On-disk outputs of ingestion stages, so a retry resumes where the last attempt stopped."""
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Stages in the order they complete; each is recorded under ``checkpoints.<stage>``
+STAGES = ["parsed", "chunked", "embedded", "indexed"]
+
+def _json_default(value):
+    # spaCy and numpy scores are numpy scalars
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class CheckpointStore:
+    """Artifact files holding the output of each completed stage of a document.
+
+    - parsed: page-per-line JSON text (written by the parser)
+    - chunked: chunks with section structure and document metadata, as JSON
+    - embedded: chunk embeddings as a float32 ``.npy`` matrix
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, doc_id: str, suffix: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{doc_id}.{suffix}")
+
+    def pages_path(self, doc_id: str) -> str:
+        """Path of the page-per-line text artifact of a document."""
+        return self._path(doc_id, "pages.jsonl")
+
+    def chunks_path(self, doc_id: str) -> str:
+        """Path of the chunks artifact of a document."""
+        return self._path(doc_id, "chunks.json")
+
+    def embeddings_path(self, doc_id: str) -> str:
+        """Path of the embeddings artifact of a document."""
+        return self._path(doc_id, "embeddings.npy")
+
+    def save_chunks(self, doc_id: str, state: Dict):
+        """Write chunking output, replacing any previous file atomically."""
+        path = self.chunks_path(doc_id)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, default=_json_default)
+        os.replace(f"{path}.tmp", path)
+
+    def load_chunks(self, doc_id: str) -> Optional[Dict]:
+        """Read chunking output, or None if it is missing or unreadable."""
+        path = self.chunks_path(doc_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable chunks artifact {path}: {str(e)}")
+            return None
+
+    def save_embeddings(self, doc_id: str, vectors: List[List[float]]):
+        """Write chunk embeddings as a float32 matrix."""
+        path = self.embeddings_path(doc_id)
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, np.asarray(vectors, dtype=np.float32))
+        os.replace(f"{path}.tmp", path)
+
+    def load_embeddings(self, doc_id: str) -> Optional[List[List[float]]]:
+        """Read chunk embeddings, or None if they are missing or unreadable."""
+        path = self.embeddings_path(doc_id)
+        try:
+            return np.load(path).tolist()
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable embeddings artifact {path}: {str(e)}")
+            return None
+
+    def remove(self, doc_id: str):
+        """Delete every artifact of a document."""
+        for path in (self.pages_path(doc_id), self.chunks_path(doc_id), self.embeddings_path(doc_id)):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,151 @@
+"""Ingestion progress events published by the processor and streamed to API clients."""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which a document emits no more events
+TERMINAL_STATUSES = {"processed", "failed"}
+
+async def ensure_events_collection(db: AsyncIOMotorDatabase, collection_name: str, size_bytes: int):
+    """Create the capped events collection if it does not exist yet."""
+    try:
+        await db.create_collection(collection_name, capped=True, size=size_bytes)
+    except CollectionInvalid:
+        pass
+
+class IngestionEventPublisher:
+    """Appends status and progress events of documents to a capped collection."""
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection_name: str = "ingestion_events"):
+        self.collection = db[collection_name]
+
+    async def publish(
+        self,
+        doc: Dict,
+        status: Optional[str] = None,
+        progress: Optional[Dict[str, int]] = None,
+        error: Optional[str] = None
+    ):
+        """Record an event; failures are logged, never raised into ingestion."""
+        event = {
+            "document_id": str(doc["_id"]),
+            "batch_id": doc.get("batch_id"),
+            "status": status,
+            "progress": progress or {},
+            "error": error,
+            "timestamp": datetime.utcnow()
+        }
+        try:
+            await self.collection.insert_one(event)
+        except PyMongoError as e:
+            logger.warning(f"Could not publish ingestion event for {event['document_id']}: {str(e)}")
+
+class EventSubscription:
+    """Events for one document or one batch, delivered through a queue."""
+
+    def __init__(self, document_id: Optional[str] = None, batch_id: Optional[str] = None, max_queued: int = 1000):
+        self.document_id = document_id
+        self.batch_id = batch_id
+        self.queue: "asyncio.Queue[Dict]" = asyncio.Queue(maxsize=max_queued)
+
+    def query(self) -> Dict:
+        """Filter selecting the stored events of this subscription."""
+        if self.document_id is not None:
+            return {"document_id": self.document_id}
+        return {"batch_id": self.batch_id}
+
+    def matches(self, event: Dict) -> bool:
+        if self.document_id is not None:
+            return event.get("document_id") == self.document_id
+        return event.get("batch_id") == self.batch_id
+
+    def deliver(self, event: Dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client must not hold up the others; drop its oldest event
+            self.queue.get_nowait()
+            self.queue.put_nowait(event)
+
+class IngestionEventBroker:
+    """Tails the events collection once per process and fans events out to subscribers."""
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection_name: str = "ingestion_events"):
+        self.collection = db[collection_name]
+        self._subscriptions: Set[EventSubscription] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _tail(self):
+        """Follow the capped collection with a tailable cursor until cancelled."""
+        last_id = ObjectId.from_datetime(datetime.utcnow())
+        while True:
+            try:
+                cursor = self.collection.find(
+                    {"_id": {"$gt": last_id}},
+                    cursor_type=CursorType.TAILABLE_AWAIT
+                )
+                while cursor.alive:
+                    async for event in cursor:
+                        last_id = event["_id"]
+                        for subscription in list(self._subscriptions):
+                            if subscription.matches(event):
+                                subscription.deliver(event)
+                # A tailable cursor on an empty result dies at once; retry shortly
+                await asyncio.sleep(0.5)
+            except PyMongoError as e:
+                logger.error(f"Ingestion event tail interrupted: {str(e)}")
+                await asyncio.sleep(1)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, document_id: Optional[str] = None, batch_id: Optional[str] = None) -> EventSubscription:
+        """Start receiving events for a document or a batch.
+
+        Events published from this point on are queued, so a snapshot read
+        after subscribing cannot miss an update.
+        """
+        subscription = EventSubscription(document_id=document_id, batch_id=batch_id)
+        self._subscriptions.add(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._tail(), name="ingestion-event-tail")
+        return subscription
+
+    async def events_after(self, subscription: EventSubscription, after_id: ObjectId) -> Optional[List[Dict]]:
+        """Stored events of a subscription published after ``after_id``, oldest first.
+
+        Returns None when the capped collection no longer holds ``after_id``:
+        events that followed it may have been overwritten, so they cannot be
+        replayed completely.
+        """
+        oldest = await self.collection.find_one({}, {"_id": 1}, sort=[("$natural", 1)])
+        if oldest is None or oldest["_id"] > after_id:
+            return None
+        cursor = self.collection.find(
+            {**subscription.query(), "_id": {"$gt": after_id}},
+            sort=[("$natural", 1)]
+        )
+        return await cursor.to_list(length=None)
+
+    def unsubscribe(self, subscription: EventSubscription):
+        """Stop delivering events to a subscription."""
+        self._subscriptions.discard(subscription)
+
+    async def close(self):
+        """Stop tailing the events collection."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
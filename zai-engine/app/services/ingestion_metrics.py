@@ -0,0 +1,77 @@
+"""Per-document stage timings and Prometheus metrics for ingestion."""
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Steps timed inside the parse, embed and store worker pool stages
+TIMED_STAGES = ("parse", "analyze", "embed", "store_mongo", "store_es", "finalize")
+
+# Statuses reported by the document count gauge even when no document has them
+DOCUMENT_STATUSES = ("pending", "parsing", "generating_embeddings", "processed", "failed")
+
+STAGE_SECONDS = Histogram(
+    "zai_ingestion_stage_seconds",
+    "Time one document spent in an ingestion stage",
+    ["stage"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+STAGE_ERRORS = Counter("zai_ingestion_stage_errors_total", "Ingestion failures by the stage they occurred in", ["stage"])
+DOCUMENTS = Counter("zai_ingestion_documents_total", "Documents that left the processor, by outcome", ["status"])
+IN_FLIGHT = Gauge("zai_ingestion_documents_in_flight", "Documents claimed by this processor and not finished")
+QUEUE_DEPTH = Gauge("zai_ingestion_queue_depth", "Documents waiting in front of a worker pool stage", ["stage"])
+DOCUMENT_COUNTS = Gauge("zai_documents", "Documents in the database by status", ["status"])
+
+COUNTERS = {
+    "pages": Counter("zai_ingestion_pages_total", "Pages parsed"),
+    "chunks": Counter("zai_ingestion_chunks_total", "Chunks stored and indexed"),
+    "cached_chunks": Counter("zai_ingestion_cached_chunks_total", "Chunks whose embedding came from the cache"),
+    "embedding_tokens": Counter("zai_ingestion_embedding_tokens_total", "Tokens sent to the embeddings API"),
+    "embedding_requests": Counter("zai_ingestion_embedding_requests_total", "Requests made to the embeddings API")
+}
+
+@dataclass
+class IngestionMetrics:
+    """Stage timings and counters of one document, stored with it when it finishes."""
+    stages: Dict[str, float] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    failed_stage: Optional[str] = None
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Add the duration of a block to a stage; a raising block marks the stage failed."""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.failed_stage = stage
+            STAGE_ERRORS.labels(stage=stage).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stages[stage] = round(self.stages.get(stage, 0.0) + elapsed, 4)
+            STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+
+    def count(self, name: str, value: int = 1):
+        """Add to a document counter and the matching process-wide counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+        COUNTERS[name].inc(value)
+
+    def to_dict(self, total_seconds: float) -> Dict:
+        chunks = self.counters.get("chunks", 0)
+        return {
+            "stages": self.stages,
+            "counters": self.counters,
+            "total_seconds": round(total_seconds, 4),
+            "chunks_per_second": round(chunks / total_seconds, 2) if total_seconds and chunks else None,
+            "failed_stage": self.failed_stage,
+            "finished_at": datetime.utcnow()
+        }
+
+def set_document_counts(counts: Dict[str, int]):
+    """Publish the number of documents per status."""
+    for status in set(DOCUMENT_STATUSES) | set(counts):
+        DOCUMENT_COUNTS.labels(status=status).set(counts.get(status, 0))
@@ -0,0 +1,134 @@
+"""Staged worker pool for concurrent document ingestion."""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Marker pushed through a stage queue to tell one worker to exit
+_STOP = object()
+
+StageHandler = Callable[[Any], Awaitable[Optional[Any]]]
+ErrorHandler = Callable[[str, Any, BaseException], Awaitable[None]]
+
+@dataclass
+class Stage:
+    """A single ingestion stage and the number of workers serving it."""
+    name: str
+    handler: StageHandler
+    workers: int = 1
+
+class IngestionWorkerPool:
+    """Runs items through a chain of stages with bounded queues between them.
+
+    Each stage has its own queue and worker tasks. A handler returns the item
+    to hand to the next stage, or None to drop it. Because every queue is
+    bounded, a slow stage applies backpressure all the way to ``submit``.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        queue_size: int = 8,
+        max_in_flight: Optional[int] = None,
+        on_error: Optional[ErrorHandler] = None
+    ):
+        if not stages:
+            raise ValueError("At least one stage is required")
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[List[asyncio.Task]] = []
+        self._in_flight = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self._started = False
+
+    @property
+    def started(self) -> bool:
+        """Whether worker tasks are running."""
+        return self._started
+
+    def queue_depths(self) -> dict:
+        """Return the number of items waiting in front of each stage."""
+        return {stage.name: queue.qsize() for stage, queue in zip(self.stages, self._queues)}
+
+    async def start(self):
+        """Create the stage queues and spawn workers."""
+        if self._started:
+            return
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._workers = []
+        for index, stage in enumerate(self.stages):
+            self._workers.append([
+                asyncio.create_task(self._worker(index), name=f"ingest-{stage.name}-{n}")
+                for n in range(max(1, stage.workers))
+            ])
+        self._started = True
+        logger.info(
+            "Ingestion pool started: "
+            + ", ".join(f"{stage.name}={max(1, stage.workers)}" for stage in self.stages)
+        )
+
+    async def submit(self, item: Any):
+        """Queue an item for the first stage, waiting while the pool is saturated."""
+        if not self._started:
+            raise RuntimeError("Worker pool not started. Call start() first.")
+        if self._in_flight:
+            await self._in_flight.acquire()
+        await self._queues[0].put(item)
+
+    async def join(self):
+        """Wait until every submitted item has left the last stage."""
+        # Workers enqueue downstream before marking their input done, so
+        # joining the queues in order observes every item.
+        for queue in self._queues:
+            await queue.join()
+
+    async def shutdown(self, drain: bool = True):
+        """Stop all workers, optionally letting queued items finish first."""
+        if not self._started:
+            return
+        if drain:
+            for index, queue in enumerate(self._queues):
+                for _ in self._workers[index]:
+                    await queue.put(_STOP)
+                await asyncio.gather(*self._workers[index], return_exceptions=True)
+        else:
+            tasks = [task for stage_tasks in self._workers for task in stage_tasks]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._started = False
+        logger.info("Ingestion pool stopped")
+
+    async def _worker(self, index: int):
+        """Consume items for one stage and forward results downstream."""
+        stage = self.stages[index]
+        queue = self._queues[index]
+        is_last = index == len(self.stages) - 1
+
+        while True:
+            item = await queue.get()
+            try:
+                if item is _STOP:
+                    return
+                forwarded = False
+                try:
+                    result = await stage.handler(item)
+                    if result is not None and not is_last:
+                        await self._queues[index + 1].put(result)
+                        forwarded = True
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Stage '{stage.name}' failed: {str(e)}")
+                    if self.on_error:
+                        try:
+                            await self.on_error(stage.name, item, e)
+                        except Exception as handler_error:
+                            logger.error(f"Error handler failed: {str(handler_error)}")
+                if not forwarded and self._in_flight:
+                    self._in_flight.release()
+            finally:
+                queue.task_done()
@@ -0,0 +1,169 @@
+"""Lease-based claiming of documents so several processors can share a queue."""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Statuses a document holds while a processor owns its lease
+IN_PROGRESS_STATUSES = ["parsing", "generating_embeddings"]
+
+class LeaseLostError(Exception):
+    """Raised when a processor no longer owns the lease of a document."""
+    pass
+
+def default_owner_id() -> str:
+    """Build an identifier that is unique per processor process."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class LeaseManager:
+    """Claims documents atomically and keeps their leases alive with heartbeats."""
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        owner: Optional[str] = None,
+        lease_seconds: int = 300,
+        heartbeat_seconds: int = 60,
+        max_attempts: int = 3
+    ):
+        self.collection = collection
+        self.owner = owner or default_owner_id()
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_attempts = max_attempts
+        self._held: Set[str] = set()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def owns(self, doc_id: str) -> Dict:
+        """Filter matching a document only while this processor holds its lease."""
+        return {"_id": ObjectId(doc_id), "lease.owner": self.owner}
+
+    def _expires_at(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+
+    @staticmethod
+    def _abandoned(now: datetime) -> Dict:
+        """Filter for in-progress documents whose owner stopped renewing the lease.
+
+        Documents left in progress by processors that predate leases have
+        no lease at all and count as abandoned.
+        """
+        return {
+            "status": {"$in": IN_PROGRESS_STATUSES},
+            "$or": [
+                {"lease.expires_at": {"$lt": now}},
+                {"lease": {"$exists": False}}
+            ]
+        }
+
+    async def ensure_indexes(self):
+        """Create the indexes used by claim and reclaim queries."""
+        await self.collection.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+        await self.collection.create_index([("status", ASCENDING), ("lease.expires_at", ASCENDING)])
+
+    async def claim(self) -> Optional[Dict]:
+        """Atomically claim the oldest pending document or an expired lease."""
+        now = datetime.utcnow()
+        doc = await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "pending"},
+                    {
+                        **self._abandoned(now),
+                        # Also matches documents from before attempts were counted
+                        "attempts": {"$not": {"$gte": self.max_attempts}}
+                    }
+                ]
+            },
+            {
+                "$set": {
+                    "status": "parsing",
+                    "lease": {
+                        "owner": self.owner,
+                        "claimed_at": now,
+                        "heartbeat_at": now,
+                        "expires_at": self._expires_at()
+                    }
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        if doc:
+            self._held.add(str(doc["_id"]))
+            if doc.get("attempts", 1) > 1:
+                logger.info(f"Reclaimed document {doc['_id']} (attempt {doc['attempts']})")
+        return doc
+
+    async def fail_exhausted(self) -> int:
+        """Mark documents whose lease expired too many times as failed."""
+        result = await self.collection.update_many(
+            {**self._abandoned(datetime.utcnow()), "attempts": {"$gte": self.max_attempts}},
+            {
+                "$set": {
+                    "status": "failed",
+                    "processing_error": f"Processing abandoned after {self.max_attempts} attempts"
+                },
+                "$unset": {"lease": ""}
+            }
+        )
+        if result.modified_count:
+            logger.warning(f"Marked {result.modified_count} abandoned documents as failed")
+        return result.modified_count
+
+    async def renew(self) -> int:
+        """Extend the leases of every document this processor holds."""
+        if not self._held:
+            return 0
+        now = datetime.utcnow()
+        result = await self.collection.update_many(
+            {
+                "_id": {"$in": [ObjectId(doc_id) for doc_id in self._held]},
+                "lease.owner": self.owner
+            },
+            {"$set": {"lease.heartbeat_at": now, "lease.expires_at": self._expires_at()}}
+        )
+        if result.matched_count < len(self._held):
+            logger.warning(
+                f"Renewed {result.matched_count} of {len(self._held)} leases; "
+                "some documents were reclaimed by another processor"
+            )
+        return result.matched_count
+
+    def release(self, doc_id: str):
+        """Stop heartbeating a document; the final status update drops its lease."""
+        self._held.discard(doc_id)
+
+    async def _heartbeat(self):
+        """Renew held leases until cancelled."""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self.renew()
+            except Exception as e:
+                logger.error(f"Lease heartbeat failed: {str(e)}")
+
+    def start_heartbeat(self):
+        """Start the background heartbeat task."""
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat(), name="lease-heartbeat")
+
+    async def stop_heartbeat(self):
+        """Stop the background heartbeat task."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
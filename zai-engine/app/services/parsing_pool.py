@@ -0,0 +1,279 @@
+"""Process-pool backend that keeps docling parsing off the processor's event loop."""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ParsedDocument:
+    """Compact parse result pointing at a page-per-line JSON artifact.
+
+    Only the page count and a file path cross the process boundary; the
+    cell text of each page is read back lazily with ``iter_pages``.
+    """
+    page_count: int
+    pages_path: str
+
+    def iter_pages(self) -> Iterator[Tuple[str, ...]]:
+        """Yield the cell texts of each page in order."""
+        with open(self.pages_path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield tuple(json.loads(line))
+
+class ParseTimeoutError(Exception):
+    """Raised when parsing a document takes longer than the configured timeout."""
+    pass
+
+def convert_document(converter, file_path: str, pages_path: str) -> ParsedDocument:
+    """Run docling on a file and spool the cell text of each page to ``pages_path``."""
+    result = converter.convert(file_path)
+    page_count = 0
+    with open(pages_path, "w", encoding="utf-8") as f:
+        for page in result.pages:
+            cells = [cell.text for cell in page.cells if getattr(cell, "text", None)]
+            f.write(json.dumps(cells, ensure_ascii=False))
+            f.write("\n")
+            page_count += 1
+    return ParsedDocument(page_count=page_count, pages_path=pages_path)
+
+# Converter owned by a pool worker process, created once per worker
+_worker_converter = None
+
+def _init_worker():
+    """Load docling models when a worker process starts."""
+    global _worker_converter
+    from docling.document_converter import DocumentConverter
+    _worker_converter = DocumentConverter()
+
+def _parse_in_worker(file_path: str, pages_path: str) -> ParsedDocument:
+    """Entry point executed inside a pool worker."""
+    return convert_document(_worker_converter, file_path, pages_path)
+
+def pdf_page_count(file_path: str) -> int:
+    """Number of pages of a PDF, read from its page tree only."""
+    from PyPDF2 import PdfReader
+    return len(PdfReader(file_path).pages)
+
+def page_ranges(page_count: int, pages_per_range: int) -> List[Tuple[int, int]]:
+    """Split ``page_count`` pages into consecutive (first, last) ranges, 0-based and inclusive."""
+    return [
+        (first, min(first + pages_per_range, page_count) - 1)
+        for first in range(0, page_count, pages_per_range)
+    ]
+
+def _parse_range_in_worker(file_path: str, pages_path: str, first_page: int, last_page: int) -> ParsedDocument:
+    """Parse one page range of a PDF inside a pool worker."""
+    from PyPDF2 import PdfReader, PdfWriter
+
+    reader = PdfReader(file_path)
+    writer = PdfWriter()
+    for page_number in range(first_page, last_page + 1):
+        writer.add_page(reader.pages[page_number])
+    range_file = f"{pages_path}.pdf"
+    with open(range_file, "wb") as f:
+        writer.write(f)
+    try:
+        return convert_document(_worker_converter, range_file, pages_path)
+    finally:
+        os.remove(range_file)
+
+class ParserPool:
+    """Parses documents in worker processes with timeouts and worker recycling.
+
+    At most ``workers`` parses are submitted at once, so a parse starts as
+    soon as it is submitted and its timeout does not include time spent
+    queued behind other documents.
+    """
+
+    def __init__(self, workers: int = 2, timeout_seconds: float = 300, max_documents_per_worker: int = 20):
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self.max_documents_per_worker = max_documents_per_worker
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+        # Held from submission until the worker is done with the parse,
+        # including parses whose caller timed out or was cancelled
+        self._slots = asyncio.Semaphore(workers)
+        self._in_flight: Dict[ProcessPoolExecutor, Set[Future]] = defaultdict(set)
+        self._retiring: Set[asyncio.Task] = set()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # max_tasks_per_child needs a non-fork start method; spawn also avoids
+        # inheriting the event loop and open sockets of the processor
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            max_tasks_per_child=self.max_documents_per_worker or None
+        )
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = self._create_executor()
+        return self._executor
+
+    def _kill(self, executor: ProcessPoolExecutor):
+        """Terminate the processes of a pool; a hung docling call cannot be cancelled."""
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._in_flight.pop(executor, None)
+
+    def _restart(self):
+        """Kill every worker and start a fresh pool, after a worker died and broke it."""
+        executor, self._executor = self._executor, None
+        self._generation += 1
+        if executor is None:
+            return
+        self._kill(executor)
+        logger.warning("Parser pool restarted")
+
+    def _retire(self, executor: ProcessPoolExecutor, hung: Future):
+        """Move new parses to a fresh pool and kill the old one once its other parses finish.
+
+        Killing a single worker breaks its whole pool, so parses of other
+        documents running next to the hung one are left to complete first.
+        """
+        if executor is not self._executor:
+            # Already retired because of another timeout
+            return
+        self._executor = None
+        self._generation += 1
+        others = [future for future in self._in_flight[executor] if future is not hung]
+        task = asyncio.get_running_loop().create_task(self._kill_when_done(executor, others))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+        logger.warning(f"Parser pool retired with {len(others)} other parses still running")
+
+    async def _kill_when_done(self, executor: ProcessPoolExecutor, futures: List[Future]):
+        if futures:
+            # Each of them is bounded by its own timeout
+            await asyncio.wait([asyncio.wrap_future(future) for future in futures], timeout=self.timeout_seconds)
+        self._kill(executor)
+
+    def _submit(self, executor: ProcessPoolExecutor, parser: Callable, file_path: str, pages_path: str) -> Future:
+        """Submit a parse that holds a slot until its worker is done with it."""
+        loop = asyncio.get_running_loop()
+        future = executor.submit(parser, file_path, pages_path)
+        self._in_flight[executor].add(future)
+
+        def done(_):
+            self._in_flight.get(executor, set()).discard(future)
+            self._slots.release()
+
+        def notify(f):
+            # Workers killed by close() finish their futures after the loop is gone
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(done, f)
+
+        future.add_done_callback(notify)
+        return future
+
+    async def parse(self, file_path: str, pages_path: str) -> ParsedDocument:
+        """Parse a file with docling in a worker process, writing its pages to ``pages_path``."""
+        return await self.run(_parse_in_worker, file_path, pages_path)
+
+    async def run(self, parser: Callable[[str, str], Optional[ParsedDocument]], file_path: str,
+                  pages_path: str) -> Optional[ParsedDocument]:
+        """Run a picklable parser function in a worker process with the pool's timeout."""
+        for attempt in range(2):
+            # Wait for a free worker before the timeout starts
+            await self._slots.acquire()
+            generation = self._generation
+            executor = self.executor
+            try:
+                future = self._submit(executor, parser, file_path, pages_path)
+            except BaseException:
+                self._slots.release()
+                raise
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout_seconds)
+            except asyncio.TimeoutError:
+                logger.error(f"Parsing {file_path} timed out after {self.timeout_seconds} seconds")
+                self._retire(executor, future)
+                raise ParseTimeoutError(f"Parsing timed out after {self.timeout_seconds} seconds")
+            except BrokenProcessPool:
+                if generation != self._generation and attempt == 0:
+                    # The pool was restarted because of another document; retry once
+                    continue
+                # A worker died (e.g. out of memory) while parsing this file
+                if executor is self._executor:
+                    self._restart()
+                raise
+
+    async def parse_ranges(self, file_path: str, pages_path: str, page_count: int,
+                           pages_per_range: int) -> ParsedDocument:
+        """Parse a large PDF as page ranges in parallel and merge them in page order.
+
+        Pages keep their position in the document, so section start and end
+        pages computed from the merged artifact are the same as for a single
+        conversion.
+        """
+        ranges = page_ranges(page_count, pages_per_range)
+        range_paths = [f"{pages_path}.part{index}" for index in range(len(ranges))]
+        logger.info(f"Parsing {file_path} as {len(ranges)} ranges of up to {pages_per_range} pages")
+        parts: List[Optional[ParsedDocument]] = [None] * len(ranges)
+
+        async def parse_range(index: int):
+            first, last = ranges[index]
+            parts[index] = await self.run(
+                partial(_parse_range_in_worker, first_page=first, last_page=last),
+                file_path,
+                range_paths[index]
+            )
+
+        # At most one range per worker is started, so each range's timeout
+        # starts once a worker takes it and no range starts after a failure
+        next_index = 0
+        running: Set[asyncio.Future] = set()
+        try:
+            try:
+                while next_index < len(ranges) or running:
+                    while next_index < len(ranges) and len(running) < self.workers:
+                        running.add(asyncio.ensure_future(parse_range(next_index)))
+                        next_index += 1
+                    done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        # One failed range fails the document
+                        task.result()
+            except BaseException:
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+                raise
+            await asyncio.to_thread(self._merge, range_paths, pages_path)
+            return ParsedDocument(page_count=sum(part.page_count for part in parts), pages_path=pages_path)
+        finally:
+            for path in range_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    @staticmethod
+    def _merge(range_paths: List[str], pages_path: str):
+        """Concatenate range artifacts into one page-per-line artifact."""
+        with open(pages_path, "wb") as merged:
+            for path in range_paths:
+                with open(path, "rb") as part:
+                    shutil.copyfileobj(part, merged)
+
+    def close(self):
+        """Shut down worker processes."""
+        for task in list(self._retiring):
+            task.cancel()
+        for executor in list(self._in_flight):
+            if executor is not self._executor:
+                self._kill(executor)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,70 @@
+"""Least recently used cache of generation pipelines keyed by LLM."""
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# LLM config fields a generation pipeline is built from
+PIPELINE_CONFIG_FIELDS = ("provider", "apiKey", "baseUrl", "modelName", "maxTokens", "temperature")
+
+def config_fingerprint(llm_config: Dict) -> str:
+    """Hash of the LLM config fields that shape a generation pipeline."""
+    fields = {name: llm_config.get(name) for name in PIPELINE_CONFIG_FIELDS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+@dataclass
+class CachedPipeline:
+    """A built pipeline and the fingerprint of the LLM config it was built from."""
+    pipeline: Any
+    fingerprint: str
+
+class PipelineCache:
+    """Keeps the most recently used pipelines, rebuilding any whose LLM config changed.
+
+    Lookups and builds do not await, so concurrent requests on one event
+    loop cannot build the same pipeline twice.
+    """
+
+    def __init__(self, max_size: int):
+        if max_size < 1:
+            raise ValueError(f"max_size must be at least 1, got {max_size}")
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, CachedPipeline]" = OrderedDict()
+
+    def get(self, llm_id: str, fingerprint: str, build: Callable[[], Any]) -> Any:
+        """Return the pipeline of an LLM, building it if missing or stale."""
+        entry = self._entries.get(llm_id)
+        if entry is not None and entry.fingerprint == fingerprint:
+            self._entries.move_to_end(llm_id)
+            return entry.pipeline
+
+        if entry is not None:
+            logger.info(f"LLM {llm_id} config changed, rebuilding its pipeline")
+        self._entries[llm_id] = CachedPipeline(build(), fingerprint)
+        self._entries.move_to_end(llm_id)
+        while len(self._entries) > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            logger.info(f"Evicted pipeline of LLM {evicted}")
+        return self._entries[llm_id].pipeline
+
+    def peek(self, llm_id: str) -> Optional[Any]:
+        """Return a cached pipeline without building it or changing its recency."""
+        entry = self._entries.get(llm_id)
+        return entry.pipeline if entry else None
+
+    def invalidate(self, llm_id: Optional[str] = None):
+        """Drop the pipeline of one LLM, or of all LLMs."""
+        if llm_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(llm_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, llm_id: str) -> bool:
+        return llm_id in self._entries
@@ -199,6 +199,11 @@ class QueryService:
 
     async def enhance_query(self, query: str) -> EnhancedQuery:
         """Enhance a query with expansions, classification, and optimization."""
+        return self.enhance(query)
+
+    def enhance(self, query: str) -> EnhancedQuery:
+        """Synchronous ``enhance_query``; spaCy and WordNet work is CPU-bound, so
+        async callers should run it in an executor."""
         # Preprocess
         cleaned_query = self.preprocess_query(query)
         doc = nlp(cleaned_query)
@@ -0,0 +1,100 @@
+"""Custom Haystack components used by the RAG pipelines."""
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from haystack import Document, component
+from haystack.components.rankers import TransformersSimilarityRanker
+
+# Rank offset of reciprocal rank fusion, as in Haystack's DocumentJoiner
+RRF_K = 61
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[List[Document]],
+    weights: Sequence[float],
+    top_k: Optional[int] = None,
+    k: int = RRF_K
+) -> List[Document]:
+    """Fuse any number of ranked lists into one, scoring all documents at once.
+
+    Each list contributes ``weight / (k + rank)`` to the documents it holds.
+    Scores are scaled so that a document ranked first in every list scores 1.
+    The inputs are not modified.
+    """
+    index: Dict[str, int] = {}
+    documents: List[Document] = []
+    for docs in ranked_lists:
+        for doc in docs:
+            if doc.id not in index:
+                index[doc.id] = len(documents)
+                documents.append(doc)
+    if not documents:
+        return []
+
+    contributions = np.zeros((len(ranked_lists), len(documents)))
+    for row, docs in enumerate(ranked_lists):
+        if docs:
+            columns = [index[doc.id] for doc in docs]
+            contributions[row, columns] = 1.0 / (k + np.arange(len(docs)))
+    weights = np.asarray(weights, dtype=float)
+    scores = weights @ contributions * k / (weights.sum() or 1.0)
+
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [
+        Document(
+            id=documents[i].id,
+            content=documents[i].content,
+            meta=documents[i].meta,
+            embedding=documents[i].embedding,
+            score=float(scores[i])
+        )
+        for i in order
+    ]
+
+@component
+class BoundedRanker:
+    """Cross-encoder reranking with a cap on how many reranks run at once.
+
+    Pipelines run in executor threads; without the cap, concurrent queries
+    would each start model inference and oversubscribe the CPU.
+    """
+
+    def __init__(self, ranker: TransformersSimilarityRanker, max_concurrency: int = 2):
+        self.ranker = ranker
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def warm_up(self):
+        """Load the cross-encoder model."""
+        self.ranker.warm_up()
+
+    @component.output_types(documents=List[Document])
+    def run(self, query: str, documents: List[Document], top_k: Optional[int] = None):
+        with self._slots:
+            return self.ranker.run(query=query, documents=documents, top_k=top_k)
+
+@component
+class WeightedFusion:
+    """Reciprocal rank fusion of semantic and keyword results with per-run weights.
+
+    Unlike DocumentJoiner, the weights are a run input, so one pipeline
+    instance can serve concurrent queries with different weights.
+    """
+
+    def __init__(self, k: int = RRF_K):
+        self.k = k
+
+    @component.output_types(documents=List[Document])
+    def run(
+        self,
+        semantic_documents: List[Document],
+        keyword_documents: List[Document],
+        weights: Optional[Dict[str, float]] = None,
+        top_k: Optional[int] = None
+    ):
+        weights = weights or {"semantic": 0.5, "keyword": 0.5}
+        return {"documents": reciprocal_rank_fusion(
+            [semantic_documents, keyword_documents],
+            [weights.get("semantic", 0.0), weights.get("keyword", 0.0)],
+            top_k=top_k,
+            k=self.k
+        )}
@@ -0,0 +1,93 @@
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import BinaryIO, Dict, Iterator, List, Sequence, Tuple
+
+from app.utils.file_utils import UploadTooLargeError, get_file_mime_type, save_stream
+
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+@dataclass
+class StoredFile:
+    """A file written to storage, ready to become a Document."""
+    name: str
+    file_path: str
+    mime_type: str
+    content_hash: str
+    size: int
+
+def is_archive(filename: str) -> bool:
+    """Whether a filename looks like a zip or tar archive."""
+    return filename.lower().endswith(ZIP_SUFFIXES + TAR_SUFFIXES)
+
+def _is_ignored(name: str) -> bool:
+    """Skip directories, OS metadata and hidden files inside archives.
+
+    ``.`` and ``..`` are path steps, not hidden names; such members are
+    stored under their base name like any other.
+    """
+    parts = PurePosixPath(name).parts
+    return (
+        not parts
+        or parts[0] == "__MACOSX"
+        or any(part.startswith(".") and part not in (".", "..") for part in parts)
+    )
+
+def _iter_members(archive_path: str) -> Iterator[Tuple[str, BinaryIO]]:
+    """Yield (name, stream) for every regular file of an archive, in archive order."""
+    if archive_path.lower().endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as stream:
+                        yield info.filename, stream
+    else:
+        # Stream mode reads the (possibly compressed) tar sequentially without seeking
+        with tarfile.open(archive_path, "r|*") as archive:
+            for member in archive:
+                if member.isfile():
+                    stream = archive.extractfile(member)
+                    if stream is not None:
+                        yield member.name, stream
+
+def extract_archive(
+    archive_path: str,
+    destination: str,
+    allowed_extensions: Sequence[str],
+    max_file_size: int,
+    max_files: int
+) -> Tuple[List[StoredFile], List[Dict]]:
+    """Stream the allowed files of an archive into ``destination``.
+
+    Members are copied one at a time in fixed-size pieces, never extracted
+    as a whole, and only under fresh names, so paths inside the archive
+    cannot escape ``destination``. Returns the stored files and the
+    skipped members with the reason for each.
+    """
+    stored: List[StoredFile] = []
+    skipped: List[Dict] = []
+    for name, stream in _iter_members(archive_path):
+        base_name = PurePosixPath(name).name
+        if _is_ignored(name):
+            continue
+        if not any(base_name.lower().endswith(ext) for ext in allowed_extensions):
+            skipped.append({"name": name, "reason": "file type not allowed"})
+            continue
+        if len(stored) >= max_files:
+            skipped.append({"name": name, "reason": f"batch is limited to {max_files} files"})
+            continue
+        try:
+            file_path, content_hash, size = save_stream(stream, destination, base_name, max_file_size)
+        except UploadTooLargeError as e:
+            skipped.append({"name": name, "reason": str(e)})
+            continue
+        stored.append(StoredFile(
+            name=base_name,
+            file_path=file_path,
+            mime_type=get_file_mime_type(file_path),
+            content_hash=content_hash,
+            size=size
+        ))
+    return stored, skipped
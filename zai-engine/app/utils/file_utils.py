@@ -1,14 +1,28 @@
+import asyncio
+import hashlib
 import os
+import threading
 import uuid
 from pathlib import Path
-from typing import Tuple
+from typing import BinaryIO, Optional, Tuple
 from fastapi import UploadFile
 import magic
 
+# Bytes read from an upload at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# libmagic handles are expensive to open and not safe to share between threads
+_mime_sniffer = magic.Magic(mime=True)
+_mime_sniffer_lock = threading.Lock()
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured maximum size."""
+    pass
+
 def get_file_mime_type(file_path: str) -> str:
     """Get MIME type of a file."""
-    mime = magic.Magic(mime=True)
-    return mime.from_file(file_path)
+    with _mime_sniffer_lock:
+        return _mime_sniffer.from_file(file_path)
 
 def generate_unique_filename(original_filename: str) -> Tuple[str, str]:
     """Generate a unique filename while preserving extension."""
@@ -16,23 +30,65 @@ def generate_unique_filename(original_filename: str) -> Tuple[str, str]:
     unique_name = f"{uuid.uuid4().hex}{ext}"
     return unique_name, ext.lower()[1:]  # Return filename and extension without dot
 
-async def save_upload_file(upload_file: UploadFile, destination: str) -> Tuple[str, str]:
-    """Save an uploaded file and return its path and MIME type."""
-    unique_filename, file_type = generate_unique_filename(upload_file.filename)
+def save_stream(
+    source: BinaryIO,
+    destination: str,
+    original_filename: str,
+    max_size: Optional[int] = None
+) -> Tuple[str, str, int]:
+    """Copy a binary stream into storage in fixed-size pieces.
+
+    Blocking; call from a worker thread. Returns the stored path, the
+    SHA-256 content hash and the size, and raises UploadTooLargeError after
+    removing the partial file once more than ``max_size`` bytes were read.
+    """
+    unique_filename, _ = generate_unique_filename(original_filename)
     file_path = os.path.join(destination, unique_filename)
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    # Save file
-    content = await upload_file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
-    
-    # Get MIME type
-    mime_type = get_file_mime_type(file_path)
-    
-    return file_path, mime_type
+    os.makedirs(destination, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(file_path, "wb") as f:
+            while True:
+                content = source.read(UPLOAD_CHUNK_SIZE)
+                if not content:
+                    break
+                size += len(content)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLargeError(f"File is larger than {max_size} bytes")
+                hasher.update(content)
+                f.write(content)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return file_path, hasher.hexdigest(), size
+
+async def save_upload_file(
+    upload_file: UploadFile,
+    destination: str,
+    max_size: Optional[int] = None
+) -> Tuple[str, str, str]:
+    """Stream an uploaded file to disk and return its path, MIME type and SHA-256 content hash.
+
+    The upload is copied by ``save_stream`` in a worker thread, so memory
+    use does not grow with the file size. Raises UploadTooLargeError, after
+    removing the partial file, once more than ``max_size`` bytes have been
+    received.
+    """
+    if max_size is not None and upload_file.size is not None and upload_file.size > max_size:
+        raise UploadTooLargeError(f"File is larger than {max_size} bytes")
+
+    file_path, content_hash, _ = await asyncio.to_thread(
+        save_stream,
+        upload_file.file,
+        destination,
+        upload_file.filename,
+        max_size
+    )
+    mime_type = await asyncio.to_thread(get_file_mime_type, file_path)
+    return file_path, mime_type, content_hash
 
 def get_storage_path(folder: str = "uploads") -> str:
     """Get absolute path to storage folder."""
@@ -0,0 +1,26 @@
+from typing import List, Sequence, Union
+
+import numpy as np
+from bson import Binary
+
+# Chunk vectors are stored as little-endian float32, 4 bytes per dimension
+VECTOR_DTYPE = np.dtype("<f4")
+
+def pack_vector(vector: Union[Sequence[float], np.ndarray]) -> Binary:
+    """Pack an embedding into a compact float32 BSON Binary."""
+    return Binary(np.asarray(vector, dtype=VECTOR_DTYPE).tobytes())
+
+def unpack_vector(data: bytes) -> np.ndarray:
+    """View a packed embedding as a float32 array without copying.
+
+    The returned array is read-only because it shares memory with ``data``.
+    """
+    return np.frombuffer(data, dtype=VECTOR_DTYPE)
+
+def vector_to_list(vector: Union[bytes, Sequence[float], np.ndarray]) -> List[float]:
+    """Return an embedding as a list of floats, whether packed or not."""
+    if isinstance(vector, (bytes, bytearray, memoryview)):
+        return unpack_vector(vector).tolist()
+    if isinstance(vector, np.ndarray):
+        return vector.tolist()
+    return list(vector)
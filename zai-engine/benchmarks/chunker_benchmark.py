@@ -0,0 +1,122 @@
+"""Benchmark SmartChunker boundary selection against the previous chunker.
+
+Only chunk boundary selection is timed; per-chunk spaCy analysis is the
+same for both implementations and is left out.
+
+Usage (from the zai-engine directory):
+    python -m benchmarks.chunker_benchmark --sizes 1 10
+"""
+import argparse
+import json
+import random
+import time
+from typing import Dict, List, Tuple
+
+import nltk
+
+from app.services.document_analysis import DocumentAnalyzer, SmartChunker
+
+WORDS = (
+    "document retrieval embedding vector index search query relevance policy "
+    "section table figure report analysis data model system process result"
+).split()
+
+def make_text(size_bytes: int, seed: int = 7) -> str:
+    """Generate prose with headings, paragraphs and sentences of varying length."""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    section = 1
+    while total < size_bytes:
+        if rng.random() < 0.05:
+            block = f"{section}. {' '.join(rng.choices(WORDS, k=3)).title()}"
+            section += 1
+        else:
+            sentences = [
+                " ".join(rng.choices(WORDS, k=rng.randint(6, 30))).capitalize() + rng.choice(".!?")
+                for _ in range(rng.randint(1, 8))
+            ]
+            block = " ".join(sentences)
+        parts.append(block)
+        total += len(block) + 2
+    return "\n\n".join(parts)
+
+class LegacyChunker(SmartChunker):
+    """Boundary selection as it was before the boundary index."""
+
+    def legacy_break_point(self, text: str, around_position: int) -> int:
+        if '\n\n' in text[max(0, around_position-100):min(len(text), around_position+100)]:
+            return text.find('\n\n', around_position)
+        sentences = nltk.sent_tokenize(text[max(0, around_position-100):min(len(text), around_position+100)])
+        if sentences:
+            current_pos = 0
+            for sent in sentences:
+                current_pos += len(sent)
+                if current_pos >= 100:
+                    return around_position + current_pos
+        words = text[max(0, around_position-50):min(len(text), around_position+50)].split()
+        if words:
+            return around_position + len(words[0])
+        return around_position
+
+    def legacy_split(self, text: str) -> List[Tuple[int, int]]:
+        spans = []
+        current_pos = 0
+        while current_pos < len(text):
+            if self.analyzer.identify_section_type(text[current_pos:])[0] == 'heading':
+                target_size = self.min_chunk_size
+            else:
+                target_size = self.max_chunk_size
+            end_pos = self.legacy_break_point(text, current_pos + target_size)
+            if end_pos <= current_pos:
+                end_pos = min(current_pos + self.max_chunk_size, len(text))
+            spans.append((current_pos, end_pos))
+            if end_pos >= len(text):
+                # The original loop never terminated on a short final chunk
+                break
+            current_pos = end_pos - self.overlap_size
+        return spans
+
+def run(sizes_mb: List[float], skip_legacy_above: float) -> List[Dict]:
+    """Time both chunkers on generated texts of the given sizes."""
+    chunker = LegacyChunker(DocumentAnalyzer())
+    results = []
+    for size_mb in sizes_mb:
+        text = make_text(int(size_mb * 1024 * 1024))
+
+        start = time.perf_counter()
+        spans = list(chunker.split([text]))
+        new_seconds = time.perf_counter() - start
+
+        result = {
+            "size_mb": size_mb,
+            "chunks": len(spans),
+            "indexed_seconds": round(new_seconds, 3),
+            "legacy_chunks": None,
+            "legacy_seconds": None,
+            "speedup": None
+        }
+        if size_mb <= skip_legacy_above:
+            start = time.perf_counter()
+            legacy_spans = chunker.legacy_split(text)
+            legacy_seconds = time.perf_counter() - start
+            result.update({
+                "legacy_chunks": len(legacy_spans),
+                "legacy_seconds": round(legacy_seconds, 3),
+                "speedup": round(legacy_seconds / new_seconds, 1) if new_seconds else None
+            })
+        results.append(result)
+        print(json.dumps(result))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 10], help="Text sizes in MB")
+    parser.add_argument(
+        "--skip-legacy-above",
+        type=float,
+        default=10,
+        help="Do not run the quadratic legacy chunker on texts larger than this (MB)"
+    )
+    args = parser.parse_args()
+    run(args.sizes, args.skip_legacy_above)
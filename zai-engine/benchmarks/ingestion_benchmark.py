@@ -0,0 +1,346 @@
+"""End-to-end ingestion throughput of DocumentProcessor on a synthetic corpus.
+
+The real processor runs against local stand-ins: mongomock for MongoDB
+(or a real server with --mongo-url), an in-memory Elasticsearch that
+accepts bulk requests, and an embeddings provider that returns
+deterministic vectors after a configurable latency. Each document size
+runs in a fresh process, so peak RSS is measured per scenario.
+
+Results are printed as one JSON line per scenario; --output writes them
+to a file that a later run can compare against with --baseline.
+
+Usage (from the zai-engine directory):
+    python -m benchmarks.ingestion_benchmark --sizes-kb 50 500 --documents 20
+    python -m benchmarks.ingestion_benchmark --output results.json
+    python -m benchmarks.ingestion_benchmark --baseline results.json --tolerance 0.15
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.parser_benchmark import make_text, to_html, to_markdown
+
+FORMATS = {
+    "txt": lambda text: text,
+    "md": to_markdown,
+    "html": to_html
+}
+
+# Throughput metrics compared against a baseline; higher is better
+COMPARED_METRICS = ("pages_per_second", "chunks_per_second")
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic unit vectors per text, returned after a fixed latency per request."""
+
+    def __init__(self, dimensions: int = 1536, latency_seconds: float = 0.05):
+        self.dimensions = dimensions
+        self.latency_seconds = latency_seconds
+        self.requests = 0
+        self.texts = 0
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions, dtype=np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        self.texts += len(texts)
+        time.sleep(self.latency_seconds)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        self.texts += len(texts)
+        await asyncio.sleep(self.latency_seconds)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+class _BulkResponse:
+    def __init__(self, body: Dict):
+        self.body = body
+
+    def __getitem__(self, key):
+        return self.body[key]
+
+class FakeElasticsearch:
+    """Accepts the requests ChunkIndexer sends and counts what it receives.
+
+    Bulk bodies are serialized exactly as for a real cluster, so the client
+    side of indexing is measured; the documents themselves are dropped.
+    """
+
+    def __init__(self, latency_seconds: float = 0.01):
+        self.latency_seconds = latency_seconds
+        self.bulk_requests = 0
+        self.indexed = 0
+        self.bytes_sent = 0
+        serializer = SimpleNamespace(
+            dumps=lambda data: json.dumps(data, separators=(",", ":")).encode("utf-8")
+        )
+        self.transport = SimpleNamespace(
+            serializers=SimpleNamespace(get_serializer=lambda mimetype: serializer)
+        )
+
+    def options(self, **kwargs) -> "FakeElasticsearch":
+        return self
+
+    async def bulk(self, operations: List, **kwargs) -> _BulkResponse:
+        await asyncio.sleep(self.latency_seconds)
+        self.bulk_requests += 1
+        self.bytes_sent += sum(len(line) + 1 for line in operations)
+        items = []
+        # Operations alternate between an action line and a source line
+        for line in operations[::2]:
+            action = json.loads(line)
+            op_type, meta = next(iter(action.items()))
+            items.append({op_type: {"_id": meta.get("_id"), "_index": meta.get("_index"), "status": 201}})
+        self.indexed += len(items)
+        return _BulkResponse({"errors": False, "took": 1, "items": items})
+
+    async def delete_by_query(self, **kwargs) -> Dict:
+        return {"deleted": 0}
+
+    async def close(self):
+        pass
+
+def write_corpus(directory: str, size_kb: float, documents: int, formats: List[str]) -> List[str]:
+    """Write ``documents`` generated files of about ``size_kb`` each, cycling through formats."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(documents):
+        fmt = formats[i % len(formats)]
+        # A different seed per document keeps the embedding cache cold
+        text = FORMATS[fmt](make_text(int(size_kb * 1024), seed=i))
+        path = os.path.join(directory, f"doc_{i:05d}.{fmt}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """Peak resident set size in MB (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+async def run_scenario(settings: Dict) -> Dict:
+    """Ingest one generated corpus with the real processor and measure it."""
+    from bson import ObjectId
+
+    from app.models.document import Document
+    from app.utils.file_utils import get_file_mime_type
+    from config import config
+    from document_processor import DocumentProcessor
+
+    logging.getLogger().setLevel(logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix="zai-ingestion-benchmark-")
+    # Absolute directories override the storage base path
+    config["storage"]["directories"]["processed"] = os.path.join(workdir, "processed")
+    config["storage"]["directories"]["artifacts"] = os.path.join(workdir, "artifacts")
+    os.makedirs(config["storage"]["directories"]["processed"])
+    config["mongodb"]["connection"]["db_name"] = f"zai_benchmark_{uuid.uuid4().hex[:8]}"
+
+    if settings["mongo_url"]:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        mongo_client = AsyncIOMotorClient(settings["mongo_url"])
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("mongomock-motor is required without --mongo-url: pip install mongomock-motor")
+        mongo_client = AsyncMongoMockClient()
+
+    embeddings = FakeEmbeddings(settings["dimensions"], settings["embedding_latency_ms"] / 1000)
+    es = FakeElasticsearch(settings["es_latency_ms"] / 1000)
+    processor = DocumentProcessor(mongo_client=mongo_client, es=es, embeddings=embeddings)
+    if settings["workers"]:
+        processor.pool_settings["enabled"] = True
+        processor.pool_settings["max_concurrent_documents"] = settings["workers"]
+    elif settings["serial"]:
+        processor.pool_settings["enabled"] = False
+
+    # Stage methods are looked up on the instance, so wrapping them times
+    # both the worker pool and serial processing
+    stage_seconds = {"parse": 0.0, "embed": 0.0, "store": 0.0}
+
+    def timed(stage: str, method):
+        async def run(job):
+            started = time.perf_counter()
+            try:
+                return await method(job)
+            finally:
+                stage_seconds[stage] += time.perf_counter() - started
+        return run
+
+    processor.parse_document = timed("parse", processor.parse_document)
+    processor.embed_document = timed("embed", processor.embed_document)
+    processor.store_document = timed("store", processor.store_document)
+
+    try:
+        paths = write_corpus(os.path.join(workdir, "uploads"), settings["size_kb"], settings["documents"], settings["formats"])
+        documents = [
+            Document(
+                id=ObjectId(),
+                filename=os.path.basename(path),
+                original_name=os.path.basename(path),
+                file_path=path,
+                mime_type=get_file_mime_type(path),
+                size=os.path.getsize(path),
+                status="pending"
+            ).dict(by_alias=True)
+            for path in paths
+        ]
+        await processor.db.documents.insert_many(documents)
+        corpus_mb = sum(doc["size"] for doc in documents) / (1024 * 1024)
+
+        started = time.perf_counter()
+        await processor.process_pending_documents(wait=True)
+        if processor.pool is not None:
+            await processor.pool.shutdown(drain=True)
+            processor.pool = None
+        wall_seconds = time.perf_counter() - started
+
+        stored = await processor.db.documents.find(
+            {},
+            {"status": 1, "metadata.page_count": 1, "content_stats.total_chunks": 1}
+        ).to_list(None)
+        processed = [doc for doc in stored if doc["status"] == "processed"]
+        pages = sum(doc["metadata"]["page_count"] for doc in processed)
+        chunks = sum(doc["content_stats"]["total_chunks"] for doc in processed)
+        if settings["mongo_url"]:
+            await mongo_client.drop_database(config["mongodb"]["connection"]["db_name"])
+    finally:
+        await processor.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "size_kb": settings["size_kb"],
+        "documents": settings["documents"],
+        "formats": settings["formats"],
+        "corpus_mb": round(corpus_mb, 3),
+        "processed": len(processed),
+        "failed": len(stored) - len(processed),
+        "pages": pages,
+        "chunks": chunks,
+        "wall_seconds": round(wall_seconds, 3),
+        "pages_per_second": round(pages / wall_seconds, 2) if wall_seconds else None,
+        "chunks_per_second": round(chunks / wall_seconds, 2) if wall_seconds else None,
+        "mb_per_second": round(corpus_mb / wall_seconds, 3) if wall_seconds else None,
+        # Summed over documents, so with several workers this exceeds wall time
+        "stage_seconds": {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()},
+        "embedding_requests": embeddings.requests,
+        "es_bulk_requests": es.bulk_requests,
+        "es_bytes_sent": es.bytes_sent,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_child_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN)
+    }
+
+def run_in_subprocess(settings: Dict) -> Dict:
+    """Run one scenario in a fresh interpreter and return its result."""
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.ingestion_benchmark", "--scenario", json.dumps(settings)],
+        stdout=subprocess.PIPE,
+        text=True,
+        check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def scenario_key(result: Dict) -> str:
+    return f"{result['size_kb']}kb x {result['documents']} ({','.join(result['formats'])})"
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Describe every throughput metric that fell more than ``tolerance`` below the baseline."""
+    previous = {scenario_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(scenario_key(result))
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if before.get(metric) and result.get(metric) is not None:
+                change = result[metric] / before[metric] - 1
+                if change < -tolerance:
+                    regressions.append(
+                        f"{scenario_key(result)}: {metric} {before[metric]} -> {result[metric]} ({change:+.0%})"
+                    )
+    return regressions
+
+def main(args: argparse.Namespace) -> int:
+    results = []
+    for size_kb in args.sizes_kb:
+        settings = {
+            "size_kb": size_kb,
+            "documents": args.documents,
+            "formats": args.formats,
+            "dimensions": args.dimensions,
+            "embedding_latency_ms": args.embedding_latency_ms,
+            "es_latency_ms": args.es_latency_ms,
+            "workers": args.workers,
+            "serial": args.serial,
+            "mongo_url": args.mongo_url
+        }
+        result = run_in_subprocess(settings)
+        results.append(result)
+        print(json.dumps(result), flush=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "generated_at": datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "results": results
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-kb", type=float, nargs="+", default=[50, 500], help="Generated document sizes in KB")
+    parser.add_argument("--documents", type=int, default=20, help="Documents per scenario")
+    parser.add_argument("--formats", nargs="+", choices=sorted(FORMATS), default=sorted(FORMATS), help="Document formats to cycle through")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Dimensions of the fake embeddings")
+    parser.add_argument("--embedding-latency-ms", type=float, default=50, help="Latency of each embeddings request")
+    parser.add_argument("--es-latency-ms", type=float, default=10, help="Latency of each bulk request")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent documents (enables the worker pool)")
+    parser.add_argument("--serial", action="store_true", help="Process documents one at a time without the worker pool")
+    parser.add_argument("--mongo-url", default=None, help="Use this MongoDB server instead of mongomock")
+    parser.add_argument("--output", default=None, help="Write all results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed throughput drop against the baseline")
+    parser.add_argument("--scenario", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(asyncio.run(run_scenario(json.loads(args.scenario)))))
+    else:
+        sys.exit(main(args))
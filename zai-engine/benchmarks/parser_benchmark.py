@@ -0,0 +1,129 @@
+"""Throughput of the fast parsers per format, optionally against docling.
+
+Text, Markdown and HTML inputs are generated; PDFs have to be supplied.
+Each result is printed as one JSON line with MB/s.
+
+Usage (from the zai-engine directory):
+    python -m benchmarks.parser_benchmark --sizes 1 10
+    python -m benchmarks.parser_benchmark --sizes 1 --pdf tests/test_files/sample.pdf --docling
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.services.document_parsers import parse_html, parse_markdown, parse_pdf_text_layer, parse_text
+from app.services.parsing_pool import convert_document
+
+WORDS = (
+    "document retrieval embedding vector index search query relevance policy "
+    "section table figure report analysis data model system process result"
+).split()
+
+def make_text(size_bytes: int, seed: int = 7) -> str:
+    """Generate paragraphs with a numbered heading every few blocks."""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    section = 1
+    while total < size_bytes:
+        if rng.random() < 0.05:
+            block = f"{section}. {' '.join(rng.choices(WORDS, k=3)).title()}"
+            section += 1
+        else:
+            block = ". ".join(
+                " ".join(rng.choices(WORDS, k=rng.randint(6, 30))).capitalize()
+                for _ in range(rng.randint(1, 8))
+            ) + "."
+        parts.append(block)
+        total += len(block) + 2
+    return "\n\n".join(parts)
+
+def to_markdown(text: str) -> str:
+    """Turn generated prose into Markdown with headings and lists."""
+    blocks = []
+    for block in text.split("\n\n"):
+        if len(block) < 60 and block[:1].isdigit():
+            blocks.append(f"## {block.split('. ', 1)[-1]}")
+        elif len(blocks) % 7 == 3:
+            blocks.append("\n".join(f"- {sentence}" for sentence in block.split(". ")))
+        else:
+            blocks.append(block)
+    return "\n\n".join(blocks)
+
+def to_html(text: str) -> str:
+    """Turn generated prose into HTML with headings and paragraphs."""
+    body = []
+    for block in text.split("\n\n"):
+        if len(block) < 60 and block[:1].isdigit():
+            body.append(f"<h2>{block.split('. ', 1)[-1]}</h2>")
+        else:
+            body.append(f"<p>{block}</p>")
+    return f"<html><head><title>Benchmark</title></head><body>{''.join(body)}</body></html>"
+
+def time_parser(parser: Callable, file_path: str, workdir: str) -> Dict:
+    """Parse a file once and report duration and throughput."""
+    pages_path = os.path.join(workdir, "pages.jsonl")
+    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    started = time.perf_counter()
+    parsed = parser(file_path, pages_path)
+    elapsed = time.perf_counter() - started
+    return {
+        "file_mb": round(size_mb, 3),
+        "pages": parsed.page_count if parsed else None,
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(size_mb / elapsed, 2) if elapsed else None
+    }
+
+def run(sizes_mb: List[float], pdf: Optional[str], docling: bool) -> List[Dict]:
+    """Benchmark each format at each size."""
+    results = []
+    converter = None
+    if docling:
+        from docling.document_converter import DocumentConverter
+        converter = DocumentConverter()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size_mb in sizes_mb:
+            text = make_text(int(size_mb * 1024 * 1024))
+            inputs = [
+                ("text", ".txt", text, parse_text),
+                ("markdown", ".md", to_markdown(text), parse_markdown),
+                ("html", ".html", to_html(text), parse_html)
+            ]
+            for name, suffix, content, parser in inputs:
+                file_path = os.path.join(workdir, f"input{suffix}")
+                with open(file_path, "w", encoding="utf-8") as f:
+                    f.write(content)
+                result = {"format": name, "parser": parser.__name__, **time_parser(parser, file_path, workdir)}
+                results.append(result)
+                print(json.dumps(result))
+                if converter is not None and name != "html":
+                    result = {
+                        "format": name,
+                        "parser": "docling",
+                        **time_parser(lambda src, dst: convert_document(converter, src, dst), file_path, workdir)
+                    }
+                    results.append(result)
+                    print(json.dumps(result))
+
+        if pdf:
+            parsers = [("pdf_text_layer", parse_pdf_text_layer)]
+            if converter is not None:
+                parsers.append(("docling", lambda src, dst: convert_document(converter, src, dst)))
+            for name, parser in parsers:
+                result = {"format": "pdf", "parser": name, **time_parser(parser, pdf, workdir)}
+                results.append(result)
+                print(json.dumps(result))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 10], help="Generated input sizes in MB")
+    parser.add_argument("--pdf", default=None, help="PDF file to benchmark the text-layer path on")
+    parser.add_argument("--docling", action="store_true", help="Also time docling on the same inputs")
+    args = parser.parse_args()
+    run(args.sizes, args.pdf, args.docling)
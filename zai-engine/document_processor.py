@@ -1,29 +1,75 @@
+import argparse
 import asyncio
 import logging
+import signal
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 from docling.document_converter import DocumentConverter
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
+from prometheus_client import start_http_server
 from bson import ObjectId
 from elasticsearch import AsyncElasticsearch
 import os
 import shutil
+import socket
 import time
 import traceback
 
 from app.models.document import Document, DocumentChunk, DocumentMetadata, ContentStats, ChunkingStrategy
-from app.services.document_analysis import DocumentAnalyzer, SmartChunker
+from app.services.document_analysis import DocumentAnalyzer, SectionTracker, SmartChunker
+from app.services.document_parsers import default_registry
+from app.services.document_watcher import ChangeStreamUnavailable, PendingDocumentWatcher
+from app.services.embedding_batcher import EmbeddingBatcher, RateLimiter
+from app.services.embedding_cache import EmbeddingCache
+from app.services.es_indexer import ChunkIndexer
+from app.services.ingestion_checkpoints import STAGES, CheckpointStore
+from app.services.ingestion_events import IngestionEventPublisher, ensure_events_collection
+from app.services.ingestion_metrics import DOCUMENTS, IN_FLIGHT, QUEUE_DEPTH, STAGE_ERRORS, IngestionMetrics
+from app.services.ingestion_pool import IngestionWorkerPool, Stage
+from app.services.job_lease import LeaseLostError, LeaseManager
+from app.services.parsing_pool import ParsedDocument, ParserPool, convert_document, pdf_page_count
 from app.utils.file_utils import get_storage_path
+from app.utils.vector_utils import pack_vector
 from config import config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@dataclass
+class IngestionJob:
+    """State carried for one document between ingestion stages."""
+    doc_id: str
+    doc: Dict = None
+    start_time: float = field(default_factory=time.time)
+    page_count: int = 0
+    total_characters: int = 0
+    section_structure: List[Dict] = field(default_factory=list)
+    doc_metadata: Dict = None
+    chunks: List[Dict] = field(default_factory=list)
+    embeddings: List[List[float]] = field(default_factory=list)
+    processed_file: Optional[str] = None
+    checkpoints: Dict = field(default_factory=dict)
+    progress: Dict = field(default_factory=dict)
+    metrics: IngestionMetrics = field(default_factory=IngestionMetrics)
+    # Set once the document has been counted as leaving the processor
+    finished: bool = False
+
 class DocumentProcessor:
-    def __init__(self):
-        """Initialize document processor."""
-        self.mongo_client = AsyncIOMotorClient(
+    def __init__(
+        self,
+        mongo_client: Optional[AsyncIOMotorClient] = None,
+        es: Optional[AsyncElasticsearch] = None,
+        embeddings: Optional[Embeddings] = None
+    ):
+        """Initialize document processor.
+
+        The clients default to the configured services; benchmarks pass in
+        local stand-ins.
+        """
+        self.mongo_client = mongo_client or AsyncIOMotorClient(
             config["mongodb"]["connection"]["url"],
             maxPoolSize=config["mongodb"]["connection"]["max_connections"],
             minPoolSize=config["mongodb"]["connection"]["min_connections"],
@@ -31,253 +77,768 @@ class DocumentProcessor:
             retryWrites=config["mongodb"]["options"]["retry_writes"]
         )
         self.db = self.mongo_client[config["mongodb"]["connection"]["db_name"]]
-        self.es = AsyncElasticsearch(
+        self.es = es or AsyncElasticsearch(
             hosts=[config["elasticsearch"]["connection"]["url"]],
             basic_auth=(
                 config["elasticsearch"]["connection"]["user"],
                 config["elasticsearch"]["connection"]["password"]
             )
         )
+        self.chunk_vector_mode = config["storage"]["chunk_vectors"]
+        bulk_settings = config["elasticsearch"]["bulk"]
+        self.indexer = ChunkIndexer(
+            self.es,
+            f"{config['elasticsearch']['index']['prefix']}_chunks",
+            chunk_size=bulk_settings["chunk_size"],
+            max_chunk_bytes=bulk_settings["max_chunk_bytes"],
+            max_retries=bulk_settings["max_retries"]
+        )
         
         # Initialize components
-        self.parser = DocumentConverter()
-        self.analyzer = DocumentAnalyzer()
+        parsing_settings = config["processor"]["parsing"]
+        if parsing_settings["backend"] == "process_pool":
+            self.parser = None
+            self.parser_pool = ParserPool(
+                workers=parsing_settings["workers"],
+                timeout_seconds=config["docling"]["performance"]["timeout_seconds"],
+                max_documents_per_worker=parsing_settings["max_documents_per_worker"]
+            )
+        else:
+            self.parser = DocumentConverter()
+            self.parser_pool = None
+        fast_parser_settings = parsing_settings["fast_parsers"]
+        self.fast_parsers = default_registry(
+            pdf_text_layer=fast_parser_settings["pdf_text_layer"],
+            min_pdf_chars_per_page=fast_parser_settings["min_pdf_chars_per_page"],
+            max_sparse_pdf_page_ratio=fast_parser_settings["max_sparse_pdf_page_ratio"]
+        ) if fast_parser_settings["enabled"] else None
+        analysis_settings = config["processor"]["analysis"]
+        self.analyzer = DocumentAnalyzer(
+            n_process=analysis_settings["n_process"],
+            batch_size=analysis_settings["batch_size"]
+        )
         self.chunker = SmartChunker(self.analyzer)
-        self.embeddings = OpenAIEmbeddings(
+        self.events = IngestionEventPublisher(self.db, config["ingestion_events"]["collection"])
+        self.checkpoints = CheckpointStore(get_storage_path(config["storage"]["directories"]["artifacts"]))
+        self.embedding_cache = EmbeddingCache(
+            self.db,
+            max_memory_entries=config["embedding_cache"]["memory_entries"],
+            collection_name=config["embedding_cache"]["collection"],
+            persistent=config["embedding_cache"]["persistent"]
+        )
+        self.embedding_model = config["openai"]["model"]
+        self.embeddings = embeddings or OpenAIEmbeddings(
             openai_api_key=config["openai"]["api_key"],
-            model=config["openai"]["model"]
+            model=self.embedding_model
+        )
+
+        # One batcher per processor, so concurrent documents share the API budget
+        batching_settings = config["processor"]["embedding_batching"]
+        self.embedding_batcher = EmbeddingBatcher(
+            self.embeddings.aembed_documents,
+            RateLimiter(
+                requests_per_minute=batching_settings["requests_per_minute"],
+                tokens_per_minute=batching_settings["tokens_per_minute"]
+            ),
+            model=self.embedding_model,
+            max_batch_tokens=batching_settings["max_batch_tokens"],
+            max_batch_size=batching_settings["max_batch_size"],
+            max_concurrency=batching_settings["max_concurrent_batches"],
+            max_retries=batching_settings["max_retries"]
         )
 
+        # Worker pool settings
+        self.pool_settings = config["processor"]["worker_pool"]
+        self.pool: Optional[IngestionWorkerPool] = None
+        self._stopping = asyncio.Event()
+
+        # Leases let several processor nodes share the documents collection
+        lease_settings = config["processor"]["leases"]
+        self.leases = LeaseManager(
+            self.db.documents,
+            owner=lease_settings.get("owner"),
+            lease_seconds=lease_settings["duration_seconds"],
+            heartbeat_seconds=lease_settings["heartbeat_seconds"],
+            max_attempts=lease_settings["max_attempts"]
+        )
+
+        # Change streams wake the processor as soon as a document is uploaded
+        self.change_stream_settings = config["processor"]["change_stream"]
+        self.watcher = PendingDocumentWatcher(
+            self.db,
+            state_key=self.change_stream_settings.get("state_key") or socket.gethostname()
+        )
+        self._wakeup = asyncio.Event()
+        self._watching = False
+
     async def close(self):
         """Close connections."""
+        if self.pool is not None:
+            await self.pool.shutdown(drain=False)
+            self.pool = None
+        await self.leases.stop_heartbeat()
+        if self.parser_pool is not None:
+            await asyncio.to_thread(self.parser_pool.close)
         await self.es.close()
         self.mongo_client.close()
 
-    async def process_document(self, doc_id: str):
-        """Process a single document with enhanced analysis."""
-        try:
-            # Get document
-            doc = await self.db.documents.find_one({"_id": ObjectId(doc_id)})
-            if not doc:
-                logger.error(f"Document {doc_id} not found")
-                return
+    def stop(self):
+        """Request a clean shutdown of the processing loop."""
+        self._stopping.set()
 
-            # Update status to parsing
-            await self.db.documents.update_one(
-                {"_id": ObjectId(doc_id)},
-                {"$set": {"status": "parsing"}}
-            )
+    async def _set_status(self, doc_id: str, status: str):
+        """Update the processing status of a document we hold the lease for."""
+        result = await self.db.documents.update_one(
+            self.leases.owns(doc_id),
+            {"$set": {"status": status}}
+        )
+        if result.matched_count == 0:
+            raise LeaseLostError(f"Lease on document {doc_id} is no longer held by {self.leases.owner}")
 
-            # Start timer for processing
-            start_time = time.time()
-            
-            # Parse document using docling
+    async def _publish(self, job: IngestionJob, status: Optional[str] = None, error: Optional[str] = None,
+                       **progress: int):
+        """Update the progress counters of a job and publish them with its status."""
+        job.progress.update(progress)
+        if job.doc:
+            await self.events.publish(job.doc, status=status, progress=dict(job.progress), error=error)
+
+    def _finished(self, job: IngestionJob, status: str):
+        """Count a document leaving the processor, once per claim."""
+        if job.finished:
+            return
+        job.finished = True
+        DOCUMENTS.labels(status=status).inc()
+        IN_FLIGHT.dec()
+
+    async def _mark_failed(self, job: IngestionJob, error: BaseException, stage: str = "unknown"):
+        """Record a processing failure on the document."""
+        doc_id = job.doc_id
+        # Stage artifacts are kept so that a retry can resume from them
+        self.leases.release(doc_id)
+        if isinstance(error, LeaseLostError):
+            # Another processor reclaimed the document; leave its status alone
+            logger.warning(str(error))
+            self._finished(job, "lease_lost")
+            return
+        if job.metrics.failed_stage is None:
+            # Raised outside a timed step, e.g. while writing a checkpoint
+            job.metrics.failed_stage = stage
+            STAGE_ERRORS.labels(stage=stage).inc()
+        self._finished(job, "failed")
+
+        error_msg = f"Error processing document {doc_id}: {str(error)}\n{''.join(traceback.format_exception(error))}"
+        logger.error(error_msg)
+        await self.db.documents.update_one(
+            self.leases.owns(doc_id),
+            {
+                "$set": {
+                    "status": "failed",
+                    "processing_error": error_msg,
+                    "processing_metrics": job.metrics.to_dict(time.time() - job.start_time)
+                },
+                "$unset": {"lease": ""}
+            }
+        )
+        await self._publish(job, status="failed", error=str(error))
+
+    async def _discard_partial_results(self, job: IngestionJob):
+        """Remove chunks stored by an attempt that was interrupted while storing."""
+        logger.info(f"Discarding partial results of document {job.doc_id}")
+        await self.db.document_chunks.delete_many({"document_id": job.doc_id})
+        await self.indexer.delete_document(job.doc_id)
+
+    async def _checkpoint(self, job: IngestionJob, stage: str, **details):
+        """Record that a stage finished and its output is on disk.
+
+        Checkpoints of later stages were built from the previous output of
+        this stage, so they are dropped.
+        """
+        later = STAGES[STAGES.index(stage) + 1:]
+        for name in later:
+            job.checkpoints.pop(name, None)
+        job.checkpoints[stage] = {**details, "completed_at": datetime.utcnow()}
+        update = {"$set": {f"checkpoints.{stage}": job.checkpoints[stage]}}
+        if later:
+            update["$unset"] = {f"checkpoints.{name}": "" for name in later}
+        result = await self.db.documents.update_one(self.leases.owns(job.doc_id), update)
+        if result.matched_count == 0:
+            raise LeaseLostError(f"Lease on document {job.doc_id} expired during stage '{stage}'")
+
+    def _chunking_parameters(self) -> Dict:
+        """Settings a chunks checkpoint must match to be reused."""
+        return {
+            "min_size": self.chunker.min_chunk_size,
+            "max_size": self.chunker.max_chunk_size,
+            "overlap": self.chunker.overlap_size
+        }
+
+    def _source_file(self, job: IngestionJob) -> str:
+        """Current location of the uploaded file."""
+        processed_path = get_storage_path(config["storage"]["directories"]["processed"])
+        moved_file = os.path.join(processed_path, os.path.basename(job.doc["file_path"]))
+        # A previous attempt may already have moved it to the processed directory
+        if not os.path.exists(job.doc["file_path"]) and os.path.exists(moved_file):
+            return moved_file
+        return job.doc["file_path"]
+
+    async def _parse(self, job: IngestionJob) -> ParsedDocument:
+        """Parse a document without blocking the event loop.
+
+        Formats with a registered fast parser skip docling; the fast parser
+        may still decline (e.g. a scanned PDF) and fall through to docling.
+        """
+        file_path = self._source_file(job)
+        pages_path = self.checkpoints.pages_path(job.doc_id)
+        try:
+            logger.info(f"Starting to parse document: {file_path}")
+            fast_parser = self.fast_parsers.get(job.doc["mime_type"], file_path) if self.fast_parsers else None
+            if fast_parser is not None:
+                if self.parser_pool is not None:
+                    parsed = await self.parser_pool.run(fast_parser, file_path, pages_path)
+                else:
+                    parsed = await asyncio.to_thread(fast_parser, file_path, pages_path)
+                if parsed is not None:
+                    logger.info(f"Parsed {job.doc['mime_type']} document without docling: {parsed.page_count} pages")
+                    return parsed
+            if self.parser_pool is not None:
+                parsed = await self._parse_in_pool(job, file_path, pages_path)
+            else:
+                parsed = await asyncio.to_thread(convert_document, self.parser, file_path, pages_path)
+            logger.info(f"Successfully parsed document. Found {parsed.page_count} pages.")
+            return parsed
+        except Exception as e:
+            logger.error(f"Error parsing document: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    async def _parse_in_pool(self, job: IngestionJob, file_path: str, pages_path: str) -> ParsedDocument:
+        """Parse with docling in the pool, splitting large PDFs into page ranges."""
+        split_settings = config["processor"]["parsing"]["split_pdf"]
+        if split_settings["enabled"] and job.doc["mime_type"] == "application/pdf":
             try:
-                logger.info(f"Starting to parse document: {doc['file_path']}")
-                result = self.parser.convert(doc["file_path"])
-                logger.info(f"Successfully parsed document. Found {len(result.pages)} pages.")
-                
+                page_count = await asyncio.to_thread(pdf_page_count, file_path)
             except Exception as e:
-                logger.error(f"Error parsing document: {str(e)}")
-                logger.error(traceback.format_exc())
-                raise
-            
-            # Extract text content and analyze document structure
-            doc_content = ""
-            section_structure = []
-            current_section = None
-            
-            for page_num, page in enumerate(result.pages, 1):
-                page_text = []
-                for cell in page.cells:
-                    if hasattr(cell, 'text') and cell.text:
-                        page_text.append(cell.text)
-                        
-                        # Check for section headers
-                        section_type, level = self.analyzer.identify_section_type(cell.text)
-                        if section_type == 'heading':
-                            if current_section:
-                                current_section['end_page'] = page_num - 1
-                                section_structure.append(current_section)
-                            current_section = {
-                                'title': cell.text.strip(),
-                                'level': level,
-                                'start_page': page_num
-                            }
-                
-                doc_content += "\n".join(page_text) + "\n\n"
-            
-            # Add final section if exists
-            if current_section:
-                current_section['end_page'] = len(result.pages)
-                section_structure.append(current_section)
+                logger.warning(f"Could not count pages of {file_path}, parsing it whole: {str(e)}")
+                page_count = 0
+            if page_count > split_settings["min_pages"]:
+                return await self.parser_pool.parse_ranges(
+                    file_path, pages_path, page_count, split_settings["pages_per_range"]
+                )
+        return await self.parser_pool.parse(file_path, pages_path)
 
-            logger.info(f"Extracted {len(doc_content)} characters of text content")
+    def _extract_and_chunk(self, job: IngestionJob, parsed: ParsedDocument):
+        """Analyze and chunk parsed content page by page. Runs off the event loop."""
+        sections = SectionTracker(self.analyzer)
+        sample = []
+        sample_size = 0
+        job.total_characters = 0
 
-            # Extract document metadata
-            doc_metadata = self.analyzer.extract_metadata(doc_content)
-            
-            # Create intelligent chunks
-            chunks = self.chunker.create_chunks(doc_content, doc_id)
-            logger.info(f"Created {len(chunks)} intelligent chunks")
+        def page_texts():
+            # Section detection and the chunker consume the same page stream,
+            # so only a window of pages is ever held in memory
+            nonlocal sample_size
+            for page_num, cells in enumerate(parsed.iter_pages(), 1):
+                sections.add_page(page_num, cells)
+                page_text = "\n".join(cells) + "\n\n"
+                job.total_characters += len(page_text)
+                if sample_size < self.analyzer.metadata_sample_size:
+                    sample.append(page_text)
+                    sample_size += len(page_text)
+                yield page_text
 
-            # Move file to processed directory
-            processed_path = get_storage_path(config["storage"]["directories"]["processed"])
-            processed_file = os.path.join(processed_path, os.path.basename(doc["file_path"]))
-            shutil.move(doc["file_path"], processed_file)
+        # Create intelligent chunks
+        job.chunks = list(self.chunker.iter_chunks(page_texts(), job.doc_id))
+        logger.info(f"Extracted {job.total_characters} characters of text content")
+        logger.info(f"Created {len(job.chunks)} intelligent chunks")
 
-            # Update status to generating embeddings
-            await self.db.documents.update_one(
-                {"_id": ObjectId(doc_id)},
-                {"$set": {"status": "generating_embeddings"}}
-            )
+        # Extract document metadata from the leading pages
+        job.doc_metadata = self.analyzer.extract_metadata("".join(sample)[:self.analyzer.metadata_sample_size])
+
+        job.page_count = parsed.page_count
+        job.section_structure = sections.finish(parsed.page_count)
+
+    async def parse_document(self, job: IngestionJob) -> Optional[IngestionJob]:
+        """Stage 1: parse and chunk a document."""
+        # Documents arrive already claimed, with status set to parsing
+        if not job.doc:
+            logger.error(f"Document {job.doc_id} not found")
+            self._finished(job, "missing")
+            return None
+
+        # Start timer for processing
+        job.start_time = time.time()
+        job.checkpoints = dict(job.doc.get("checkpoints") or {})
+        await self._publish(job, status="parsing")
+
+        # Resume from the chunks of a previous attempt if they are still valid
+        chunked = job.checkpoints.get("chunked")
+        if chunked and chunked.get("parameters") == self._chunking_parameters():
+            state = await asyncio.to_thread(self.checkpoints.load_chunks, job.doc_id)
+            if state is not None:
+                logger.info(f"Resuming document {job.doc_id} from its chunks checkpoint")
+                job.page_count = state["page_count"]
+                job.total_characters = state["total_characters"]
+                job.section_structure = state["section_structure"]
+                job.doc_metadata = state["doc_metadata"]
+                job.chunks = state["chunks"]
+                await self._publish(job, pages_parsed=job.page_count, chunks_total=len(job.chunks))
+                return job
+
+        # Parsing and spaCy analysis are CPU-bound; keep them off the event loop
+        parsed_checkpoint = job.checkpoints.get("parsed")
+        pages_path = self.checkpoints.pages_path(job.doc_id)
+        if parsed_checkpoint and os.path.exists(pages_path):
+            logger.info(f"Resuming document {job.doc_id} from its parsed text checkpoint")
+            parsed = ParsedDocument(page_count=parsed_checkpoint["page_count"], pages_path=pages_path)
+        else:
+            with job.metrics.time("parse"):
+                parsed = await self._parse(job)
+            job.metrics.count("pages", parsed.page_count)
+        await self._checkpoint(job, "parsed", page_count=parsed.page_count)
+        await self._publish(job, pages_parsed=parsed.page_count)
+
+        with job.metrics.time("analyze"):
+            await asyncio.to_thread(self._extract_and_chunk, job, parsed)
+        await asyncio.to_thread(self.checkpoints.save_chunks, job.doc_id, {
+            "page_count": job.page_count,
+            "total_characters": job.total_characters,
+            "section_structure": job.section_structure,
+            "doc_metadata": job.doc_metadata,
+            "chunks": job.chunks
+        })
+        await self._checkpoint(job, "chunked", chunks=len(job.chunks), parameters=self._chunking_parameters())
+        await self._publish(job, chunks_total=len(job.chunks))
+        return job
+
+    async def embed_document(self, job: IngestionJob) -> IngestionJob:
+        """Stage 2: generate embeddings for all chunks."""
+        # Update status to generating embeddings
+        await self._set_status(job.doc_id, "generating_embeddings")
+        await self._publish(job, status="generating_embeddings", chunks_embedded=0)
+
+        embedded = job.checkpoints.get("embedded")
+        if embedded and embedded.get("model") == self.embedding_model:
+            embeddings = await asyncio.to_thread(self.checkpoints.load_embeddings, job.doc_id)
+            if embeddings is not None and len(embeddings) == len(job.chunks):
+                logger.info(f"Resuming document {job.doc_id} from its embeddings checkpoint")
+                job.embeddings = embeddings
+                await self._publish(job, chunks_embedded=len(embeddings))
+                return job
+
+        try:
+            logger.info("Generating embeddings...")
+            chunk_contents = [chunk['content'] for chunk in job.chunks]
+            usage: Dict[str, int] = {}
+            misses = 0
+
+            async def checkpoint(texts: List[str], vectors: List[List[float]]):
+                # Each finished batch is persisted at once, so a retry after a
+                # failed batch only pays for the batches that did not complete
+                await self.embedding_cache.put_many(self.embedding_model, texts, vectors)
+                await self.db.documents.update_one(
+                    self.leases.owns(job.doc_id),
+                    {"$inc": {"embedding_progress.embedded_chunks": len(texts)}}
+                )
+                await self._publish(job, chunks_embedded=job.progress["chunks_embedded"] + len(texts))
+
+            async def embed_misses(texts: List[str]) -> List[List[float]]:
+                nonlocal misses
+                misses = len(texts)
+                await self.db.documents.update_one(
+                    self.leases.owns(job.doc_id),
+                    {"$set": {"embedding_progress": {"total_chunks": len(texts), "embedded_chunks": 0}}}
+                )
+                # Chunks served from the cache count as embedded already
+                await self._publish(job, chunks_embedded=len(chunk_contents) - len(texts))
+                return await self.embedding_batcher.embed(texts, on_batch=checkpoint, usage=usage)
 
             try:
-                logger.info("Generating embeddings...")
-                chunk_contents = [chunk['content'] for chunk in chunks]
-                embeddings_list = await self.embeddings.aembed_documents(chunk_contents)
-                logger.info(f"Generated {len(embeddings_list)} embeddings")
-            except Exception as e:
-                logger.error(f"Error generating embeddings: {str(e)}")
-                logger.error(traceback.format_exc())
-                raise
+                with job.metrics.time("embed"):
+                    job.embeddings = await self.embedding_cache.embed_documents(
+                        self.embedding_model,
+                        chunk_contents,
+                        embed_misses,
+                        store_results=False
+                    )
+            finally:
+                # Batches that succeeded before a failure were still billed
+                job.metrics.count("embedding_tokens", usage.get("tokens", 0))
+                job.metrics.count("embedding_requests", usage.get("requests", 0))
+            job.metrics.count("cached_chunks", len(chunk_contents) - misses)
+            logger.info(f"Generated {len(job.embeddings)} embeddings")
+            await self._publish(job, chunks_embedded=len(job.embeddings))
+            await asyncio.to_thread(self.checkpoints.save_embeddings, job.doc_id, job.embeddings)
+            await self._checkpoint(job, "embedded", model=self.embedding_model, chunks=len(job.embeddings))
+        except Exception as e:
+            logger.error(f"Error generating embeddings: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+        return job
+
+    def _with_vector(self, chunk_doc: Dict, embedding: List[float]) -> Dict:
+        """Store the chunk vector in Mongo according to ``storage.chunk_vectors``.
+
+        Elasticsearch always holds the vector; Mongo keeps none, a packed
+        float32 blob, or the legacy array of doubles.
+        """
+        if self.chunk_vector_mode == "binary":
+            chunk_doc["embedding"]["vector"] = pack_vector(embedding)
+        elif self.chunk_vector_mode == "array":
+            chunk_doc["embedding"]["vector"] = embedding
+        else:
+            chunk_doc["embedding"].pop("vector", None)
+        return chunk_doc
+
+    async def _store_chunks(self, job: IngestionJob):
+        """Write chunks to MongoDB and Elasticsearch, then checkpoint the stage."""
+        doc_id = job.doc_id
+        doc = job.doc
+        chunks = job.chunks
+
+        # An earlier attempt may have stored some chunks before it failed
+        if job.doc.get("checkpoints") or job.doc.get("attempts", 1) > 1:
+            await self._discard_partial_results(job)
 
-            # Prepare chunks for database
-            chunk_docs = []
-            es_operations = []
+        # Prepare chunks for database
+        chunk_docs = []
+        es_docs = []
+        
+        for idx, (chunk, embedding) in enumerate(zip(chunks, job.embeddings)):
+            chunk_id = str(ObjectId())
             
-            for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings_list)):
-                chunk_id = str(ObjectId())
-                
-                # Create MongoDB chunk document
-                chunk_doc = DocumentChunk(
-                    document_id=doc_id,
-                    content=chunk['content'],
-                    position=chunk['position'],
-                    metadata=chunk['metadata'],
-                    content_stats=chunk['content_stats'],
-                    quality=chunk['quality'],
-                    embedding={
-                        'model': config["openai"]["model"],
-                        'vector': embedding,
-                        'dimensions': len(embedding)
-                    }
-                )
-                chunk_docs.append(chunk_doc.dict())
-
-                # Prepare Elasticsearch document
-                es_doc = {
-                    'chunk_id': chunk_id,
-                    'document_id': doc_id,
-                    'content': chunk['content'],
-                    'embedding': embedding,
-                    'metadata': {
-                        'filename': doc['filename'],
-                        'mime_type': doc['mime_type'],
-                        'section_type': chunk['metadata']['section_type'],
-                        'section_level': chunk['metadata']['section_level']
-                    }
+            # Create MongoDB chunk document
+            chunk_doc = DocumentChunk(
+                document_id=doc_id,
+                content=chunk['content'],
+                position=chunk['position'],
+                metadata=chunk['metadata'],
+                content_stats=chunk['content_stats'],
+                quality=chunk['quality'],
+                embedding={
+                    'model': config["openai"]["model"],
+                    'dimensions': len(embedding)
                 }
-                es_operations.extend([
-                    {"index": {"_index": f"{config['elasticsearch']['index']['prefix']}_chunks", "_id": chunk_id}},
-                    es_doc
-                ])
+            )
+            chunk_docs.append(self._with_vector(chunk_doc.dict(), embedding))
 
-            # Calculate processing time
-            processing_time = time.time() - start_time
+            # Prepare Elasticsearch document
+            es_doc = {
+                'chunk_id': chunk_id,
+                'document_id': doc_id,
+                'content': chunk['content'],
+                'embedding': embedding,
+                'metadata': {
+                    'filename': doc['filename'],
+                    'mime_type': doc['mime_type'],
+                    'section_type': chunk['metadata']['section_type'],
+                    'section_level': chunk['metadata']['section_level']
+                }
+            }
+            es_docs.append((chunk_id, es_doc))
 
-            # Save chunks and update document
-            try:
-                logger.info(f"Saving {len(chunk_docs)} chunks to MongoDB...")
+        try:
+            logger.info(f"Saving {len(chunk_docs)} chunks to MongoDB...")
+            with job.metrics.time("store_mongo"):
                 if chunk_docs:
                     await self.db.document_chunks.insert_many(chunk_docs)
-                
-                logger.info("Saving embeddings to Elasticsearch...")
-                if es_operations:
-                    await self.es.bulk(operations=es_operations, refresh=True)
-                
-                # Update document with enhanced metadata
-                await self.db.documents.update_one(
-                    {"_id": ObjectId(doc_id)},
-                    {
-                        "$set": {
-                            "status": "processed",
-                            "file_path": processed_file,
-                            "metadata": {
-                                "content_type": doc["mime_type"],
-                                "page_count": len(result.pages),
-                                "document_structure": {
-                                    "sections": section_structure
-                                },
-                                "language": doc_metadata["language"],
-                                "keywords": doc_metadata["keywords"],
-                                "processing_time": processing_time
-                            },
-                            "content_stats": {
-                                "total_chunks": len(chunks),
-                                "total_characters": len(doc_content),
-                                "average_chunk_size": sum(len(c['content']) for c in chunks) / len(chunks),
-                                "chunking_strategy": {
-                                    "method": "smart_chunking",
-                                    "parameters": {
-                                        "min_size": self.chunker.min_chunk_size,
-                                        "max_size": self.chunker.max_chunk_size,
-                                        "overlap": self.chunker.overlap_size
-                                    }
-                                }
-                            }
-                        }
-                    }
+            
+            logger.info("Saving embeddings to Elasticsearch...")
+            with job.metrics.time("store_es"):
+                await self.indexer.index(
+                    es_docs,
+                    on_progress=lambda indexed: self._publish(job, chunks_indexed=indexed)
                 )
-                
-                logger.info(f"Document processing completed in {processing_time:.2f} seconds")
-                
-            except Exception as e:
-                logger.error(f"Error saving chunks and embeddings: {str(e)}")
-                logger.error(traceback.format_exc())
-                raise
-
+            job.metrics.count("chunks", len(chunk_docs))
         except Exception as e:
-            error_msg = f"Error processing document {doc_id}: {str(e)}\n{traceback.format_exc()}"
-            logger.error(error_msg)
-            await self.db.documents.update_one(
-                {"_id": ObjectId(doc_id)},
+            logger.error(f"Error saving chunks and embeddings: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+        await self._checkpoint(job, "indexed", chunks=len(chunk_docs))
+
+    async def store_document(self, job: IngestionJob) -> IngestionJob:
+        """Stage 3: persist chunks to MongoDB and Elasticsearch."""
+        doc_id = job.doc_id
+        doc = job.doc
+        chunks = job.chunks
+
+        if "indexed" not in job.checkpoints:
+            await self._store_chunks(job)
+
+        # Calculate processing time
+        processing_time = time.time() - job.start_time
+
+        # Move the file and update the document
+        try:
+            # The source file stays in the uploads directory until the chunks are stored
+            processed_path = get_storage_path(config["storage"]["directories"]["processed"])
+            source_file = self._source_file(job)
+            job.processed_file = os.path.join(processed_path, os.path.basename(source_file))
+            with job.metrics.time("finalize"):
+                if source_file != job.processed_file:
+                    await asyncio.to_thread(shutil.move, source_file, job.processed_file)
+
+            # Update document with enhanced metadata and release the lease
+            result = await self.db.documents.update_one(
+                self.leases.owns(doc_id),
                 {
+                    "$unset": {"lease": ""},
                     "$set": {
-                        "status": "failed",
-                        "processing_error": error_msg
+                        "status": "processed",
+                        "file_path": job.processed_file,
+                        "processing_settings.embedding_model": self.embedding_model,
+                        "processing_metrics": job.metrics.to_dict(processing_time),
+                        "metadata": {
+                            "content_type": doc["mime_type"],
+                            "page_count": job.page_count,
+                            "document_structure": {
+                                "sections": job.section_structure
+                            },
+                            "language": job.doc_metadata["language"],
+                            "keywords": job.doc_metadata["keywords"],
+                            "processing_time": processing_time
+                        },
+                        "content_stats": {
+                            "total_chunks": len(chunks),
+                            "total_characters": job.total_characters,
+                            "average_chunk_size": sum(len(c['content']) for c in chunks) / len(chunks),
+                            "chunking_strategy": {
+                                "method": "smart_chunking",
+                                "parameters": self._chunking_parameters()
+                            }
+                        }
                     }
                 }
             )
+            if result.matched_count == 0:
+                raise LeaseLostError(f"Lease on document {doc_id} expired before it was stored")
+            self.leases.release(doc_id)
+        except Exception as e:
+            logger.error(f"Error finalizing document: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+        # The document is committed as processed; cleanup failures must not fail it
+        try:
+            await asyncio.to_thread(self.checkpoints.remove, doc_id)
+            await self._publish(job, status="processed", chunks_indexed=len(chunks))
+        except Exception as e:
+            logger.warning(f"Cleanup after storing document {doc_id} failed: {str(e)}")
+        self._finished(job, "processed")
+        logger.info(f"Document processing completed in {processing_time:.2f} seconds")
+        return job
+
+    async def process_document(self, doc_id: str, doc: Optional[Dict] = None):
+        """Process a single claimed document with enhanced analysis."""
+        job = IngestionJob(doc_id=doc_id, doc=doc)
+        stage = "parse"
+        try:
+            if await self.parse_document(job) is None:
+                return
+            stage = "embed"
+            await self.embed_document(job)
+            stage = "store"
+            await self.store_document(job)
+        except Exception as e:
+            await self._mark_failed(job, e, stage)
+
+    async def _on_stage_error(self, stage: str, job: IngestionJob, error: BaseException):
+        """Mark a document failed when one of its pool stages raises."""
+        logger.error(f"Document {job.doc_id} failed in stage '{stage}'")
+        await self._mark_failed(job, error, stage)
+
+    async def start_pool(self) -> IngestionWorkerPool:
+        """Create and start the ingestion worker pool if needed."""
+        if self.pool is None:
+            workers = self.pool_settings["stage_workers"]
+            self.pool = IngestionWorkerPool(
+                stages=[
+                    Stage("parse", self.parse_document, workers["parse"]),
+                    Stage("embed", self.embed_document, workers["embed"]),
+                    Stage("store", self.store_document, workers["store"])
+                ],
+                queue_size=self.pool_settings["queue_size"],
+                max_in_flight=self.pool_settings["max_concurrent_documents"],
+                on_error=self._on_stage_error
+            )
+            for stage in self.pool.stages:
+                QUEUE_DEPTH.labels(stage=stage.name).set_function(
+                    lambda name=stage.name: self.pool.queue_depths().get(name, 0) if self.pool else 0
+                )
+        await self.pool.start()
+        return self.pool
 
-    async def process_pending_documents(self):
-        """Process all pending documents."""
+    async def process_pending_documents(self, wait: bool = True):
+        """Claim and process pending documents until none are left.
+
+        With the worker pool enabled, ``wait`` controls whether to block until
+        the claimed documents have finished all stages.
+        """
         try:
-            cursor = self.db.documents.find({"status": "pending"})
-            async for doc in cursor:
+            pool = await self.start_pool() if self.pool_settings["enabled"] else None
+            self.leases.start_heartbeat()
+            await self.leases.fail_exhausted()
+            while not self._stopping.is_set():
+                doc = await self.leases.claim()
+                if doc is None:
+                    break
                 logger.info(f"Processing document: {doc['_id']}")
-                await self.process_document(str(doc["_id"]))
+                IN_FLIGHT.inc()
+                if pool:
+                    await pool.submit(IngestionJob(doc_id=str(doc["_id"]), doc=doc))
+                else:
+                    await self.process_document(str(doc["_id"]), doc)
+            if pool and wait:
+                await pool.join()
+            await self.embedding_cache.flush_stats("processor")
+            logger.info(f"Embedding cache: {self.embedding_cache.stats()}")
         except Exception as e:
             logger.error(f"Error in process_pending_documents: {str(e)}")
             logger.error(traceback.format_exc())
 
-    async def run_forever(self, interval_seconds: int = 30):
+    async def _on_pending_change(self, change: Dict):
+        """Wake the claim loop when a document becomes pending."""
+        logger.debug(f"Change stream: document {change['documentKey']['_id']} is pending")
+        self._wakeup.set()
+
+    async def _on_change_stream_gap(self):
+        """Scan for pending documents when change events may have been missed."""
+        self._wakeup.set()
+
+    async def _watch_changes(self):
+        """Feed change-stream events into the claim loop, falling back to polling."""
+        try:
+            await self.watcher.watch(self._on_pending_change, on_gap=self._on_change_stream_gap)
+        except ChangeStreamUnavailable as e:
+            logger.warning(f"Change streams unavailable, falling back to polling: {str(e)}")
+        except Exception as e:
+            logger.error(f"Change stream watcher stopped, falling back to polling: {str(e)}")
+        finally:
+            self._watching = False
+            self._wakeup.set()
+
+    async def _wait_for_work(self, timeout: float):
+        """Sleep until new work is signalled, the timeout passes or shutdown starts."""
+        waiters = [
+            asyncio.create_task(self._stopping.wait()),
+            asyncio.create_task(self._wakeup.wait())
+        ]
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        self._wakeup.clear()
+
+    async def prepare_database(self):
+        """Create the lease indexes and the capped events collection before processing.
+
+        Without this, Mongo would create the events collection uncapped on the
+        first published event, and event streams could not tail it.
+        """
+        await self.leases.ensure_indexes()
+        await ensure_events_collection(
+            self.db,
+            config["ingestion_events"]["collection"],
+            config["ingestion_events"]["capped_size_bytes"]
+        )
+
+    async def run_forever(self, interval_seconds: Optional[int] = None):
         """Run the processor continuously."""
+        if interval_seconds is None:
+            interval_seconds = config["processor"]["poll_interval_seconds"]
+        watch_task = None
         try:
-            while True:
+            await self.prepare_database()
+            if self.change_stream_settings["enabled"]:
+                self._watching = True
+                watch_task = asyncio.create_task(self._watch_changes(), name="document-watcher")
+
+            while not self._stopping.is_set():
                 logger.info("Checking for pending documents...")
-                await self.process_pending_documents()
-                logger.info(f"Sleeping for {interval_seconds} seconds...")
-                await asyncio.sleep(interval_seconds)
-        except KeyboardInterrupt:
+                await self.process_pending_documents(wait=False)
+
+                # With a live change stream only a slow safety scan is needed,
+                # to pick up expired leases and anything the stream missed
+                timeout = self.change_stream_settings["rescan_seconds"] if self._watching else interval_seconds
+                logger.info(f"Waiting up to {timeout} seconds for new documents...")
+                await self._wait_for_work(timeout)
+        except (KeyboardInterrupt, asyncio.CancelledError):
             logger.info("Shutting down...")
         finally:
+            if watch_task is not None:
+                watch_task.cancel()
+                await asyncio.gather(watch_task, return_exceptions=True)
+            if self.pool is not None:
+                await self.pool.shutdown(drain=True)
+                self.pool = None
+            await self.close()
+
+    async def run_backfill(self):
+        """Process every pending document once with index refreshes disabled."""
+        try:
+            await self.prepare_database()
+            async with self.indexer.backfill():
+                await self.process_pending_documents(wait=True)
+        finally:
+            if self.pool is not None:
+                await self.pool.shutdown(drain=True)
+                self.pool = None
             await self.close()
 
+def parse_args() -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="ZAI Engine document processor")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Maximum number of documents processed concurrently (enables the worker pool)"
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Poll for pending documents instead of watching a change stream"
+    )
+    parser.add_argument(
+        "--serial",
+        action="store_true",
+        help="Process documents one at a time without the worker pool"
+    )
+    parser.add_argument(
+        "--backfill",
+        action="store_true",
+        help="Process the pending backlog once in bulk-load mode, then exit"
+    )
+    return parser.parse_args()
+
 async def main():
     """Main entry point."""
+    args = parse_args()
     processor = DocumentProcessor()
-    await processor.run_forever()
+    if args.poll:
+        processor.change_stream_settings["enabled"] = False
+    if args.serial:
+        processor.pool_settings["enabled"] = False
+    elif args.workers:
+        processor.pool_settings["enabled"] = True
+        processor.pool_settings["max_concurrent_documents"] = args.workers
+
+    if config["metrics"]["enabled"]:
+        start_http_server(config["metrics"]["processor_port"])
+        logger.info(f"Serving Prometheus metrics on port {config['metrics']['processor_port']}")
+
+    # Finish in-flight documents on SIGINT/SIGTERM instead of dropping them
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, processor.stop)
+        except NotImplementedError:
+            pass
+
+    if args.backfill:
+        await processor.run_backfill()
+    else:
+        await processor.run_forever()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
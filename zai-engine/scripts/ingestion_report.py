@@ -0,0 +1,128 @@
+"""Summarize recent ingestion from the processing metrics stored on documents.
+
+Shows where processing time goes per stage (mean, p50, p95 and share of
+the total), failures by stage, throughput and embedding usage, plus the
+current number of documents in each status.
+
+Usage (from the zai-engine directory):
+    python -m scripts.ingestion_report
+    python -m scripts.ingestion_report --hours 1 --json
+"""
+import argparse
+import asyncio
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services.ingestion_metrics import TIMED_STAGES
+from config import config
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(metrics: List[Dict], status_counts: Dict[str, int], hours: float) -> Dict:
+    """Aggregate the processing metrics of finished documents."""
+    stage_values: Dict[str, List[float]] = defaultdict(list)
+    counters: Counter = Counter()
+    failures: Counter = Counter()
+    total_seconds = 0.0
+    for entry in metrics:
+        for stage, seconds in entry.get("stages", {}).items():
+            stage_values[stage].append(seconds)
+        counters.update(entry.get("counters", {}))
+        total_seconds += entry.get("total_seconds") or 0.0
+        if entry.get("failed_stage"):
+            failures[entry["failed_stage"]] += 1
+
+    stage_total = sum(sum(values) for values in stage_values.values())
+    ordered_stages = [stage for stage in TIMED_STAGES if stage in stage_values]
+    ordered_stages += sorted(set(stage_values) - set(TIMED_STAGES))
+    return {
+        "hours": hours,
+        "documents": len(metrics),
+        "failed": sum(failures.values()),
+        "failures_by_stage": dict(failures),
+        "stages": {
+            stage: {
+                "documents": len(stage_values[stage]),
+                "total_seconds": round(sum(stage_values[stage]), 2),
+                "mean_seconds": round(sum(stage_values[stage]) / len(stage_values[stage]), 3),
+                "p50_seconds": round(percentile(stage_values[stage], 0.5), 3),
+                "p95_seconds": round(percentile(stage_values[stage], 0.95), 3),
+                "share": round(sum(stage_values[stage]) / stage_total, 3) if stage_total else None
+            }
+            for stage in ordered_stages
+        },
+        "counters": dict(counters),
+        # Per document of processing time; concurrent documents overlap in wall time
+        "chunks_per_second": round(counters["chunks"] / total_seconds, 2) if total_seconds else None,
+        "status_counts": status_counts
+    }
+
+def print_summary(summary: Dict):
+    """Print a summary as aligned text."""
+    print(f"Last {summary['hours']:g}h: {summary['documents']} documents finished, {summary['failed']} failed")
+    if summary["failures_by_stage"]:
+        print("Failures by stage: " + ", ".join(f"{stage}={count}" for stage, count in summary["failures_by_stage"].items()))
+    print()
+    print(f"{'stage':<14}{'docs':>7}{'total s':>11}{'mean s':>10}{'p50 s':>10}{'p95 s':>10}{'share':>8}")
+    for stage, stats in summary["stages"].items():
+        share = f"{stats['share']:.0%}" if stats["share"] is not None else "-"
+        print(
+            f"{stage:<14}{stats['documents']:>7}{stats['total_seconds']:>11.2f}{stats['mean_seconds']:>10.3f}"
+            f"{stats['p50_seconds']:>10.3f}{stats['p95_seconds']:>10.3f}{share:>8}"
+        )
+    print()
+    counters = summary["counters"]
+    print(
+        f"Pages: {counters.get('pages', 0)}  Chunks: {counters.get('chunks', 0)} "
+        f"(cached embeddings: {counters.get('cached_chunks', 0)})  "
+        f"Chunks/s per document: {summary['chunks_per_second'] or '-'}"
+    )
+    print(
+        f"Embedding tokens: {counters.get('embedding_tokens', 0)}  "
+        f"requests: {counters.get('embedding_requests', 0)}"
+    )
+    print("Documents by status: " + ", ".join(f"{status}={count}" for status, count in sorted(summary["status_counts"].items())))
+
+async def report(hours: float, as_json: bool):
+    """Load metrics of documents finished in the last ``hours`` and print the summary."""
+    client = AsyncIOMotorClient(config["mongodb"]["connection"]["url"])
+    documents = client[config["mongodb"]["connection"]["db_name"]].documents
+    try:
+        since = datetime.utcnow() - timedelta(hours=hours)
+        metrics = [
+            doc["processing_metrics"]
+            async for doc in documents.find(
+                {"processing_metrics.finished_at": {"$gte": since}},
+                {"processing_metrics": 1}
+            )
+        ]
+        status_counts = {
+            group["_id"]: group["count"]
+            async for group in documents.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        }
+    finally:
+        client.close()
+
+    summary = summarize(metrics, status_counts, hours)
+    if as_json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Summarize recent ingestion performance")
+    parser.add_argument("--hours", type=float, default=24, help="Report on documents finished in this many hours")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(report(args.hours, args.json))
@@ -0,0 +1,83 @@
+"""Rewrite the embedding vectors of existing chunks to a storage mode.
+
+Modes match ``storage.chunk_vectors``: ``none`` drops vectors from MongoDB
+(Elasticsearch keeps them), ``binary`` packs them as float32 blobs and
+``array`` restores plain arrays of doubles.
+
+Usage (from the zai-engine directory):
+    python -m scripts.migrate_chunk_vectors --to binary
+    python -m scripts.migrate_chunk_vectors --to none --dry-run
+"""
+import argparse
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from app.utils.vector_utils import pack_vector, vector_to_list
+from config import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# BSON type of the vectors each mode converts from
+SOURCE_TYPES = {
+    "none": ["array", "binData"],
+    "binary": ["array"],
+    "array": ["binData"]
+}
+
+def convert(chunk: dict, mode: str) -> UpdateOne:
+    """Build the update that moves one chunk's vector to ``mode``."""
+    if mode == "none":
+        return UpdateOne({"_id": chunk["_id"]}, {"$unset": {"embedding.vector": ""}})
+    vector = chunk["embedding"]["vector"]
+    if mode == "binary":
+        return UpdateOne({"_id": chunk["_id"]}, {"$set": {"embedding.vector": pack_vector(vector)}})
+    return UpdateOne({"_id": chunk["_id"]}, {"$set": {"embedding.vector": vector_to_list(vector)}})
+
+async def migrate(mode: str, batch_size: int, dry_run: bool):
+    """Convert every chunk whose vector is not yet stored as ``mode``."""
+    client = AsyncIOMotorClient(config["mongodb"]["connection"]["url"])
+    collection = client[config["mongodb"]["connection"]["db_name"]].document_chunks
+    query = {"embedding.vector": {"$type": SOURCE_TYPES[mode]}}
+    try:
+        total = await collection.count_documents(query)
+        logger.info(f"{total} chunks to convert to '{mode}'")
+        if dry_run or not total:
+            return
+
+        converted = 0
+        batch = []
+        projection = {"_id": 1} if mode == "none" else {"embedding.vector": 1}
+        async for chunk in collection.find(query, projection, batch_size=batch_size):
+            batch.append(convert(chunk, mode))
+            if len(batch) >= batch_size:
+                result = await collection.bulk_write(batch, ordered=False)
+                converted += result.modified_count
+                batch = []
+                logger.info(f"Converted {converted}/{total} chunks")
+        if batch:
+            result = await collection.bulk_write(batch, ordered=False)
+            converted += result.modified_count
+        logger.info(f"Converted {converted} chunks to '{mode}'")
+    finally:
+        client.close()
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Migrate chunk vectors to another storage mode")
+    parser.add_argument(
+        "--to",
+        choices=sorted(SOURCE_TYPES),
+        default=config["storage"]["chunk_vectors"],
+        help="Target storage mode (defaults to storage.chunk_vectors)"
+    )
+    parser.add_argument("--batch-size", type=int, default=500, help="Chunks per bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the chunks to convert")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(migrate(args.to, args.batch_size, args.dry_run))
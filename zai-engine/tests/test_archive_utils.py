@@ -0,0 +1,36 @@
+import io
+import os
+import tarfile
+import zipfile
+
+from app.utils.archive_utils import extract_archive, is_archive
+
+def test_zip_members_are_filtered_and_stored_under_fresh_names(tmp_path):
+    archive_path = tmp_path / "corpus.zip"
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("docs/a.txt", "alpha")
+        archive.writestr("../../escape.md", "# beta")
+        archive.writestr("image.png", b"\x89PNG")
+        archive.writestr("__MACOSX/docs/._a.txt", "metadata")
+        archive.writestr("big.txt", "x" * 100)
+    destination = tmp_path / "uploads"
+
+    stored, skipped = extract_archive(str(archive_path), str(destination), ["txt", "md"], 50, 10)
+
+    assert sorted(item.name for item in stored) == ["a.txt", "escape.md"]
+    assert all(os.path.dirname(item.file_path) == str(destination) for item in stored)
+    assert {item["name"] for item in skipped} == {"image.png", "big.txt"}
+
+def test_tar_member_limit(tmp_path):
+    archive_path = tmp_path / "corpus.tar.gz"
+    with tarfile.open(archive_path, "w:gz") as archive:
+        for name in ("a.txt", "b.txt", "c.txt"):
+            info = tarfile.TarInfo(name)
+            info.size = 5
+            archive.addfile(info, io.BytesIO(b"hello"))
+
+    stored, skipped = extract_archive(str(archive_path), str(tmp_path / "uploads"), ["txt"], 1000, 2)
+
+    assert is_archive("corpus.tar.gz")
+    assert len(stored) == 2 and stored[0].size == 5
+    assert skipped == [{"name": "c.txt", "reason": "batch is limited to 2 files"}]
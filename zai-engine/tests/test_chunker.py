@@ -0,0 +1,36 @@
+from app.services.document_analysis import BoundaryIndex, DocumentAnalyzer, SmartChunker
+
+PARAGRAPH = (
+    "Retrieval quality depends on how documents are split. "
+    "Chunks should end at natural boundaries! Do they? "
+    "Sentences and paragraphs are preferred over arbitrary offsets."
+)
+
+def _pages(count=40):
+    return [f"{n}. Section {n}\n\n" + "\n\n".join([PARAGRAPH] * (n % 7 + 1)) + "\n\n" for n in range(count)]
+
+def test_boundary_index_lookups():
+    text = "One. Two.\n\nThree four five."
+    index = BoundaryIndex(text)
+    assert index.paragraph_after(0, 100) == text.index("\n\n")
+    assert index.paragraph_after(text.index("\n\n") + 1, 100) is None
+    assert index.word_after(0, 10) == 4
+
+def test_streamed_chunks_match_whole_text():
+    chunker = SmartChunker(DocumentAnalyzer())
+    pages = _pages()
+    text = "".join(pages)
+
+    whole = list(chunker.split([text]))
+    streamed = list(chunker.split(pages))
+
+    assert [span[:2] for span in whole] == [span[:2] for span in streamed]
+    for start, end, chunk_text in streamed:
+        assert text[start:end] == chunk_text
+        assert end - start <= chunker.max_chunk_size + 100
+
+    # Chunks cover the whole text, overlapping by at most the overlap size
+    assert whole[0][0] == 0
+    assert whole[-1][1] == len(text)
+    for (_, previous_end, _), (start, _, _) in zip(whole, whole[1:]):
+        assert previous_end - chunker.overlap_size <= start < previous_end
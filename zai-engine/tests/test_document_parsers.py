@@ -0,0 +1,66 @@
+import sys
+from types import SimpleNamespace
+
+from app.services.document_parsers import (
+    default_registry,
+    iter_html_cells,
+    iter_markdown_cells,
+    parse_markdown,
+    parse_pdf_text_layer
+)
+
+def test_markdown_headings_are_cells_of_their_own():
+    lines = ["# Title", "some text", "more", "", "## Usage", "```", "x = 1", "", "```", "- item"]
+
+    cells = list(iter_markdown_cells(lines))
+
+    assert cells == ["# Title", "some text\nmore", "## Usage", "```\nx = 1\n\n```", "- item"]
+
+def test_html_blocks_map_to_section_types(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text(
+        "<html><head><script>skip()</script></head><body>"
+        "<h2>Scope &amp; Terms</h2><p>Plain <b>text</b>.</p><ul><li>one</li></ul>"
+        "<table><tr><th>a</th><th>b</th></tr></table></body></html>"
+    )
+
+    cells = list(iter_html_cells(str(path)))
+
+    assert cells == ["## Scope & Terms", "Plain text.", "- one", "| a | b |"]
+
+def test_registry_routes_markdown_reported_as_plain_text(tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("# Notes\n\nBody\n")
+    registry = default_registry(pdf_text_layer=False)
+
+    parser = registry.get("text/plain", str(path))
+    parsed = parser(str(path), str(tmp_path / "notes.pages.jsonl"))
+
+    assert parser is parse_markdown
+    assert list(parsed.iter_pages()) == [("# Notes", "Body")]
+    assert registry.get("application/pdf", "scan.pdf") is None
+
+def _fake_pdf(monkeypatch, page_texts):
+    pages = [SimpleNamespace(extract_text=lambda text=text: text) for text in page_texts]
+    reader = SimpleNamespace(is_encrypted=False, pages=pages)
+    monkeypatch.setitem(sys.modules, "PyPDF2", SimpleNamespace(PdfReader=lambda path: reader))
+
+def test_pdf_text_layer_tolerates_a_few_sparse_pages(monkeypatch, tmp_path):
+    body = "A text page with a proper text layer. " * 5
+    _fake_pdf(monkeypatch, [""] + [body] * 9)
+
+    parsed = parse_pdf_text_layer("report.pdf", str(tmp_path / "pages.jsonl"))
+
+    pages = list(parsed.iter_pages())
+    assert parsed.page_count == 10
+    assert pages[0] == ()
+    assert pages[1] == (body.strip(),)
+
+def test_mostly_sparse_pdf_falls_back_to_docling(monkeypatch, tmp_path):
+    body = "A text page with a proper text layer. " * 5
+    _fake_pdf(monkeypatch, ["", "", "", body, body, body, body, body, body, body])
+    pages_path = tmp_path / "pages.jsonl"
+
+    assert parse_pdf_text_layer("scan.pdf", str(pages_path)) is None
+    assert not pages_path.exists()
+
@@ -0,0 +1,67 @@
+"""Change-stream tests against a local replica set (see devops/docker-compose.yml)."""
+import asyncio
+import os
+
+import pytest
+
+motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+
+from app.services.document_watcher import PendingDocumentWatcher
+
+MONGO_URL = os.getenv("ZAI_TEST_MONGO_URL", "mongodb://localhost:27017/?directConnection=true")
+
+async def _database():
+    client = motor_asyncio.AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        hello = await client.admin.command("hello")
+    except Exception:
+        pytest.skip("MongoDB is not reachable")
+    if "setName" not in hello:
+        pytest.skip("MongoDB is not running as a replica set")
+    return client, client["zai_watcher_test"]
+
+async def _watch_until(watcher, count):
+    """Run the watcher until it reported ``count`` pending documents."""
+    seen = []
+    done = asyncio.Event()
+
+    async def on_pending(change):
+        seen.append(change["documentKey"]["_id"])
+        if len(seen) >= count:
+            done.set()
+
+    task = asyncio.create_task(watcher.watch(on_pending))
+    return task, seen, done
+
+async def _stop(task, done):
+    await asyncio.wait_for(done.wait(), timeout=10)
+    # Let the watcher store the resume token of the last event
+    await asyncio.sleep(0.2)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+def test_watcher_reports_pending_documents_and_resumes():
+    async def run():
+        client, db = await _database()
+        await db.documents.delete_many({})
+        await db.processor_state.delete_many({})
+        watcher = PendingDocumentWatcher(db, state_key="test")
+
+        task, first_run, done = await _watch_until(watcher, 1)
+        await asyncio.sleep(1)
+        await db.documents.insert_one({"_id": "ignored", "status": "processed"})
+        await db.documents.insert_one({"_id": "first", "status": "pending"})
+        await _stop(task, done)
+
+        # Changes made while nobody is watching are replayed from the token
+        await db.documents.insert_one({"_id": "second", "status": "pending"})
+        await db.documents.update_one({"_id": "ignored"}, {"$set": {"status": "pending"}})
+
+        task, second_run, done = await _watch_until(watcher, 2)
+        await _stop(task, done)
+        client.close()
+        return first_run, second_run
+
+    first_run, second_run = asyncio.run(run())
+    assert first_run == ["first"]
+    assert second_run == ["second", "ignored"]
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.services.embedding_batcher import EmbeddingBatcher, RateLimiter
+
+class RateLimitError(Exception):
+    status_code = 429
+
+def test_batches_are_bounded_by_tokens_and_size():
+    batcher = EmbeddingBatcher(None, max_batch_tokens=100, max_batch_size=3)
+    batcher.count_tokens = len
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d", "e", "f", "g"]
+
+    batches = batcher.make_batches(texts)
+
+    assert batches == [[0, 1], [2, 3, 4], [5, 6]]
+
+def test_failed_batch_keeps_checkpointed_batches(monkeypatch):
+    calls = {"rate_limited": 0}
+
+    async def embed(texts):
+        if "bad" in texts:
+            raise ValueError("bad input")
+        if "slow" in texts and not calls["rate_limited"]:
+            calls["rate_limited"] += 1
+            raise RateLimitError()
+        return [[float(len(text))] for text in texts]
+
+    checkpointed = []
+
+    async def on_batch(texts, vectors):
+        checkpointed.extend(texts)
+
+    async def no_backoff(delay):
+        pass
+
+    batcher = EmbeddingBatcher(embed, RateLimiter(), max_batch_size=1, max_concurrency=2)
+
+    async def run():
+        monkeypatch.setattr(asyncio, "sleep", no_backoff)
+        with pytest.raises(ValueError):
+            await batcher.embed(["ok", "bad", "slow"], on_batch=on_batch)
+
+    asyncio.run(run())
+
+    assert sorted(checkpointed) == ["ok", "slow"]
+    assert calls["rate_limited"] == 1
+
+def test_rate_limiter_waits_for_token_budget():
+    async def run():
+        limiter = RateLimiter(tokens_per_minute=6000)
+        await limiter.acquire(6000)
+        started = asyncio.get_running_loop().time()
+        await limiter.acquire(10)
+        return asyncio.get_running_loop().time() - started
+
+    assert asyncio.run(run()) >= 0.09
@@ -0,0 +1,76 @@
+import asyncio
+
+from app.services.embedding_cache import EmbeddingCache
+
+def test_only_misses_are_embedded_once():
+    cache = EmbeddingCache(persistent=False)
+    calls = []
+
+    async def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    async def run():
+        first = await cache.embed_documents("model", ["a", "bb", "a"], embed)
+        second = await cache.embed_documents("model", ["bb", "ccc"], embed)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == [[1.0], [2.0], [1.0]]
+    assert second == [[2.0], [3.0]]
+    assert calls == [["a", "bb"], ["ccc"]]
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 4
+
+def test_keys_depend_on_model_and_lru_is_bounded():
+    cache = EmbeddingCache(persistent=False, max_memory_entries=2)
+    assert cache.key("m1", "text") != cache.key("m2", "text")
+
+    async def run():
+        await cache.put_many("m", ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+        return await cache.get_many("m", ["a", "b", "c"])
+
+    assert asyncio.run(run()) == [None, [2.0], [3.0]]
+
+class FakeCollection:
+    def __init__(self):
+        self.entries = {}
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            key = operation._filter["_id"]
+            self.entries.setdefault(key, {"_id": key, **operation._doc["$setOnInsert"]})
+
+    def find(self, query, projection=None):
+        async def entries():
+            for key in query["_id"]["$in"]:
+                if key in self.entries:
+                    yield self.entries[key]
+        return entries()
+
+def test_persistent_entries_are_packed_float32():
+    collection = FakeCollection()
+    writer = EmbeddingCache(database={"embedding_cache": collection})
+    reader = EmbeddingCache(database={"embedding_cache": collection})
+    # An entry written before vectors were packed
+    collection.entries[reader.key("m", "old")] = {"_id": reader.key("m", "old"), "vector": [0.5, 1.5]}
+
+    async def run():
+        await writer.put_many("m", ["new"], [[0.25, -2.0, 3.5]])
+        return await reader.get_many("m", ["new", "old"])
+
+    assert asyncio.run(run()) == [[0.25, -2.0, 3.5], [0.5, 1.5]]
+    stored = collection.entries[writer.key("m", "new")]
+    assert isinstance(stored["vector"], bytes) and len(stored["vector"]) == 3 * 4
+
+def test_memory_tier_holds_float32_arrays():
+    cache = EmbeddingCache(persistent=False)
+
+    async def run():
+        await cache.put_many("m", ["a"], [[0.5] * 1536])
+        return await cache.get_many("m", ["a"])
+
+    vectors = asyncio.run(run())
+    assert vectors == [[0.5] * 1536]
+    assert cache._memory[cache.key("m", "a")].nbytes == 1536 * 4
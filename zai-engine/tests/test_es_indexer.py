@@ -0,0 +1,72 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.es_indexer import ChunkIndexer
+
+class _BulkResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def __getitem__(self, key):
+        return self.body[key]
+
+class FakeElasticsearch:
+    """Keeps indexed chunks invisible to queries until the index is refreshed."""
+
+    def __init__(self):
+        self.searchable = {}
+        self.unrefreshed = {}
+        serializer = SimpleNamespace(dumps=lambda data: json.dumps(data).encode("utf-8"))
+        self.transport = SimpleNamespace(serializers=SimpleNamespace(get_serializer=lambda mimetype: serializer))
+        self.indices = SimpleNamespace(refresh=self._refresh)
+
+    def options(self, **kwargs):
+        return self
+
+    async def _refresh(self, **kwargs):
+        self.searchable.update(self.unrefreshed)
+        self.unrefreshed.clear()
+
+    async def bulk(self, operations, **kwargs):
+        items = []
+        for action_line, source_line in zip(operations[::2], operations[1::2]):
+            meta = json.loads(action_line)["index"]
+            self.unrefreshed[meta["_id"]] = json.loads(source_line)
+            items.append({"index": {"_id": meta["_id"], "status": 201}})
+        return _BulkResponse({"errors": False, "took": 1, "items": items})
+
+    async def delete_by_query(self, index, query, refresh=False, **kwargs):
+        document_id = query["term"]["document_id"]
+        for chunk_id in [key for key, source in self.searchable.items() if source["document_id"] == document_id]:
+            del self.searchable[chunk_id]
+        if refresh:
+            await self._refresh()
+
+    def chunks(self, document_id):
+        stored = {**self.searchable, **self.unrefreshed}
+        return [key for key, source in stored.items() if source["document_id"] == document_id]
+
+def _chunks(attempt, count):
+    # Chunk ids are random per attempt, as in the processor
+    return [(f"{attempt}-{i}", {"document_id": "doc1", "content": f"chunk {i}"}) for i in range(count)]
+
+def test_retry_after_interrupted_indexing_leaves_no_duplicates():
+    es = FakeElasticsearch()
+    indexer = ChunkIndexer(es, "chunks", chunk_size=2)
+
+    async def fail_after_first_request(indexed):
+        raise RuntimeError("processor stopped")
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await indexer.index(_chunks("first", 5), on_progress=fail_after_first_request)
+        assert es.chunks("doc1")
+
+        await indexer.delete_document("doc1")
+        await indexer.index(_chunks("retry", 5))
+
+    asyncio.run(run())
+    assert sorted(es.chunks("doc1")) == [f"retry-{i}" for i in range(5)]
@@ -0,0 +1,32 @@
+import asyncio
+
+from app.services.hybrid_search import MultiQueryRetriever
+
+class FakeElasticsearch:
+    def __init__(self):
+        self.requests = []
+
+    async def msearch(self, searches):
+        self.requests.append(searches)
+        responses = []
+        for body in searches[1::2]:
+            kind = "knn" if "knn" in body else "bm25"
+            responses.append({"hits": {"hits": [
+                {"_id": f"{kind}-{len(responses)}", "_score": 1.0, "_source": {"content": kind, "document_id": "d1"}}
+            ]}})
+        return {"responses": responses}
+
+def test_one_msearch_for_all_sub_queries():
+    es = FakeElasticsearch()
+    retriever = MultiQueryRetriever(es, "chunks", {"content": 1.0})
+
+    semantic, keyword = asyncio.run(
+        retriever.retrieve(["first part", "second part"], [[0.1, 0.2], [0.3, 0.4]], top_k=3)
+    )
+
+    assert len(es.requests) == 1
+    assert len(es.requests[0]) == 8
+    assert [docs[0].content for docs in semantic] == ["knn", "knn"]
+    assert [docs[0].content for docs in keyword] == ["bm25", "bm25"]
+    assert keyword[1][0].meta == {"document_id": "d1"}
+    assert es.requests[0][3]["query"]["multi_match"]["query"] == "first part"
@@ -0,0 +1,22 @@
+import numpy as np
+
+from app.services.ingestion_checkpoints import CheckpointStore
+
+def test_chunks_and_embeddings_round_trip(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    state = {"page_count": 2, "chunks": [{"content": "a", "quality": {"coherence_score": np.float32(0.5)}}]}
+
+    store.save_chunks("doc", state)
+    store.save_embeddings("doc", [[0.5, 1.0], [2.0, -1.0]])
+
+    assert store.load_chunks("doc")["chunks"][0]["quality"]["coherence_score"] == 0.5
+    assert store.load_embeddings("doc") == [[0.5, 1.0], [2.0, -1.0]]
+
+def test_missing_or_removed_artifacts_load_as_none(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.save_chunks("doc", {"chunks": []})
+
+    store.remove("doc")
+
+    assert store.load_chunks("doc") is None
+    assert store.load_embeddings("doc") is None
@@ -0,0 +1,54 @@
+import asyncio
+
+from bson import ObjectId
+
+from app.services.ingestion_events import EventSubscription, IngestionEventBroker
+
+class FakeCursor:
+    def __init__(self, entries):
+        self.entries = entries
+
+    async def to_list(self, length=None):
+        return self.entries
+
+class FakeCappedCollection:
+    """Keeps the newest ``capacity`` events, like a capped collection."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = []
+
+    def insert(self, event):
+        event["_id"] = ObjectId()
+        self.entries = (self.entries + [event])[-self.capacity:]
+        return event["_id"]
+
+    async def find_one(self, query, projection=None, sort=None):
+        return self.entries[0] if self.entries else None
+
+    def find(self, query, sort=None):
+        return FakeCursor([
+            entry for entry in self.entries
+            if entry["_id"] > query["_id"]["$gt"] and entry["document_id"] == query["document_id"]
+        ])
+
+def _broker(collection):
+    return IngestionEventBroker({"ingestion_events": collection})
+
+def test_resume_replays_retained_events():
+    collection = FakeCappedCollection(capacity=10)
+    first = collection.insert({"document_id": "d1", "status": "parsing"})
+    collection.insert({"document_id": "d2", "status": "parsing"})
+    collection.insert({"document_id": "d1", "status": "processed"})
+
+    events = asyncio.run(_broker(collection).events_after(EventSubscription(document_id="d1"), first))
+
+    assert [event["status"] for event in events] == ["processed"]
+
+def test_resume_from_overwritten_event_needs_reset():
+    collection = FakeCappedCollection(capacity=2)
+    first = collection.insert({"document_id": "d1", "status": "parsing"})
+    for _ in range(3):
+        collection.insert({"document_id": "d1", "status": None, "progress": {"pages": 1}})
+
+    assert asyncio.run(_broker(collection).events_after(EventSubscription(document_id="d1"), first)) is None
@@ -0,0 +1,35 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.ingestion_metrics import IngestionMetrics
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+def test_time_accumulates_and_marks_failed_stage():
+    metrics = IngestionMetrics()
+    with metrics.time("parse"):
+        pass
+    with metrics.time("parse"):
+        pass
+    errors_before = sample("zai_ingestion_stage_errors_total", {"stage": "embed"})
+    with pytest.raises(RuntimeError):
+        with metrics.time("embed"):
+            raise RuntimeError("embedding API unavailable")
+
+    assert set(metrics.stages) == {"parse", "embed"}
+    assert metrics.failed_stage == "embed"
+    assert sample("zai_ingestion_stage_errors_total", {"stage": "embed"}) == errors_before + 1
+    assert sample("zai_ingestion_stage_seconds_count", {"stage": "parse"}) >= 2
+
+def test_counts_and_summary():
+    metrics = IngestionMetrics()
+    chunks_before = sample("zai_ingestion_chunks_total")
+    metrics.count("chunks", 40)
+    metrics.count("chunks", 10)
+    summary = metrics.to_dict(total_seconds=5.0)
+
+    assert summary["counters"] == {"chunks": 50}
+    assert summary["chunks_per_second"] == 10.0
+    assert summary["failed_stage"] is None
+    assert sample("zai_ingestion_chunks_total") == chunks_before + 50
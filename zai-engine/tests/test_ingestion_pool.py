@@ -0,0 +1,59 @@
+import asyncio
+
+from app.services.ingestion_pool import IngestionWorkerPool, Stage
+
+def test_items_flow_through_all_stages():
+    async def run():
+        results = []
+
+        async def double(x):
+            await asyncio.sleep(0)
+            return x * 2
+
+        async def collect(x):
+            results.append(x)
+            return x
+
+        pool = IngestionWorkerPool(
+            stages=[Stage("double", double, 3), Stage("collect", collect, 1)],
+            queue_size=2,
+            max_in_flight=2
+        )
+        await pool.start()
+        for i in range(10):
+            await pool.submit(i)
+        await pool.join()
+        await pool.shutdown()
+        return results
+
+    assert sorted(asyncio.run(run())) == [i * 2 for i in range(10)]
+
+def test_stage_errors_are_reported_and_release_slots():
+    async def run():
+        failed = []
+
+        async def explode(x):
+            if x % 2:
+                raise ValueError(f"bad {x}")
+            return x
+
+        async def sink(x):
+            return x
+
+        async def on_error(stage, item, error):
+            failed.append((stage, item))
+
+        pool = IngestionWorkerPool(
+            stages=[Stage("explode", explode), Stage("sink", sink)],
+            queue_size=1,
+            max_in_flight=1,
+            on_error=on_error
+        )
+        await pool.start()
+        for i in range(6):
+            await asyncio.wait_for(pool.submit(i), timeout=1)
+        await pool.join()
+        await pool.shutdown()
+        return failed
+
+    assert asyncio.run(run()) == [("explode", 1), ("explode", 3), ("explode", 5)]
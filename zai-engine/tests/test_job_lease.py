@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from app.services.job_lease import LeaseManager
+
+_MISSING = object()
+
+def _get(doc, path):
+    for key in path.split("."):
+        if not isinstance(doc, dict) or key not in doc:
+            return _MISSING
+        doc = doc[key]
+    return doc
+
+def _matches_condition(value, condition):
+    if not isinstance(condition, dict) or not any(key.startswith("$") for key in condition):
+        return value == condition
+    for operator, operand in condition.items():
+        if operator == "$exists":
+            ok = (value is not _MISSING) == operand
+        elif operator == "$not":
+            ok = not _matches_condition(value, operand)
+        elif value is _MISSING:
+            ok = False
+        elif operator == "$in":
+            ok = value in operand
+        elif operator == "$lt":
+            ok = value < operand
+        elif operator == "$gte":
+            ok = value >= operand
+        else:
+            raise NotImplementedError(operator)
+        if not ok:
+            return False
+    return True
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            ok = any(_matches(doc, part) for part in condition)
+        elif key == "$and":
+            ok = all(_matches(doc, part) for part in condition)
+        else:
+            ok = _matches_condition(_get(doc, key), condition)
+        if not ok:
+            return False
+    return True
+
+def _apply(doc, update):
+    for key, value in update.get("$set", {}).items():
+        doc[key] = value
+    for key, value in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + value
+    for key in update.get("$unset", {}):
+        doc.pop(key, None)
+
+class FakeCollection:
+    """Just enough of a Motor collection for the queries LeaseManager sends."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=None):
+        candidates = sorted((doc for doc in self.docs if _matches(doc, query)), key=lambda doc: doc["created_at"])
+        if not candidates:
+            return None
+        _apply(candidates[0], update)
+        return dict(candidates[0])
+
+    async def update_many(self, query, update):
+        matched = [doc for doc in self.docs if _matches(doc, query)]
+        for doc in matched:
+            _apply(doc, update)
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched))
+
+def _doc(status, minutes_ago, **fields):
+    return {"_id": ObjectId(), "status": status, "created_at": datetime.utcnow() - timedelta(minutes=minutes_ago), **fields}
+
+def _lease(expires_in_minutes):
+    return {"owner": "other", "expires_at": datetime.utcnow() + timedelta(minutes=expires_in_minutes)}
+
+def test_claim_skips_live_leases_and_reclaims_expired_ones():
+    live = _doc("parsing", 30, lease=_lease(5), attempts=1)
+    expired = _doc("parsing", 20, lease=_lease(-1), attempts=1)
+    pending = _doc("pending", 10)
+    leases = LeaseManager(FakeCollection([live, expired, pending]), owner="me", max_attempts=3)
+
+    first = asyncio.run(leases.claim())
+    second = asyncio.run(leases.claim())
+
+    assert first["_id"] == expired["_id"] and first["attempts"] == 2
+    assert second["_id"] == pending["_id"] and second["attempts"] == 1
+    assert live["lease"]["owner"] == "other"
+    assert asyncio.run(leases.claim()) is None
+
+def test_documents_stuck_before_leases_are_reclaimed():
+    stuck = _doc("generating_embeddings", 60)
+    leases = LeaseManager(FakeCollection([stuck]), owner="me", max_attempts=3)
+
+    claimed = asyncio.run(leases.claim())
+
+    assert claimed["_id"] == stuck["_id"]
+    assert claimed["status"] == "parsing"
+    assert claimed["lease"]["owner"] == "me"
+    assert claimed["attempts"] == 1
+
+def test_exhausted_documents_are_failed_not_reclaimed():
+    exhausted = _doc("parsing", 30, lease=_lease(-1), attempts=3)
+    running = _doc("parsing", 20, lease=_lease(5), attempts=3)
+    leases = LeaseManager(FakeCollection([exhausted, running]), owner="me", max_attempts=3)
+
+    assert asyncio.run(leases.claim()) is None
+    assert asyncio.run(leases.fail_exhausted()) == 1
+    assert exhausted["status"] == "failed"
+    assert "lease" not in exhausted
+    assert running["status"] == "parsing"
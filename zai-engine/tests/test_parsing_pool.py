@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services import parsing_pool
+from app.services.parsing_pool import ParsedDocument, ParserPool, ParseTimeoutError, page_ranges
+
+def test_page_ranges_cover_every_page_once():
+    assert page_ranges(120, 50) == [(0, 49), (50, 99), (100, 119)]
+    assert page_ranges(50, 50) == [(0, 49)]
+
+def test_merged_ranges_keep_page_order(tmp_path):
+    parts = []
+    for index, pages in enumerate([[["a"], ["b"]], [["c"]]]):
+        path = tmp_path / f"part{index}"
+        path.write_text("".join(json.dumps(cells) + "\n" for cells in pages))
+        parts.append(str(path))
+    merged = str(tmp_path / "pages.jsonl")
+
+    ParserPool._merge(parts, merged)
+
+    assert list(ParsedDocument(page_count=3, pages_path=merged).iter_pages()) == [("a",), ("b",), ("c",)]
+
+def _sleep_parser(seconds):
+    def parse(file_path, pages_path):
+        time.sleep(seconds)
+        return ParsedDocument(page_count=1, pages_path=pages_path)
+    return parse
+
+def _thread_pool(monkeypatch, pool):
+    # Threads stand in for worker processes; the scheduling is the same
+    monkeypatch.setattr(pool, "_create_executor", lambda: ThreadPoolExecutor(max_workers=pool.workers))
+
+def test_queued_parses_do_not_time_out(monkeypatch):
+    pool = ParserPool(workers=1, timeout_seconds=0.5)
+    _thread_pool(monkeypatch, pool)
+
+    async def run():
+        return await asyncio.gather(*(
+            pool.run(_sleep_parser(0.3), f"doc{index}", f"pages{index}") for index in range(3)
+        ))
+
+    results = asyncio.run(run())
+    pool.close()
+    assert [result.pages_path for result in results] == ["pages0", "pages1", "pages2"]
+
+def test_timeout_lets_other_parses_finish(monkeypatch):
+    pool = ParserPool(workers=2, timeout_seconds=0.3)
+    _thread_pool(monkeypatch, pool)
+
+    async def run():
+        return await asyncio.gather(
+            pool.run(_sleep_parser(1.0), "hung", "pages-hung"),
+            pool.run(_sleep_parser(0.2), "ok", "pages-ok"),
+            return_exceptions=True
+        )
+
+    hung, ok = asyncio.run(run())
+    pool.close()
+    assert isinstance(hung, ParseTimeoutError)
+    assert ok.pages_path == "pages-ok"
+
+def test_failed_range_cancels_remaining_ranges(monkeypatch, tmp_path):
+    pool = ParserPool(workers=1, timeout_seconds=5)
+    _thread_pool(monkeypatch, pool)
+    parsed = []
+
+    def parse_range(file_path, pages_path, first_page, last_page):
+        parsed.append(first_page)
+        if first_page == 0:
+            raise ValueError("bad page")
+        return ParsedDocument(page_count=last_page - first_page + 1, pages_path=pages_path)
+
+    monkeypatch.setattr(parsing_pool, "_parse_range_in_worker", parse_range)
+
+    with pytest.raises(ValueError):
+        asyncio.run(pool.parse_ranges("doc.pdf", str(tmp_path / "pages.jsonl"), page_count=200, pages_per_range=50))
+    pool.close()
+    assert parsed == [0]
+
+def test_ranges_are_merged_in_page_order(monkeypatch, tmp_path):
+    pool = ParserPool(workers=2, timeout_seconds=5)
+    _thread_pool(monkeypatch, pool)
+
+    def parse_range(file_path, pages_path, first_page, last_page):
+        # Later ranges finish first
+        time.sleep(0.01 * (3 - first_page // 50))
+        with open(pages_path, "w") as f:
+            for page in range(first_page, last_page + 1):
+                f.write(json.dumps([f"page {page}"]) + "\n")
+        return ParsedDocument(page_count=last_page - first_page + 1, pages_path=pages_path)
+
+    monkeypatch.setattr(parsing_pool, "_parse_range_in_worker", parse_range)
+
+    parsed = asyncio.run(pool.parse_ranges("doc.pdf", str(tmp_path / "pages.jsonl"), page_count=120, pages_per_range=50))
+    pool.close()
+    assert parsed.page_count == 120
+    assert [cells[0] for cells in parsed.iter_pages()] == [f"page {page}" for page in range(120)]
+    assert sorted(os.listdir(tmp_path)) == ["pages.jsonl"]
@@ -0,0 +1,66 @@
+from app.services.pipeline_cache import PipelineCache, config_fingerprint
+
+LLM_CONFIG = {"provider": "OPENAI", "apiKey": "key", "modelName": "gpt-4o", "maxTokens": 1024, "temperature": 0.2}
+
+class Builder:
+    def __init__(self):
+        self.built = []
+
+    def __call__(self, name):
+        def build():
+            self.built.append(name)
+            return f"pipeline-{name}-{len(self.built)}"
+        return build
+
+def test_pipelines_are_reused_per_llm():
+    cache = PipelineCache(max_size=2)
+    build = Builder()
+    fingerprint = config_fingerprint(LLM_CONFIG)
+
+    first = cache.get("a", fingerprint, build("a"))
+    cache.get("b", fingerprint, build("b"))
+    again = cache.get("a", fingerprint, build("a"))
+
+    assert again == first
+    assert build.built == ["a", "b"]
+
+def test_least_recently_used_pipeline_is_evicted():
+    cache = PipelineCache(max_size=2)
+    build = Builder()
+    fingerprint = config_fingerprint(LLM_CONFIG)
+
+    cache.get("a", fingerprint, build("a"))
+    cache.get("b", fingerprint, build("b"))
+    cache.get("a", fingerprint, build("a"))
+    cache.get("c", fingerprint, build("c"))
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert len(cache) == 2
+
+def test_changed_config_rebuilds_pipeline():
+    cache = PipelineCache(max_size=2)
+    build = Builder()
+
+    first = cache.get("a", config_fingerprint(LLM_CONFIG), build("a"))
+    # Fields the pipeline does not use leave it in place
+    same = cache.get("a", config_fingerprint({**LLM_CONFIG, "name": "renamed"}), build("a"))
+    changed = cache.get("a", config_fingerprint({**LLM_CONFIG, "temperature": 0.9}), build("a"))
+
+    assert same == first
+    assert changed != first
+    assert build.built == ["a", "a"]
+
+def test_invalidate():
+    cache = PipelineCache(max_size=3)
+    build = Builder()
+    fingerprint = config_fingerprint(LLM_CONFIG)
+    for name in "abc":
+        cache.get(name, fingerprint, build(name))
+
+    cache.invalidate("a")
+    assert cache.peek("a") is None
+    assert cache.peek("b") is not None
+
+    cache.invalidate()
+    assert len(cache) == 0
@@ -0,0 +1,35 @@
+from haystack import Document
+
+from app.services.rag_components import WeightedFusion, reciprocal_rank_fusion
+
+def test_weights_are_per_run():
+    semantic = [Document(id="a", content="a"), Document(id="b", content="b")]
+    keyword = [Document(id="b", content="b"), Document(id="c", content="c")]
+    fusion = WeightedFusion()
+
+    favour_semantic = fusion.run(semantic, keyword, weights={"semantic": 0.9, "keyword": 0.1})["documents"]
+    favour_keyword = fusion.run(semantic, keyword, weights={"semantic": 0.1, "keyword": 0.9})["documents"]
+
+    # Found by both retrievers, "b" wins either way; the runs do not affect each other
+    assert [doc.id for doc in favour_semantic] == ["b", "a", "c"]
+    assert [doc.id for doc in favour_keyword] == ["b", "c", "a"]
+    assert semantic[0].score is None
+
+def test_top_ranked_everywhere_scores_one():
+    doc = Document(id="a", content="a")
+    fused = WeightedFusion().run([doc], [doc], top_k=1)["documents"]
+    assert len(fused) == 1
+    assert abs(fused[0].score - 1.0) < 1e-9
+
+def test_fusion_of_many_lists_leaves_inputs_untouched():
+    lists = [
+        [Document(id="a", content="a"), Document(id="b", content="b")],
+        [Document(id="c", content="c")],
+        [Document(id="b", content="b"), Document(id="a", content="a")],
+        []
+    ]
+    fused = reciprocal_rank_fusion(lists, [0.25, 0.25, 0.25, 0.25], top_k=2)
+
+    assert [doc.id for doc in fused] == ["a", "b"]
+    assert all(doc.score is None for docs in lists for doc in docs)
+    assert reciprocal_rank_fusion([[], []], [0.5, 0.5]) == []
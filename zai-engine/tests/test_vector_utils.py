@@ -0,0 +1,20 @@
+import numpy as np
+
+from app.utils.vector_utils import pack_vector, unpack_vector, vector_to_list
+
+def test_packed_vector_round_trips_as_float32():
+    vector = [0.25, -1.5, 3.0]
+
+    packed = pack_vector(vector)
+
+    assert len(packed) == 4 * len(vector)
+    assert vector_to_list(packed) == vector
+
+def test_unpack_shares_memory_with_blob():
+    packed = pack_vector(np.arange(4, dtype=np.float32))
+
+    array = unpack_vector(packed)
+
+    assert array.dtype == np.float32
+    assert not array.flags.owndata
+    assert not array.flags.writeable